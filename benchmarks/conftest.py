@@ -0,0 +1,147 @@
+import asyncio
+import io
+import logging
+from collections.abc import Callable, Generator
+from pathlib import Path
+from typing import Any, Self
+
+import cv2
+import numpy as np
+import pytest
+import torch
+from botocore.exceptions import ClientError
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from internal.config import get_config
+from internal.entities import models
+from internal.services.ml.model import PyTorchModel
+from internal.utils.resnet_abcd_swin import ResNetCosineSwinModel
+
+MODEL_FILE_NAME = "resnet18_melanoma_with_abcd_swin.pth"
+
+
+class InMemoryBody:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+class InMemoryS3:
+    """
+    Stand-in for the aioboto3 session and client: objects live in a dict keyed by (bucket, key).
+    """
+
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], bytes] = {}
+
+    def client(self, *args: Any, **kwargs: Any) -> Self:  # noqa: ANN401, ARG002
+        return self
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        return None
+
+    async def get_object(self, Bucket: str, Key: str) -> dict[str, Any]:  # noqa: N803
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "GetObject")
+        return {"Body": InMemoryBody(self.objects[Bucket, Key])}
+
+    async def put_object(self, Bucket: str, Key: str, Body: bytes) -> dict[str, Any]:  # noqa: N803
+        self.objects[Bucket, Key] = Body
+        return {}
+
+
+def make_image(width: int, height: int, image_format: str = "JPEG") -> bytes:
+    """
+    Synthetic dermoscopy-like image: a dark irregular spot on a noisy skin tone background.
+    """
+    rng = np.random.default_rng(0)
+    image = np.full((height, width, 3), (200, 160, 140), dtype=np.uint8)
+    image = np.clip(image + rng.normal(0, 12, size=image.shape), 0, 255).astype(np.uint8)
+
+    center, axes = (width // 2, height // 2), (width // 5, height // 6)
+    cv2.ellipse(image, center, axes, 30, 0, 360, (90, 50, 40), -1)
+    cv2.ellipse(image, (center[0] + width // 12, center[1]), (axes[0] // 2, axes[1]), 0, 0, 360, (60, 35, 30), -1)
+
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def setup_logging() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("sqlalchemy.engine.Engine").disabled = True
+
+
+@pytest.fixture(scope="session")
+def network() -> ResNetCosineSwinModel:
+    # Random weights: latency does not depend on the trained values
+    torch.manual_seed(0)
+    return ResNetCosineSwinModel(pretrained=False).eval()
+
+
+@pytest.fixture(scope="session")
+def inference_model(network: ResNetCosineSwinModel) -> PyTorchModel:
+    return PyTorchModel(network)
+
+
+@pytest.fixture(scope="session")
+def model_dir(tmp_path_factory: pytest.TempPathFactory, network: ResNetCosineSwinModel) -> Path:
+    path = tmp_path_factory.mktemp("ml")
+    torch.save(network.state_dict(), path / MODEL_FILE_NAME)
+    return path
+
+
+@pytest.fixture(scope="session")
+def runner() -> Generator[asyncio.Runner, Any]:
+    # Benchmarked functions are synchronous, coroutines are driven through a single loop
+    with asyncio.Runner() as runner:
+        yield runner
+
+
+@pytest.fixture(scope="session")
+def s3() -> InMemoryS3:
+    return InMemoryS3()
+
+
+@pytest.fixture(scope="session")
+def service_settings(model_dir: Path, s3: InMemoryS3) -> Generator[None, Any]:
+    """
+    MLService against the in-memory S3 and the local checkpoint, with every cross-request cache disabled,
+    so that each round does the full amount of work.
+    """
+    settings = get_config()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "ML_DIR_TO_UPLOAD", model_dir)
+        monkeypatch.setattr(settings, "ML_EMBEDDING_CACHE", False)
+        monkeypatch.setattr(settings, "ML_ABCD_CACHE_SIZE", 0)
+        monkeypatch.setattr(settings, "ML_ABCD_PERSIST", False)
+        monkeypatch.setattr(settings, "ML_WARMUP_BATCH_SIZES", [1])
+        monkeypatch.setattr("internal.services.ml.base.get_s3_session", lambda: s3)
+        # Clients shared by a batch (use_s3_client) come from the session of internal.config.s3
+        monkeypatch.setattr("internal.config.s3.get_s3_session", lambda: s3)
+        yield
+
+
+@pytest.fixture(scope="session")
+def session_factory(runner: asyncio.Runner) -> async_sessionmaker[AsyncSession]:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def create_tables() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(models.BaseModel.metadata.create_all)
+
+    runner.run(create_tables())
+    return async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def image_factory() -> Callable[..., bytes]:
+    return make_image
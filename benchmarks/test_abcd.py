@@ -0,0 +1,22 @@
+from collections.abc import Callable
+
+import numpy as np
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from internal.services.ml.model import BaseInferenceModel
+
+
+@pytest.mark.parametrize(("width", "height"), [(224, 224), (512, 384), (1024, 768), (4000, 3000)])
+def test_compute_abcd_features(
+    benchmark: BenchmarkFixture,
+    image_factory: Callable[..., bytes],
+    width: int,
+    height: int,
+) -> None:
+    benchmark.group = "compute_abcd_features"
+    image = np.array(BaseInferenceModel.open_image(image_factory(width, height, "PNG")))
+
+    result = benchmark(BaseInferenceModel.compute_abcd_features, image)
+
+    assert result["diameter"] > 0
@@ -0,0 +1,18 @@
+import pytest
+import torch
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from internal.utils.cosine_classifier import CosineClassifier
+
+
+@pytest.mark.parametrize("batch_size", [1, 8, 64])
+def test_forward(benchmark: BenchmarkFixture, batch_size: int) -> None:
+    benchmark.group = "cosine_classifier"
+    torch.manual_seed(0)
+    classifier = CosineClassifier(512, 3).eval()
+    features = torch.randn(batch_size, 512)
+
+    with torch.no_grad():
+        result = benchmark(classifier, features)
+
+    assert result.shape == (batch_size, 3)
@@ -0,0 +1,37 @@
+from collections.abc import Callable
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from internal.services.ml.model import BaseInferenceModel
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG"])
+@pytest.mark.parametrize("size", [None, 224])
+def test_open_image(
+    benchmark: BenchmarkFixture,
+    image_factory: Callable[..., bytes],
+    image_format: str,
+    size: int | None,
+) -> None:
+    benchmark.group = f"open_image_12mp_{image_format.lower()}"
+    content = image_factory(4000, 3000, image_format)
+
+    image = benchmark(BaseInferenceModel.open_image, content, size)
+
+    assert image.mode == "RGB"
+
+
+@pytest.mark.parametrize("batch_size", [1, 8])
+def test_transform(
+    benchmark: BenchmarkFixture,
+    image_factory: Callable[..., bytes],
+    batch_size: int,
+) -> None:
+    benchmark.group = "transform"
+    transform = BaseInferenceModel.get_transformer()
+    images = [BaseInferenceModel.open_image(image_factory(1024, 768), size=224)] * batch_size
+
+    result = benchmark(lambda: [transform(elem) for elem in images])
+
+    assert len(result) == batch_size
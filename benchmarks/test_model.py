@@ -0,0 +1,49 @@
+from collections.abc import Callable
+
+import numpy as np
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from internal.services.ml.model import PyTorchModel
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 8])
+def test_predict_batch(
+    benchmark: BenchmarkFixture,
+    inference_model: PyTorchModel,
+    image_factory: Callable[..., bytes],
+    batch_size: int,
+) -> None:
+    benchmark.group = "predict_batch"
+    images = [image_factory(1024, 768)] * batch_size
+    # ABCD extraction is benchmarked on its own, here only decode, transform and forward
+    abcd = [PyTorchModel.get_abcd_vector(np.array(PyTorchModel.open_image(images[0], size=224)))] * batch_size
+
+    result = benchmark.pedantic(
+        inference_model.predict_batch,
+        kwargs={"images": images, "abcd": abcd},
+        rounds=5,
+        warmup_rounds=1,
+    )
+
+    assert len(result) == batch_size
+
+
+@pytest.mark.parametrize("tta_views", [1, 4])
+def test_predict_tta(
+    benchmark: BenchmarkFixture,
+    inference_model: PyTorchModel,
+    image_factory: Callable[..., bytes],
+    tta_views: int,
+) -> None:
+    benchmark.group = "predict_tta"
+    image = image_factory(1024, 768)
+
+    result = benchmark.pedantic(
+        inference_model.predict,
+        kwargs={"image_input": image, "tta_views": tta_views},
+        rounds=5,
+        warmup_rounds=1,
+    )
+
+    assert 0 <= result[1] <= 1
@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+from collections.abc import Callable, Generator
+from typing import Any
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from benchmarks.conftest import MODEL_FILE_NAME, InMemoryS3
+from internal.config import get_config
+from internal.entities import models, schemas
+from internal.services.ml.abcd import get_abcd_service
+from internal.services.ml.base import MLService
+from internal.services.ml.batching import get_inference_engine
+from internal.services.ml.executor import get_inference_executor
+from internal.services.ml.preprocess import build_artifact, get_artifact_key
+
+
+@pytest.fixture(scope="module")
+def service(runner: asyncio.Runner, service_settings: None) -> Generator[None, Any]:  # noqa: ARG001
+    yield
+
+    runner.run(get_inference_engine().stop())
+    get_inference_executor().shutdown()
+    get_abcd_service().executor.shutdown()
+
+
+async def _create_task(
+    session_factory: async_sessionmaker[AsyncSession],
+    s3: InMemoryS3,
+    content: bytes,
+    *,
+    artifact: bool,
+) -> schemas.ml.KafkaInputMessageSchema:
+    settings = get_config()
+    file_id = uuid.uuid4()
+    key = f"{settings.S3_DIR_NAME_FILE.strip('/')}/{file_id}.jpg"
+    s3.objects[settings.S3_CORE_BUCKET, key] = content
+    if artifact:
+        s3.objects[settings.S3_CORE_BUCKET, get_artifact_key(file_id)] = build_artifact(
+            content,
+            settings.ML_DECODE_IMAGE_SIZE or None,
+            settings.ML_ABCD_IMAGE_SIZE or None,
+        )
+
+    async with session_factory() as session:
+        model = models.Models(
+            name="Benchmark",
+            s3_path=f"{settings.S3_CORE_BUCKET}/{settings.S3_DIR_NAME_MODEL}/{MODEL_FILE_NAME}",
+            is_exists=True,
+        )
+        file = models.Files(
+            id=file_id,
+            original_name="benchmark.jpg",
+            s3_path=f"{settings.S3_CORE_BUCKET}/{key}",
+            type_file="image/jpeg",
+        )
+        session.add_all([model, file])
+        await session.flush()
+
+        task = models.Tasks(file_id=file.id, status=schemas.ml.StatusEnum.UPLOAD)
+        session.add(task)
+        await session.commit()
+
+        return schemas.ml.KafkaInputMessageSchema(task_id=task.id, model_id=model.id)
+
+
+async def _predict_file(
+    session_factory: async_sessionmaker[AsyncSession],
+    data: schemas.ml.KafkaInputMessageSchema,
+) -> None:
+    async with session_factory() as session:
+        await MLService.predict_file(session=session, data=data)
+
+
+@pytest.mark.parametrize("artifact", [False, True])
+def test_predict_file(  # noqa: PLR0913
+    benchmark: BenchmarkFixture,
+    runner: asyncio.Runner,
+    service: None,  # noqa: ARG001
+    session_factory: async_sessionmaker[AsyncSession],
+    s3: InMemoryS3,
+    image_factory: Callable[..., bytes],
+    *,
+    artifact: bool,
+) -> None:
+    """
+    Kafka message to stored prediction: DB reads, S3 download, ABCD pool, batching engine, DB writes.
+    The registry keeps the model loaded, the first (warm-up) round pays for loading it.
+    """
+    benchmark.group = "predict_file"
+    data = runner.run(_create_task(session_factory, s3, image_factory(4000, 3000), artifact=artifact))
+
+    benchmark.pedantic(
+        runner.run,
+        setup=lambda: ((_predict_file(session_factory, data),), {}),
+        rounds=5,
+        warmup_rounds=1,
+    )
+
+    async def get_task() -> models.Tasks:
+        async with session_factory() as session:
+            return await session.get(models.Tasks, data.task_id)
+
+    task = runner.run(get_task())
+    assert task.status == schemas.ml.StatusEnum.SUCCESS
+    assert task.predict_id is not None
@@ -0,0 +1,9 @@
+from internal.bootstrap.ml import MLCommand
+
+
+def main() -> None:
+    MLCommand().execute()
+
+
+if __name__ == "__main__":
+    main()
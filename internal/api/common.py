@@ -1,6 +1,11 @@
-from fastapi import APIRouter
+from typing import Any
+
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
 
 from internal.entities import schemas
+from internal.services.ml.base import MLService
+from internal.services.ml.readiness import ReadinessReport, get_readiness_tracker
 
 router = APIRouter(tags=["common"])
 
@@ -9,3 +14,17 @@ router = APIRouter(tags=["common"])
 # @alru_cache(maxsize=1)
 async def health_check() -> schemas.base.MessageSchema:
     return schemas.base.MessageSchema(message="OK")
+
+
+@router.get("/ready")
+async def ready_check() -> ReadinessReport:
+    report = get_readiness_tracker().report()
+    return JSONResponse(
+        content=report.model_dump(mode="json"),
+        status_code=status.HTTP_200_OK if report.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@router.get("/metrics")
+async def metrics() -> dict[str, Any]:
+    return MLService.get_metrics()
@@ -1,4 +1,6 @@
 from aiokafka import ConsumerRecord
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from internal import config
 from internal.api.kafka import KafkaActions
@@ -11,24 +13,47 @@ actions = KafkaActions()
 logger = log.get_logger()
 
 
-@actions.read(config.get_config().KAFKA_TOPIC_MELANOMA_ML)
-async def read_melanoma_detection(msg: ConsumerRecord) -> None:
-    message = schemas.ml.KafkaInputMessageSchema.model_validate_json(msg.value)
-    async with get_async_session()() as session:
-        task = await MLService.get_internal_task(session=session, pk=message.task_id)
+@actions.read_batch(
+    config.get_config().KAFKA_TOPIC_MELANOMA_ML,
+    max_records=config.get_config().KAFKA_BATCH_MAX_RECORDS,
+    max_wait_ms=config.get_config().KAFKA_BATCH_MAX_WAIT_MS,
+)
+async def read_melanoma_detection(records: list[ConsumerRecord]) -> list[bool]:
+    # Tasks of the batch share a session and an S3 client, their images share the micro-batches of the engine
+    results = [False] * len(records)
+    messages: dict[int, schemas.ml.KafkaInputMessageSchema] = {}
+    for index, msg in enumerate(records):
         try:
-            await MLService.predict_file(session=session, data=message)
-        except Exception as e:
-            if not task:
-                return
-            logger.exception("ERROR")
-            await session.rollback()
-            await MLService.update_internal_task(
-                session=session,
-                pk=message.task_id,
-                data={
-                    "status": schemas.ml.StatusEnum.ERROR,
-                    "error": e.detail if hasattr(e, "detail") else str(e),
-                },
-            )
-            await session.commit()
+            messages[index] = schemas.ml.KafkaInputMessageSchema.model_validate_json(msg.value)
+        except ValidationError:
+            logger.exception("Invalid message:%.*s", 100, str(msg))
+
+    async with get_async_session()() as session:
+        task_errors = await MLService.predict_files(session=session, items=list(messages.values()))
+        for (index, message), error in zip(messages.items(), task_errors, strict=True):
+            if error is None:
+                results[index] = True
+                continue
+
+            logger.error("Error while predicting task %s", message.task_id, exc_info=error)
+            await set_task_error(session=session, message=message, error=error)
+
+    return results
+
+
+async def set_task_error(session: AsyncSession, message: schemas.ml.KafkaInputMessageSchema, error: Exception) -> None:
+    try:
+        if not await MLService.get_internal_task(session=session, pk=message.task_id):
+            return
+
+        await MLService.update_internal_task(
+            session=session,
+            pk=message.task_id,
+            data={
+                "status": schemas.ml.StatusEnum.ERROR,
+                "error": error.detail if hasattr(error, "detail") else str(error),
+            },
+        )
+    except Exception:
+        logger.exception("Error while saving the error of task %s", message.task_id)
+        await session.rollback()
@@ -1,6 +1,6 @@
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi import APIRouter, Depends, File, Query, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from internal.config.models import get_db
@@ -18,5 +18,8 @@ async def get_models(
 
 
 @router.post("/")
-async def predict_image(file: Annotated[UploadFile, File(...)]) -> dict[str, Any]:
-    return await MLService.predict_image(file=file)
+async def predict_image(
+    file: Annotated[UploadFile, File(...)],
+    tta: Annotated[bool, Query()] = False,  # noqa: FBT002
+) -> dict[str, Any]:
+    return await MLService.predict_image(file=file, tta=tta)
@@ -16,12 +16,13 @@ router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
 
 @router.put("/{model_pk}/")
-async def upload_image(
+async def upload_image(  # noqa: PLR0913
     token: Annotated[str, Depends(UserService.get_bearer_auth())],
     file: Annotated[UploadFile, File(...)],
     session: Annotated[AsyncSession, Depends(get_db)],
     model_pk: Annotated[UUID4, Path()],
     producer: Annotated[KafkaProducer, Depends(get_kafka_producer_context)],
+    tta: Annotated[bool, Query()] = False,  # noqa: FBT002
 ) -> schemas.ml.TaskCreateResponseSchema | dict[str, Any]:
     payload = UserService.decode_jwt_access_payload(token=token)
 
@@ -31,6 +32,33 @@ async def upload_image(
         session=session,
         model_pk=model_pk,
         producer=producer,
+        tta=tta,
+    )
+
+    return JSONResponse(
+        content=result.model_dump(mode="json"),
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+@router.put("/")
+async def upload_image_models(  # noqa: PLR0913
+    token: Annotated[str, Depends(UserService.get_bearer_auth())],
+    file: Annotated[UploadFile, File(...)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    producer: Annotated[KafkaProducer, Depends(get_kafka_producer_context)],
+    model_pk: Annotated[list[UUID4] | None, Query()] = None,
+    tta: Annotated[bool, Query()] = False,  # noqa: FBT002
+) -> schemas.ml.TaskCreateResponseSchema | dict[str, Any]:
+    payload = UserService.decode_jwt_access_payload(token=token)
+
+    result = await MLService.upload_img_models(
+        user_id=payload.sub,
+        file=file,
+        session=session,
+        producer=producer,
+        model_pks=model_pk,
+        tta=tta,
     )
 
     return JSONResponse(
@@ -10,8 +10,13 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from internal import api, config
 from internal.bootstrap.abc import AbstractCommand
+from internal.config.cpu import apply_cpu_layout
 from internal.config.kafka import get_kafka_consumer
+from internal.services.ml.abcd import get_abcd_service
 from internal.services.ml.base import MLService
+from internal.services.ml.batching import get_inference_engine
+from internal.services.ml.executor import get_inference_executor
+from internal.services.ml.readiness import get_readiness_tracker
 from internal.utils import errors, log
 
 if TYPE_CHECKING:
@@ -78,8 +83,10 @@ class AppCommand(AbstractCommand):
     async def _lifespan(self, _: FastAPI) -> AsyncGenerator[None, Any]:
         logging.getLogger("sqlalchemy.engine.Engine").disabled = True
         logger.info("Start app")
+        apply_cpu_layout()
         await MLService.start_all_jobs()
-        tasks_start = [self.consumer.start]
+        # Models are preloaded in the background: /health answers meanwhile, /ready once they can serve
+        tasks_start = [self._start_serving, MLService.watch_models]
 
         for elem in tasks_start:
             task = asyncio.create_task(elem())
@@ -89,6 +96,20 @@ class AppCommand(AbstractCommand):
         yield
 
         logger.info("Stop app")
+        await self.consumer.stop()
+        await get_inference_engine().stop()
+        get_inference_executor().shutdown()
+        get_abcd_service().executor.shutdown()
+
+    async def _start_serving(self) -> None:
+        """The Kafka consumer starts only after the models are preloaded and warmed up, even when the warm-up fails."""
+        try:
+            await MLService.warmup_models()
+        except Exception:
+            logger.exception("Error while warming up models")
+            get_readiness_tracker().finish()
+
+        await self.consumer.start()
 
     def get_log_config(self) -> dict[str, Any]:
         if not self.settings.APP_CONFIG_LOG.exists():
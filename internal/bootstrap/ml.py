@@ -0,0 +1,251 @@
+import argparse
+import logging
+from pathlib import Path
+
+from internal.bootstrap.abc import AbstractCommand
+from internal.config.base import CompileModeEnum
+from internal.entities import schemas
+from internal.services.ml.base import MLService
+from internal.services.ml.cascade import fit_cascade_head, save_cascade_head
+from internal.services.ml.evaluation import (
+    compare_models,
+    evaluate_cascade,
+    load_labeled_images,
+    load_sample_images,
+    report_pruning,
+)
+from internal.services.ml.model import PyTorchModel
+from internal.services.ml.onnx_model import export_onnx
+from internal.utils import log
+from internal.utils.pruning import prune_model, save_pruned
+
+logger = log.get_logger()
+
+
+class MLCommand(AbstractCommand):
+    def __init__(self) -> None:
+        pass
+
+    def execute(self) -> None:
+        logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+        args = self.parse_args()
+
+        commands = {
+            "export-onnx": lambda: self.export_onnx(args),
+            "compare": lambda: self.compare(args),
+            "prune": lambda: self.prune(args),
+            "cascade-fit": lambda: self.cascade_fit(args),
+            "cascade-eval": lambda: self.cascade_eval(args),
+        }
+
+        if args.action not in commands:
+            msg = f"Unknown command: {args.action}"
+            raise ValueError(msg)
+
+        commands[args.action]()
+
+    def export_onnx(self, args: argparse.Namespace) -> None:
+        weights: Path = args.weights
+        export_onnx(MLService.load_model(weights), args.output or weights.with_suffix(".onnx"))
+
+    def compare(self, args: argparse.Namespace) -> None:
+        """
+        Compare a backend/precision against the eager FP32 PyTorch model on local sample images.
+        """
+        reference = MLService.load_model(args.weights)
+        candidate = MLService.get_loader(
+            backend=schemas.ml.ModelBackendEnum(args.backend),
+            precision=schemas.ml.ModelPrecisionEnum(args.precision),
+        )(args.weights)
+        if isinstance(candidate, PyTorchModel):
+            candidate.compile(CompileModeEnum(args.compile))
+
+        report = compare_models(
+            reference=reference,
+            candidate=candidate,
+            images=load_sample_images(directory=args.images, limit=args.limit),
+            batch_size=args.batch_size,
+        )
+        logger.info("%s %s vs PYTORCH FP32: %s", args.backend, args.precision, report.model_dump_json(indent=2))
+        logger.info("Candidate compilation: %s", candidate.warmup_report.model_dump_json(indent=2))
+
+    def prune(self, args: argparse.Namespace) -> None:
+        """
+        Structured pruning of a checkpoint, the result is a new checkpoint loadable as any other model.
+        """
+        weights: Path = args.weights
+        dense = MLService.load_model(weights)
+        pruned = MLService.load_model(weights)
+
+        config = prune_model(pruned.model, head_ratio=args.heads, mlp_ratio=args.mlp, filter_ratio=args.filters)
+        output = save_pruned(pruned.model, config, args.output or weights.with_name(f"{weights.stem}_pruned.pth"))
+        logger.info("Pruned model saved: %s", output)
+
+        report = report_pruning(
+            dense=dense,
+            pruned=pruned,
+            config=config,
+            images=load_sample_images(directory=args.images, limit=args.limit),
+            batch_size=args.batch_size,
+        )
+        logger.info("Pruned vs dense: %s", report.model_dump_json(indent=2))
+
+    def cascade_fit(self, args: argparse.Namespace) -> None:
+        """
+        Fit the ResNet + ABCD head of the cascade to the full model, saved next to the checkpoint.
+        """
+        weights: Path = args.weights
+        model = MLService.load_model(weights)
+        if not model.has_cascade_stage:
+            msg = f"Model {weights.name} has no cascade stage"
+            raise ValueError(msg)
+
+        images, _ = self._load_cascade_images(args)
+        head, report = fit_cascade_head(
+            model,
+            images,
+            epochs=args.epochs,
+            batch_size=args.batch_size,
+        )
+        save_cascade_head(head, args.output or PyTorchModel.get_cascade_path(weights))
+        logger.info("Cascade head: %s", report.model_dump_json(indent=2))
+
+    def cascade_eval(self, args: argparse.Namespace) -> None:
+        """
+        Accuracy and latency of the cascade at every threshold against the full model.
+        """
+        weights: Path = args.weights
+        model = MLService.load_model(weights)
+        head_path = args.head or PyTorchModel.get_cascade_path(weights)
+        if not model.load_cascade_head(head_path, threshold=max(args.thresholds)):
+            msg = f"No cascade head {head_path}, run cascade-fit first"
+            raise FileNotFoundError(msg)
+
+        images, labels = self._load_cascade_images(args)
+        report = evaluate_cascade(
+            model,
+            images,
+            thresholds=sorted(args.thresholds),
+            labels=labels,
+            batch_size=args.batch_size,
+        )
+        logger.info("Cascade vs full model: %s", report.model_dump_json(indent=2))
+
+    @staticmethod
+    def _load_cascade_images(args: argparse.Namespace) -> tuple[list[bytes], list[int] | None]:
+        """
+        Real dermoscopy images only: a head distilled and a threshold calibrated on synthetic
+        noise would be served as an uncalibrated gate.
+        """
+        directory: Path = args.images
+        if not directory.is_dir():
+            msg = f"Images directory {directory} does not exist"
+            raise FileNotFoundError(msg)
+
+        images, labels = load_labeled_images(directory, limit=args.limit)
+        if not images:
+            msg = f"No images in {directory}"
+            raise ValueError(msg)
+
+        return images, labels
+
+    def parse_args(self) -> argparse.Namespace:
+        """
+        Parse CLI arguments for model tooling commands.
+        """
+        parser = argparse.ArgumentParser(prog="python -m cli.ml", description="Model export and evaluation tools.")
+        subparsers = parser.add_subparsers(dest="action", required=True)
+
+        # export-onnx command
+        parser_export = subparsers.add_parser("export-onnx", help="Export a .pth checkpoint to ONNX.")
+        parser_export.add_argument("weights", type=Path, help="Path to the .pth checkpoint.")
+        parser_export.add_argument("-o", "--output", type=Path, default=None, help="Target .onnx file.")
+
+        # compare command
+        parser_compare = subparsers.add_parser(
+            "compare",
+            help="Report agreement, probability drift and latency of a backend against eager FP32 PyTorch.",
+        )
+        parser_compare.add_argument("weights", type=Path, help="Path to the .pth checkpoint.")
+        parser_compare.add_argument(
+            "-b",
+            "--backend",
+            choices=[elem.value for elem in schemas.ml.ModelBackendEnum],
+            default=schemas.ml.ModelBackendEnum.ONNX.value,
+            help="Backend to compare.",
+        )
+        parser_compare.add_argument(
+            "-p",
+            "--precision",
+            choices=[elem.value for elem in schemas.ml.ModelPrecisionEnum],
+            default=schemas.ml.ModelPrecisionEnum.FP32.value,
+            help="Precision to compare.",
+        )
+        parser_compare.add_argument(
+            "-c",
+            "--compile",
+            choices=[elem.value for elem in CompileModeEnum],
+            default=CompileModeEnum.EAGER.value,
+            help="Compilation of a PyTorch candidate.",
+        )
+        parser_compare.add_argument("--images", type=Path, default=None, help="Directory with sample images.")
+        parser_compare.add_argument("--limit", type=int, default=32, help="Max number of sample images.")
+        parser_compare.add_argument("--batch-size", type=int, default=8, help="Batch size of a forward pass.")
+
+        # prune command
+        parser_prune = subparsers.add_parser(
+            "prune",
+            help="Remove attention heads, MLP channels and conv filters, report the cost against the dense model.",
+        )
+        parser_prune.add_argument("weights", type=Path, help="Path to the .pth checkpoint.")
+        parser_prune.add_argument("-o", "--output", type=Path, default=None, help="Target .pth file.")
+        parser_prune.add_argument("--heads", type=float, default=0.25, help="Share of attention heads to remove.")
+        parser_prune.add_argument("--mlp", type=float, default=0.25, help="Share of MLP hidden channels to remove.")
+        parser_prune.add_argument("--filters", type=float, default=0.25, help="Share of conv filters to remove.")
+        parser_prune.add_argument("--images", type=Path, default=None, help="Directory with sample images.")
+        parser_prune.add_argument("--limit", type=int, default=32, help="Max number of sample images.")
+        parser_prune.add_argument("--batch-size", type=int, default=8, help="Batch size of a forward pass.")
+
+        # cascade-fit command
+        parser_cascade_fit = subparsers.add_parser(
+            "cascade-fit",
+            help="Fit the ResNet + ABCD head of the cascade to the full model on sample images.",
+        )
+        parser_cascade_fit.add_argument("weights", type=Path, help="Path to the .pth checkpoint.")
+        parser_cascade_fit.add_argument("-o", "--output", type=Path, default=None, help="Target .cascade.pth file.")
+        parser_cascade_fit.add_argument(
+            "--images",
+            type=Path,
+            required=True,
+            help="Directory with real sample images.",
+        )
+        parser_cascade_fit.add_argument("--limit", type=int, default=256, help="Max number of sample images.")
+        parser_cascade_fit.add_argument("--epochs", type=int, default=300, help="Distillation epochs.")
+        parser_cascade_fit.add_argument("--batch-size", type=int, default=8, help="Batch size of a forward pass.")
+
+        # cascade-eval command
+        parser_cascade_eval = subparsers.add_parser(
+            "cascade-eval",
+            help="Report accuracy and latency of the cascade at every threshold against the full model.",
+        )
+        parser_cascade_eval.add_argument("weights", type=Path, help="Path to the .pth checkpoint.")
+        parser_cascade_eval.add_argument("--head", type=Path, default=None, help="Fitted .cascade.pth file.")
+        parser_cascade_eval.add_argument(
+            "--images",
+            type=Path,
+            required=True,
+            help="Directory with real sample images, BENIGN/MALIGNANT/ANOTHER subdirectories for accuracy.",
+        )
+        parser_cascade_eval.add_argument("--limit", type=int, default=64, help="Max number of sample images.")
+        parser_cascade_eval.add_argument(
+            "-t",
+            "--thresholds",
+            type=float,
+            nargs="+",
+            default=[0.5, 0.6, 0.7, 0.8, 0.9, 0.95],
+            help="Confidence thresholds to evaluate.",
+        )
+        parser_cascade_eval.add_argument("--batch-size", type=int, default=8, help="Batch size of a forward pass.")
+
+        return parser.parse_args()
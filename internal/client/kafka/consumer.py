@@ -1,7 +1,11 @@
-from collections.abc import Awaitable, Callable
+import asyncio
+import contextlib
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable
 from typing import Any, Self
 
 import aiokafka
+from aiokafka.errors import KafkaError
 from pydantic import BaseModel
 
 from internal.utils import errors, log
@@ -9,11 +13,23 @@ from internal.utils import errors, log
 logger = log.get_logger()
 
 
+BatchHandler = Callable[[list[aiokafka.ConsumerRecord]], Awaitable[list[bool] | None]]
+
+
+class KafkaBatchOptions(BaseModel):
+    # Records of one partition passed to one handler call
+    max_records: int = 16
+    # How long a poll waits for records when none are buffered
+    max_wait_ms: int = 500
+
+
 class KafkaActions:
     def __init__(self, prefix: str = "") -> None:
         self.prefix = prefix or ""
         self.handlers: list[tuple[str, Callable[[aiokafka.ConsumerRecord], Awaitable[None]]]] = []
         self.dict_handlers: dict[str, Callable[[aiokafka.ConsumerRecord], Awaitable[None]]] = {}
+        self.batch_handlers: list[tuple[str, BatchHandler, KafkaBatchOptions]] = []
+        self.dict_batch_handlers: dict[str, tuple[BatchHandler, KafkaBatchOptions]] = {}
 
     def read(self, topic_prefix: str) -> Callable[[Callable[[aiokafka.ConsumerRecord], Awaitable[None]]], None]:
         def wrapper(
@@ -24,8 +40,29 @@ class KafkaActions:
 
         return wrapper
 
+    def read_batch(
+        self,
+        topic_prefix: str,
+        max_records: int = 16,
+        max_wait_ms: int = 500,
+    ) -> Callable[[BatchHandler], None]:
+        """
+        The handler gets the records of one partition at once, in offset order, and returns
+        success of every record (None - all succeeded). An exception fails the whole batch.
+        """
+
+        def wrapper(func: BatchHandler) -> None:
+            options = KafkaBatchOptions(max_records=max(max_records, 1), max_wait_ms=max_wait_ms)
+            self.batch_handlers.append((self.prefix + topic_prefix, func, options))
+            self.dict_batch_handlers.clear()
+
+        return wrapper
+
     def include_action(self, kafka_action: Self) -> None:
         self.handlers.extend((self.prefix + name, func) for name, func in kafka_action.handlers)
+        self.batch_handlers.extend(
+            (self.prefix + name, func, options) for name, func, options in kafka_action.batch_handlers
+        )
 
     def get_handler(self, topic: str) -> Callable[[aiokafka.ConsumerRecord], Awaitable[None]]:
         handler = self.get_handlers().get(topic, None)
@@ -40,9 +77,15 @@ class KafkaActions:
             self.dict_handlers = dict(self.handlers)
         return self.dict_handlers
 
+    def get_batch_handlers(self) -> dict[str, tuple[BatchHandler, KafkaBatchOptions]]:
+        if not self.dict_batch_handlers:
+            self.dict_batch_handlers = {name: (func, options) for name, func, options in self.batch_handlers}
+        return self.dict_batch_handlers
+
     def get_topics(self) -> list[str]:
-        logger.info("%s", list(self.get_handlers().keys()))
-        return list(self.get_handlers().keys())
+        topics = list(dict.fromkeys([*self.get_handlers(), *self.get_batch_handlers()]))
+        logger.info("%s", topics)
+        return topics
 
 
 class KafkaConsumerConfig(BaseModel):
@@ -84,28 +127,309 @@ class KafkaConsumerConfig(BaseModel):
     sasl_oauth_token_provider: Any | None = None
 
 
+class KafkaConsumerStats(BaseModel):
+    received: int = 0
+    processed: int = 0
+    failed: int = 0
+    in_flight: int = 0
+    paused: bool = False
+    pauses: int = 0
+    commits: int = 0
+
+
+class PartitionOffsets:
+    """
+    Offsets of one partition taken by handlers. The committed offset is the first message
+    whose handler has not finished, so a restart never skips an unprocessed message.
+    """
+
+    def __init__(self) -> None:
+        self.in_flight: set[int] = set()
+        self.next_offset: int | None = None
+        self.committed: int | None = None
+
+    def start(self, offset: int) -> None:
+        self.in_flight.add(offset)
+
+    def finish(self, offset: int) -> None:
+        self.in_flight.discard(offset)
+        self.next_offset = max(self.next_offset or 0, offset + 1)
+
+    def get_commit_offset(self) -> int | None:
+        if self.next_offset is None:
+            return None
+        offset = min(self.in_flight) if self.in_flight else self.next_offset
+        if offset == self.committed:
+            return None
+        return offset
+
+
+class _DrainOnRevoke(aiokafka.ConsumerRebalanceListener):
+    def __init__(self, consumer: "KafkaConsumer") -> None:
+        self.consumer = consumer
+
+    async def on_partitions_revoked(self, revoked: set[aiokafka.TopicPartition]) -> None:
+        await self.consumer.drain(revoked)
+
+    async def on_partitions_assigned(self, assigned: set[aiokafka.TopicPartition]) -> None:
+        # Partitions handed over by a rebalance come unpaused
+        if self.consumer.stats.paused and assigned:
+            self.consumer.consumer.pause(*assigned)
+
+
 class KafkaConsumer(KafkaActions):
-    def __init__(self, prefix: str | None = None, kafka_config: KafkaConsumerConfig | None = None) -> None:
+    """
+    max_in_flight == 1 - messages are handled one by one in the order they are read.
+    max_in_flight > 1 - up to max_in_flight messages are handled concurrently: messages of one partition
+    (of one key within a partition with order_by_key) are handled in order, different partitions
+    are not ordered relative to each other. Offsets are committed only after the handlers finish.
+    A batch counts as its number of records, so it never has more records than free slots.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        prefix: str | None = None,
+        kafka_config: KafkaConsumerConfig | None = None,
+        max_in_flight: int = 1,
+        order_by_key: bool = False,  # noqa: FBT001, FBT002
+        poll_timeout_ms: int = 1000,
+        drain_timeout_s: float = 30.0,
+    ) -> None:
         super().__init__(prefix=prefix)
         self.kafka_config = kafka_config or KafkaConsumerConfig()
+        self.max_in_flight = max(max_in_flight, 1)
+        self.order_by_key = order_by_key
+        self.poll_timeout_ms = poll_timeout_ms
+        self.drain_timeout_s = drain_timeout_s
+        self.stats = KafkaConsumerStats()
+        self.consumer: aiokafka.AIOKafkaConsumer | None = None
+        self._stopping = False
+        self._lanes: dict[Hashable, deque[list[aiokafka.ConsumerRecord]]] = {}
+        self._lane_tasks: dict[Hashable, asyncio.Task] = {}
+        self._offsets: dict[aiokafka.TopicPartition, PartitionOffsets] = {}
+        self._slot_released = asyncio.Event()
+
+    @property
+    def concurrent(self) -> bool:
+        return self.max_in_flight > 1
 
     async def start(self) -> None:
-        self.consumer = aiokafka.consumer.AIOKafkaConsumer(
-            *self.get_topics(),
-            **self.kafka_config.model_dump(mode="python"),
-        )
+        if not self.concurrent:
+            self.consumer = aiokafka.consumer.AIOKafkaConsumer(
+                *self.get_topics(),
+                **self.kafka_config.model_dump(mode="python"),
+            )
+            await self.consumer.start()
+            await (self.run_batches() if self.get_batch_handlers() else self.run())
+            return
+
+        # Offsets are committed by the consumer itself once the handlers finish
+        config = self.kafka_config.model_copy(update={"enable_auto_commit": False})
+        self.consumer = aiokafka.consumer.AIOKafkaConsumer(**config.model_dump(mode="python"))
+        self.consumer.subscribe(topics=self.get_topics(), listener=_DrainOnRevoke(self))
         await self.consumer.start()
-        await self.run()
+        await self.run_concurrent()
 
     async def run(self) -> None:
         async for msg in self.consumer:
-            try:
-                handler = self.get_handler(msg.topic)
-                await handler(msg)
+            await self.handle(msg)
+
+    async def handle(self, msg: aiokafka.ConsumerRecord) -> bool:
+        try:
+            handler = self.get_handler(msg.topic)
+            await handler(msg)
+
+        except Exception:
+            logger.exception("Error while processing message:%.*s", 100, str(msg))
+            self.stats.failed += 1
+            return False
 
-            except Exception:
-                logger.exception("Error while processing message:%.*s", 100, str(msg))
+        self.stats.processed += 1
+        return True
+
+    async def handle_batch(self, records: list[aiokafka.ConsumerRecord]) -> list[bool]:
+        handler, _ = self.get_batch_handlers()[records[0].topic]
+        try:
+            result = await handler(records)
+            results = [True] * len(records) if result is None else list(result)
+
+        except Exception:
+            logger.exception("Error while processing batch: %s", self._describe(records))
+            results = [False] * len(records)
+
+        if len(results) != len(records):
+            logger.error("Batch handler returned %s results for %s", len(results), self._describe(records))
+            results = [False] * len(records)
+
+        failed = [msg.offset for msg, success in zip(records, results, strict=True) if not success]
+        if failed:
+            logger.warning("Failed messages of %s-%s: %s", records[0].topic, records[0].partition, failed)
+        self.stats.failed += len(failed)
+        self.stats.processed += len(records) - len(failed)
+        return results
+
+    async def handle_records(self, records: list[aiokafka.ConsumerRecord]) -> None:
+        if records[0].topic in self.get_batch_handlers():
+            await self.handle_batch(records)
+            return
+
+        for msg in records:
+            await self.handle(msg)
+
+    @staticmethod
+    def _describe(records: list[aiokafka.ConsumerRecord]) -> str:
+        return f"{records[0].topic}-{records[0].partition} offsets {records[0].offset}..{records[-1].offset}"
+
+    def get_poll_timeout_ms(self) -> int:
+        return min([self.poll_timeout_ms, *(options.max_wait_ms for _, options in self.get_batch_handlers().values())])
+
+    def split_records(self, records: list[aiokafka.ConsumerRecord]) -> list[list[aiokafka.ConsumerRecord]]:
+        """
+        Records of one partition as the units handlers get: single records, or chunks of up to
+        max_records of one lane for batch topics.
+        """
+        batch = self.get_batch_handlers().get(records[0].topic)
+        if batch is None:
+            return [[msg] for msg in records]
+
+        _, options = batch
+        lanes: dict[Hashable, list[aiokafka.ConsumerRecord]] = {}
+        for msg in records:
+            lanes.setdefault(self.get_lane_key(msg), []).append(msg)
+
+        return [
+            lane[index : index + options.max_records]
+            for lane in lanes.values()
+            for index in range(0, len(lane), options.max_records)
+        ]
+
+    async def run_batches(self) -> None:
+        """Sequential mode with batch handlers: records are polled with getmany instead of one by one."""
+        max_records = max(options.max_records for _, options in self.get_batch_handlers().values())
+        while not self._stopping:
+            batches = await self.consumer.getmany(timeout_ms=self.get_poll_timeout_ms(), max_records=max_records)
+            for records in batches.values():
+                for chunk in self.split_records(records):
+                    await self.handle_records(chunk)
+
+    async def run_concurrent(self) -> None:
+        while not self._stopping:
+            free = self.max_in_flight - self.stats.in_flight
+            if free <= 0:
+                self._pause()
+                self._slot_released.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._slot_released.wait(), timeout=self.poll_timeout_ms / 1000)
+                # Paused partitions return nothing, the call keeps the consumer in the group.
+                # Records that come anyway are handled above the limit rather than dropped
+                batches = await self.consumer.getmany(timeout_ms=0)
+                self.dispatch_batches(batches)
+                await self.commit()
                 continue
 
+            self._resume()
+            batches = await self.consumer.getmany(timeout_ms=self.get_poll_timeout_ms(), max_records=free)
+            self.dispatch_batches(batches)
+            await self.commit()
+
+    def dispatch_batches(self, batches: dict[aiokafka.TopicPartition, list[aiokafka.ConsumerRecord]]) -> None:
+        for records in batches.values():
+            for chunk in self.split_records(records):
+                self.dispatch(chunk)
+
+    def get_lane_key(self, msg: aiokafka.ConsumerRecord) -> Hashable:
+        if self.order_by_key:
+            return msg.topic, msg.partition, msg.key
+        return msg.topic, msg.partition
+
+    def dispatch(self, records: list[aiokafka.ConsumerRecord]) -> None:
+        """Queues the records to the lane of their partition (key), the lane handles them after the previous ones."""
+        msg = records[0]
+        self.stats.received += len(records)
+        self.stats.in_flight += len(records)
+        offsets = self._offsets.setdefault(aiokafka.TopicPartition(msg.topic, msg.partition), PartitionOffsets())
+        for elem in records:
+            offsets.start(elem.offset)
+
+        key = self.get_lane_key(msg)
+        self._lanes.setdefault(key, deque()).append(records)
+        if key not in self._lane_tasks:
+            self._lane_tasks[key] = asyncio.create_task(self._run_lane(key))
+
+    async def _run_lane(self, key: Hashable) -> None:
+        lane = self._lanes[key]
+        try:
+            while lane:
+                records = lane.popleft()
+                try:
+                    await self.handle_records(records)
+                finally:
+                    offsets = self._offsets.get(aiokafka.TopicPartition(records[0].topic, records[0].partition))
+                    if offsets is not None:
+                        for msg in records:
+                            offsets.finish(msg.offset)
+                    self.stats.in_flight -= len(records)
+                    self._slot_released.set()
+        finally:
+            self._lanes.pop(key, None)
+            self._lane_tasks.pop(key, None)
+
+    def _pause(self) -> None:
+        if self.stats.paused:
+            return
+        self.consumer.pause(*self.consumer.assignment())
+        self.stats.paused = True
+        self.stats.pauses += 1
+
+    def _resume(self) -> None:
+        if not self.stats.paused:
+            return
+        self.consumer.resume(*self.consumer.paused())
+        self.stats.paused = False
+
+    async def commit(self, partitions: set[aiokafka.TopicPartition] | None = None) -> None:
+        offsets = {
+            tp: offset
+            for tp, elem in self._offsets.items()
+            if (partitions is None or tp in partitions) and (offset := elem.get_commit_offset()) is not None
+        }
+        if not offsets:
+            return
+
+        try:
+            await self.consumer.commit(offsets)
+        except KafkaError:
+            # Not fatal: the messages are read again after a restart or rebalance
+            logger.exception("Error while committing offsets: %s", offsets)
+            return
+
+        for tp, offset in offsets.items():
+            self._offsets[tp].committed = offset
+        self.stats.commits += 1
+
+    async def drain(self, partitions: set[aiokafka.TopicPartition] | None = None) -> None:
+        """Waits for the handlers of the partitions (all when None) and commits their offsets."""
+        tasks = [
+            task
+            for key, task in self._lane_tasks.items()
+            if partitions is None or aiokafka.TopicPartition(key[0], key[1]) in partitions
+        ]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.drain_timeout_s)
+            if pending:
+                logger.warning("%s message handlers still running after %ss", len(pending), self.drain_timeout_s)
+
+        await self.commit(partitions)
+        for tp in partitions if partitions is not None else list(self._offsets):
+            offsets = self._offsets.get(tp)
+            if offsets is not None and not offsets.in_flight:
+                del self._offsets[tp]
+
     async def stop(self) -> None:
+        if self.consumer is None:
+            return
+
+        self._stopping = True
+        if self.concurrent:
+            await self.drain()
         await self.consumer.stop()
@@ -14,6 +14,17 @@ class StandEnum(str, Enum):
     PROD = "PROD"
 
 
+class ExecutorKindEnum(str, Enum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+class CompileModeEnum(str, Enum):
+    EAGER = "eager"
+    TRACE = "trace"
+    COMPILE = "compile"
+
+
 class AppSettings(BaseSettings):
     APP_NAME: str = "melcdl_backend"
     APP_VERSION: str = "0.1.0"
@@ -52,11 +63,20 @@ class AppSettings(BaseSettings):
     S3_CORE_BUCKET: str = ""
     S3_DIR_NAME_FILE: str = "file"
     S3_DIR_NAME_MODEL: str = "model"
+    S3_DIR_NAME_ABCD: str = "abcd"
 
     # kafka
     KAFKA_BOOTSTRAP_SERVERS: str
     KAFKA_GROUP_ID: str = APP_NAME
     KAFKA_TOPIC_MELANOMA_ML: str = "melanoma-detection"
+    # Messages handled at once, 1 - messages are handled one by one with auto commit.
+    # Above 1 the consumer pauses partitions at the limit and commits offsets after the handlers finish
+    KAFKA_MAX_IN_FLIGHT: int = 1
+    # Keep order per message key instead of per partition
+    KAFKA_ORDER_BY_KEY: bool = False
+    # Melanoma tasks handled by one call, their images share the micro-batches of the inference engine
+    KAFKA_BATCH_MAX_RECORDS: int = 8
+    KAFKA_BATCH_MAX_WAIT_MS: int = 100
 
     CACHE_TTL: int = 300
 
@@ -65,6 +85,81 @@ class AppSettings(BaseSettings):
 
     ML_DEVICE: str = "cuda" if torch.cuda.is_available() else "cpu"
 
+    # 0 - unlimited
+    ML_REGISTRY_MAX_MODELS: int = 4
+    ML_REGISTRY_MAX_BYTES: int = 0
+
+    ML_BATCH_MAX_SIZE: int = 8
+    ML_BATCH_MAX_WAIT_MS: float = 10.0
+
+    # Number of fixed augmentations used when a caller asks for test-time augmentation
+    ML_TTA_VIEWS: int = 4
+
+    # Cores of the node split between APP_WORKERS: torch intra-op threads per inference call,
+    # OpenCV threads and pool sizes are derived from a worker's share, applied at worker start
+    ML_CPU_BUDGET: bool = True
+    # 0 - detected from the CPU affinity and the cgroup quota
+    ML_CPU_CORES: int = 0
+    ML_TORCH_INTER_OP_THREADS: int = 1
+    # Pin every worker (and its pool processes) to its own slice of the cores
+    ML_CPU_AFFINITY: bool = False
+
+    ML_EXECUTOR_KIND: ExecutorKindEnum = ExecutorKindEnum.THREAD
+    ML_EXECUTOR_WORKERS: int = 1
+    ML_EXECUTOR_MAX_QUEUE: int = 32
+
+    # Synchronous predictions (POST /models/): requests running at once, requests waiting for them
+    # (429 beyond that) and the deadline of a request including its wait (503 when exceeded)
+    ML_PREDICT_MAX_CONCURRENCY: int = 4
+    ML_PREDICT_MAX_QUEUE: int = 16
+    ML_PREDICT_TIMEOUT_MS: float = 30000.0
+
+    # Images are decoded close to this size (JPEG DCT scaling, integer reduce otherwise), 0 - full resolution.
+    # Reduced decoding changes the pixels the model sees, enable it only after checking the predictions against it
+    ML_DECODE_IMAGE_SIZE: int = 0
+    # Decode size for ABCD extraction: its features (e.g. diameter) depend on the resolution, 0 - full resolution
+    ML_ABCD_IMAGE_SIZE: int = 0
+
+    # Write file/<id>.npz with the resized model input and ABCD vector right after upload
+    ML_PREPROCESS_ON_UPLOAD: bool = False
+
+    ML_ABCD_EXECUTOR_KIND: ExecutorKindEnum = ExecutorKindEnum.PROCESS
+    ML_ABCD_EXECUTOR_WORKERS: int = 2
+    ML_ABCD_CACHE_SIZE: int = 4096
+    ML_ABCD_PERSIST: bool = True
+
+    # BF16 models run in FP32 where the CPU has no native bfloat16 (AVX512-BF16/AMX), False - emulated bf16
+    # as well, e.g. to check the parity of a model with `python -m cli.ml compare -p BF16` on a dev machine
+    ML_BF16_REQUIRE_NATIVE: bool = True
+
+    # Optional graph compilation of PyTorch models right after the weights are loaded, eager on failure.
+    # Not applied to models run stage by stage (ML_EMBEDDING_CACHE, ML_CASCADE_THRESHOLD)
+    ML_COMPILE_MODE: CompileModeEnum = CompileModeEnum.EAGER
+    # Batch sizes of the warm-up passes, empty - no warm-up
+    ML_WARMUP_BATCH_SIZES: list[int] = [1, 8]
+    ML_WARMUP_ON_STARTUP: bool = True
+    # Ids or names of the models preloaded at worker start, empty - every available model
+    ML_PRELOAD_MODELS: list[str] = []
+    # Preload the model of the synchronous endpoint (POST /models/) as well
+    ML_PRELOAD_PREDICT_MODEL: bool = True
+    # Poll S3 for new weights of the available models and swap the loaded ones in the background, 0 - off
+    ML_MODEL_WATCH_INTERVAL_S: float = 60.0
+
+    # Backbone features of PyTorch models cached by image content, only the head runs on a hit
+    ML_EMBEDDING_CACHE: bool = True
+    ML_EMBEDDING_CACHE_SIZE: int = 1024
+    # Also keep features on disk, one .npy per image and nothing evicts them: mount a bounded volume
+    ML_EMBEDDING_CACHE_PERSIST: bool = False
+    ML_EMBEDDING_CACHE_DIR: Path = "./data/embeddings"
+
+    # Cascade of PyTorch models: the ResNet + ABCD head first, the ViT branch only for images it classifies
+    # with a lower confidence, 0 - off. Needs <checkpoint>.cascade.pth from `python -m cli.ml cascade-fit`
+    ML_CASCADE_THRESHOLD: float = 0.0
+
+    ML_ONNX_OPSET: int = 17
+    # 0 - the CPU budget of the worker (onnxruntime default when ML_CPU_BUDGET is off)
+    ML_ONNX_INTRA_OP_THREADS: int = 0
+
     DEFAULT_BATCH_SIZE: int = 1000
 
     @field_validator("DATABASE_URL", mode="before")
@@ -0,0 +1,191 @@
+import fcntl
+import math
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import TextIO
+
+import cv2
+import torch
+from pydantic import BaseModel
+
+from internal.utils import log
+
+from .base import get_config
+
+logger = log.get_logger()
+
+CGROUP_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+CPUINFO = Path("/proc/cpuinfo")
+# Native bfloat16 matmuls, oneDNN emulates them on other x86 CPUs slower than FP32
+BF16_CPU_FLAGS = frozenset({"avx512_bf16", "amx_bf16"})
+
+# Claimed CPU slice and its lock file, held open for the lifetime of the worker
+_slot_lock: tuple[int, TextIO] | None = None
+
+
+class CpuLayout(BaseModel):
+    """
+    Share of the cores of one worker process.
+    intra_op_threads are used by every concurrent inference call, so a worker runs at most
+    executor_workers * intra_op_threads compute threads, ABCD pool processes are single-threaded.
+    """
+
+    cores: int
+    workers: int
+    slot: int | None = None
+    # Empty - the worker is not pinned
+    cpus: list[int] = []
+    intra_op_threads: int
+    inter_op_threads: int
+    opencv_threads: int
+    executor_workers: int
+    abcd_workers: int
+
+
+def _read_cgroup_quota() -> int | None:
+    """Cores allowed by the cgroup v2 quota ("200000 100000" - 2 cores), None when unlimited."""
+    try:
+        quota, period = CGROUP_CPU_MAX.read_text().split()[:2]
+        return max(math.ceil(int(quota) / int(period)), 1)
+    except (OSError, ValueError):
+        return None
+
+
+def detect_cpus() -> tuple[list[int], int]:
+    """CPUs the process may run on and the number of cores it may actually use."""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+    quota = _read_cgroup_quota()
+    return cpus, min(len(cpus), quota) if quota else len(cpus)
+
+
+@lru_cache(maxsize=1)
+def cpu_supports_bf16() -> bool:
+    try:
+        flags = set(CPUINFO.read_text().split())
+    except OSError:
+        return False
+
+    return bool(flags & BF16_CPU_FLAGS) and torch.backends.mkldnn.is_available()
+
+
+def plan_cpu_layout(  # noqa: PLR0913
+    cpus: list[int],
+    cores: int,
+    workers: int,
+    executor_workers: int,
+    abcd_workers: int,
+    inter_op_threads: int = 1,
+    slot: int | None = None,
+) -> CpuLayout:
+    workers = max(workers, 1)
+    executor_workers = max(executor_workers, 1)
+    share = max(cores // workers, 1)
+    intra_op_threads = max(share // executor_workers, 1)
+
+    pinned = []
+    if slot is not None and cpus:
+        # More workers than cores: slices wrap around and are shared
+        start = (slot * share) % len(cpus)
+        pinned = sorted((cpus[start:] + cpus[:start])[:share])
+
+    return CpuLayout(
+        cores=cores,
+        workers=workers,
+        slot=slot,
+        cpus=pinned,
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=max(inter_op_threads, 1),
+        opencv_threads=intra_op_threads,
+        executor_workers=executor_workers,
+        abcd_workers=max(min(abcd_workers, share), 1),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_cpu_layout() -> CpuLayout:
+    settings = get_config()
+    cpus, cores = detect_cpus()
+    return plan_cpu_layout(
+        cpus=cpus,
+        cores=settings.ML_CPU_CORES or cores,
+        workers=settings.APP_WORKERS,
+        executor_workers=settings.ML_EXECUTOR_WORKERS,
+        abcd_workers=settings.ML_ABCD_EXECUTOR_WORKERS,
+        inter_op_threads=settings.ML_TORCH_INTER_OP_THREADS,
+    )
+
+
+def set_thread_limits(intra_op_threads: int, inter_op_threads: int, opencv_threads: int) -> None:
+    """
+    Thread pools of torch and OpenCV in the current process, also the initializer of pool processes.
+    """
+    torch.set_num_threads(intra_op_threads)
+    if torch.get_num_interop_threads() != inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Only possible before the first inter-op parallel work of the process
+            logger.warning("Torch inter-op pool already started with %s threads", torch.get_num_interop_threads())
+    cv2.setNumThreads(opencv_threads)
+
+
+def _claim_slot(workers: int) -> int | None:
+    """
+    Index of a free CPU slice: the first lock file of the service nobody holds.
+    A restarted worker takes over the slice of the one it replaces.
+    """
+    global _slot_lock  # noqa: PLW0603
+
+    if _slot_lock is not None:
+        return _slot_lock[0]
+
+    directory = Path(tempfile.gettempdir())
+    for slot in range(max(workers, 1)):
+        lock = (directory / f"{get_config().APP_NAME}-cpu-slot-{slot}.lock").open("w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            continue
+
+        _slot_lock = (slot, lock)
+        return slot
+
+    return None
+
+
+def apply_cpu_layout() -> CpuLayout | None:
+    """
+    Applies the CPU budget to the current worker, called once at worker start
+    before any model is loaded. Threads started earlier keep their affinity.
+    """
+    settings = get_config()
+    if not settings.ML_CPU_BUDGET:
+        return None
+
+    layout = get_cpu_layout()
+    if settings.ML_CPU_AFFINITY and hasattr(os, "sched_setaffinity"):
+        cpus, _ = detect_cpus()
+        slot = _claim_slot(layout.workers)
+        if slot is not None:
+            layout = plan_cpu_layout(
+                cpus=cpus,
+                cores=layout.cores,
+                workers=layout.workers,
+                executor_workers=layout.executor_workers,
+                abcd_workers=layout.abcd_workers,
+                inter_op_threads=layout.inter_op_threads,
+                slot=slot,
+            )
+            os.sched_setaffinity(0, layout.cpus)
+        else:
+            logger.warning("No free CPU slice for worker %s, it is not pinned", os.getpid())
+
+    set_thread_limits(layout.intra_op_threads, layout.inter_op_threads, layout.opencv_threads)
+
+    logger.info("CPU layout of worker %s: %s", os.getpid(), layout.model_dump_json())
+
+    return layout
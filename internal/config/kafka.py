@@ -36,4 +36,9 @@ def get_consumer_config() -> KafkaConsumerConfig:
 
 @lru_cache(maxsize=1)
 def get_kafka_consumer() -> KafkaConsumer:
-    return KafkaConsumer(kafka_config=get_consumer_config())
+    settings = get_config()
+    return KafkaConsumer(
+        kafka_config=get_consumer_config(),
+        max_in_flight=settings.KAFKA_MAX_IN_FLIGHT,
+        order_by_key=settings.KAFKA_ORDER_BY_KEY,
+    )
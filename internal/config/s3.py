@@ -1,4 +1,6 @@
+import contextlib
 from collections.abc import AsyncGenerator
+from contextlib import AbstractAsyncContextManager
 from functools import lru_cache
 
 import aioboto3
@@ -21,3 +23,11 @@ async def get_s3_client() -> AsyncGenerator[AioBaseClient]:
     session = get_s3_session()
     async with session.client("s3", endpoint_url=settings.S3_URL) as client:
         yield client
+
+
+def use_s3_client(client: AioBaseClient | None = None) -> AbstractAsyncContextManager[AioBaseClient]:
+    """The client of the caller kept open on exit, or a new client closed on exit."""
+    if client is not None:
+        return contextlib.nullcontext(client)
+
+    return get_s3_session().client("s3", endpoint_url=get_config().S3_URL)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String, false
 
 from internal.utils.crypto import get_max_length_str_fernet
 
@@ -11,6 +11,14 @@ class Models(UUIDModel, SoftModel):
     name = Column(String(length=256), nullable=False)
     s3_path = Column(String(), nullable=False)
     is_exists = Column(Boolean(), default=False, nullable=False)
+    backend = Column(String(length=256), default="PYTORCH", server_default="PYTORCH", nullable=False)
+    precision = Column(String(length=256), default="FP32", server_default="FP32", nullable=False)
+    # Reuse predictions of identical images, only for models with deterministic inference
+    deduplicate = Column(Boolean(), default=False, server_default=false(), nullable=False)
+    # SHA-256 of the weights of the current version, bumped by the model watcher when the S3 object changes
+    checksum = Column(String(length=64), nullable=True)
+    version = Column(Integer(), default=1, server_default="1", nullable=False)
+    s3_etag = Column(String(length=256), nullable=True)
 
 
 class Files(UUIDModel, SoftModel):
@@ -20,6 +28,7 @@ class Files(UUIDModel, SoftModel):
     s3_path = Column(String(), nullable=False)
     type_file = Column(String(length=256), nullable=False)
     user_id = Column(ForeignKey("user.id"))
+    content_hash = Column(String(length=64), nullable=True, index=True)
 
 
 class Predicts(UUIDModel):
@@ -29,6 +38,11 @@ class Predicts(UUIDModel):
     model_id = Column(ForeignKey("models.id"))
     result = Column(Integer(), nullable=False)
     probability = Column(Float(), nullable=False)
+    tta = Column(Boolean(), default=False, server_default=false(), nullable=False)
+    # InferencePathEnum: full model or the cascade stage that produced the result
+    inference_path = Column(String(length=32), default="FULL", server_default="FULL", nullable=False)
+    # Models.version of the weights that produced the result, predictions of older weights are not reused
+    model_version = Column(Integer(), default=1, server_default="1", nullable=False)
 
 
 class Tasks(UUIDModel, SoftModel):
@@ -1,6 +1,7 @@
 from enum import Enum, auto
+from typing import Self
 
-from pydantic import UUID4, BaseModel, HttpUrl
+from pydantic import UUID4, BaseModel, Field, HttpUrl, model_validator
 
 from . import base
 
@@ -12,6 +13,34 @@ class StatusEnum(base.BaseEnum):
     UPLOAD = auto()
 
 
+class ModelBackendEnum(base.BaseEnum):
+    PYTORCH = auto()
+    ONNX = auto()
+
+
+class ModelPrecisionEnum(base.BaseEnum):
+    FP32 = auto()
+    INT8 = auto()
+    # bfloat16 autocast of the PyTorch backend, FP32 on devices without native support
+    BF16 = auto()
+
+
+class ModelLoadStateEnum(base.BaseEnum):
+    PENDING = auto()
+    LOADING = auto()
+    READY = auto()
+    FAILED = auto()
+
+
+class InferencePathEnum(base.BaseEnum):
+    # Full model
+    FULL = auto()
+    # Cascade: the ResNet + ABCD head was confident enough
+    FAST = auto()
+    # Cascade: the ResNet + ABCD head was not confident, the ViT branch ran as well
+    ESCALATED = auto()
+
+
 class PredictEnum(int, Enum):
     BENIGN = 0
     MALIGNANT = auto()
@@ -34,6 +63,7 @@ class FileSchema(base.UpdatedMixinSchema, base.CreatedMixinSchema, base.UUIDMixi
 
 
 class PredictSchema(base.UUIDMixinSchema):
+    model_id: UUID4 | None = None
     result: str
     probability: float
 
@@ -43,11 +73,23 @@ class TaskResponseSchema(base.UpdatedMixinSchema, base.CreatedMixinSchema, base.
     message: str = ""
     file: FileSchema | None = None
     predict: PredictSchema | None = None
+    # All predictions of the task file, one per model for multi-model tasks
+    predicts: list[PredictSchema] = Field(default_factory=list)
 
 
 class KafkaInputMessageSchema(BaseModel):
     task_id: UUID4
-    model_id: UUID4
+    model_id: UUID4 | None = None
+    # Multi-model task: the file is scored by every model with shared preprocessing
+    model_ids: list[UUID4] = []
+    tta: bool = False
+
+    @model_validator(mode="after")
+    def check_models(self) -> Self:
+        if not self.model_id and not self.model_ids:
+            msg = "model_id or model_ids is required"
+            raise ValueError(msg)
+        return self
 
 
 class ModelSchema(base.UUIDMixinSchema):
@@ -1,3 +1,7 @@
+from pydantic import UUID4
+from sqlalchemy import update
+from sqlalchemy.future import select
+
 from internal.entities import models
 
 from .base import BaseRepository
@@ -10,10 +14,45 @@ class TasksRepository(BaseRepository[models.Tasks]):
 class PredictsRepository(BaseRepository[models.Predicts]):
     _default_model = models.Predicts
 
+    async def filter_by_content(
+        self,
+        content_hash: str,
+        model_id: UUID4,
+        model_version: int,
+        *,
+        tta: bool,
+    ) -> models.Predicts | None:
+        """Предсказание текущей версии модели для неудалённого файла по хешу содержимого"""
+        qs = (
+            select(self.model)
+            .join(models.Files, models.Files.id == self.model.file_id)
+            .filter(
+                models.Files.content_hash == content_hash,
+                models.Files.deleted_on.is_(None),
+                self.model.model_id == model_id,
+                self.model.model_version == model_version,
+                self.model.tta == tta,
+            )
+            .limit(1)
+        )
+        result = await self.session.execute(qs)
+        return result.scalar_one_or_none()
+
 
 class ModelsRepository(BaseRepository[models.Models]):
     _default_model = models.Models
 
+    async def bump_version(self, obj: models.Models, checksum: str, s3_etag: str | None) -> bool:
+        """Следующая версия весов модели, False если другой воркер уже поднял версию"""
+        qs = (
+            update(self.model)
+            .where(self.model.id == obj.id, self.model.version == obj.version)
+            .values(version=self.model.version + 1, checksum=checksum, s3_etag=s3_etag)
+        )
+        result = await self.session.execute(qs)
+        await self.session.refresh(obj)
+        return result.rowcount == 1
+
 
 class FilesRepository(BaseRepository[models.Files]):
     _default_model = models.Files
@@ -0,0 +1,151 @@
+import json
+from collections import OrderedDict
+from functools import lru_cache, partial
+
+import numpy as np
+from aiobotocore.client import AioBaseClient
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+
+from internal.config import get_config
+from internal.config.cpu import get_cpu_layout, set_thread_limits
+from internal.config.s3 import use_s3_client
+from internal.services.ml.executor import InferenceExecutor
+from internal.services.ml.model import BaseInferenceModel
+from internal.utils import log
+from internal.utils.crypto import hash_content
+
+logger = log.get_logger()
+
+
+class ABCDFeatureStats(BaseModel):
+    memory_hits: int = 0
+    store_hits: int = 0
+    computed: int = 0
+
+
+def compute_abcd_vectors(images: list[bytes], size: int | None = None) -> list[list[float]]:
+    return [
+        BaseInferenceModel.get_abcd_vector(np.array(BaseInferenceModel.open_image(elem, size=size))) for elem in images
+    ]
+
+
+class ABCDFeatureService:
+    """
+    ABCD features extracted once per image content.
+    Lookup order: in-process LRU, S3 sidecar (<S3_DIR_NAME_ABCD>/<sha256>[_<image_size>].json), process pool.
+    """
+
+    def __init__(
+        self,
+        executor: InferenceExecutor,
+        max_cache: int = 4096,
+        image_size: int | None = None,
+        *,
+        persist: bool = True,
+    ) -> None:
+        self.executor = executor
+        self.image_size = image_size
+        self.max_cache = max_cache
+        self.persist = persist
+        self.stats = ABCDFeatureStats()
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+
+    async def get_features(self, images: list[bytes], s3: AioBaseClient | None = None) -> list[list[float]]:
+        hashes = [hash_content(elem) for elem in images]
+        result: dict[str, list[float]] = {}
+
+        for content_hash in hashes:
+            if content_hash in self._cache:
+                self._cache.move_to_end(content_hash)
+                result[content_hash] = self._cache[content_hash]
+                self.stats.memory_hits += 1
+
+        missing = {
+            content_hash: image
+            for content_hash, image in zip(hashes, images, strict=True)
+            if content_hash not in result
+        }
+
+        if missing and self.persist:
+            stored = await self._load(list(missing), s3=s3)
+            self.stats.store_hits += len(stored)
+            result.update(stored)
+            missing = {content_hash: image for content_hash, image in missing.items() if content_hash not in stored}
+
+        computed: dict[str, list[float]] = {}
+        if missing:
+            vectors = await self.executor.run(compute_abcd_vectors, list(missing.values()), self.image_size)
+            computed = dict(zip(missing, vectors, strict=True))
+            self.stats.computed += len(computed)
+            result.update(computed)
+
+            if self.persist:
+                await self._save(computed, s3=s3)
+
+        for content_hash in hashes:
+            self._remember(content_hash, result[content_hash])
+
+        return [result[content_hash] for content_hash in hashes]
+
+    def _remember(self, content_hash: str, vector: list[float]) -> None:
+        self._cache[content_hash] = vector
+        self._cache.move_to_end(content_hash)
+        while len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+
+    def _get_key(self, content_hash: str) -> str:
+        # Features depend on the decode resolution, full resolution keeps the original key
+        name = f"{content_hash}_{self.image_size}" if self.image_size else content_hash
+        return f"{get_config().S3_DIR_NAME_ABCD.strip('/')}/{name}.json"
+
+    async def _load(self, hashes: list[str], s3: AioBaseClient | None = None) -> dict[str, list[float]]:
+        settings = get_config()
+        result = {}
+        try:
+            async with use_s3_client(s3) as client:
+                for content_hash in hashes:
+                    try:
+                        resp = await client.get_object(Bucket=settings.S3_CORE_BUCKET, Key=self._get_key(content_hash))
+                    except ClientError:
+                        continue
+
+                    result[content_hash] = json.loads(await resp["Body"].read())
+        except Exception:
+            logger.exception("Error while reading ABCD features from S3")
+
+        return result
+
+    async def _save(self, vectors: dict[str, list[float]], s3: AioBaseClient | None = None) -> None:
+        settings = get_config()
+        try:
+            async with use_s3_client(s3) as client:
+                for content_hash, vector in vectors.items():
+                    await client.put_object(
+                        Bucket=settings.S3_CORE_BUCKET,
+                        Key=self._get_key(content_hash),
+                        Body=json.dumps(vector).encode(),
+                    )
+        except Exception:
+            logger.exception("Error while saving ABCD features to S3")
+
+
+@lru_cache(maxsize=1)
+def get_abcd_service() -> ABCDFeatureService:
+    settings = get_config()
+    max_workers, initializer = settings.ML_ABCD_EXECUTOR_WORKERS, None
+    if settings.ML_CPU_BUDGET:
+        # One image per process, parallelism comes from the number of processes
+        max_workers, initializer = get_cpu_layout().abcd_workers, partial(set_thread_limits, 1, 1, 1)
+
+    return ABCDFeatureService(
+        executor=InferenceExecutor(
+            kind=settings.ML_ABCD_EXECUTOR_KIND,
+            max_workers=max_workers,
+            max_queue=settings.ML_EXECUTOR_MAX_QUEUE,
+            initializer=initializer,
+        ),
+        max_cache=settings.ML_ABCD_CACHE_SIZE,
+        image_size=settings.ML_ABCD_IMAGE_SIZE or None,
+        persist=settings.ML_ABCD_PERSIST,
+    )
@@ -0,0 +1,108 @@
+import asyncio
+import math
+import time
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
+
+from pydantic import BaseModel
+
+from internal.config import get_config
+from internal.utils import errors, log
+from internal.utils.metrics import TimingStats
+
+logger = log.get_logger()
+
+
+class AdmissionStats(BaseModel):
+    admitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    # Queue full - 429
+    rejected: int = 0
+    # Deadline exceeded while waiting or running - 503
+    timed_out: int = 0
+    waiting: int = 0
+    in_flight: int = 0
+    max_depth: int = 0
+    queue_wait: TimingStats = TimingStats()
+    execution: TimingStats = TimingStats()
+
+
+class AdmissionQueue:
+    """
+    Bounded queue in front of synchronous inference: at most max_concurrency requests run,
+    max_queue more wait for a slot and the rest are rejected right away instead of piling up in memory.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 16, timeout_ms: float = 30000.0) -> None:
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max(max_queue, 0)
+        self.timeout = timeout_ms / 1000 if timeout_ms > 0 else None
+        self.stats = AdmissionStats()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    @property
+    def depth(self) -> int:
+        return self.stats.waiting + self.stats.in_flight
+
+    def retry_after(self) -> int:
+        """Seconds until the queue is expected to drain, from the mean execution time."""
+        execution = self.stats.execution
+        mean = execution.total_seconds / execution.count if execution.count else 1.0
+        return max(math.ceil(mean * math.ceil((self.depth + 1) / self.max_concurrency)), 1)
+
+    async def run[T](self, func: Callable[[], Awaitable[T]]) -> T:
+        if self.depth >= self.max_concurrency + self.max_queue:
+            self.stats.rejected += 1
+            raise errors.TooManyRequestsError(headers=self._get_headers())
+
+        submitted = time.monotonic()
+        self.stats.admitted += 1
+        self.stats.max_depth = max(self.stats.max_depth, self.depth + 1)
+        try:
+            async with asyncio.timeout(self.timeout):
+                return await self._run(func, submitted)
+        except TimeoutError:
+            self.stats.timed_out += 1
+            logger.warning("Prediction deadline of %s s exceeded", self.timeout)
+            raise errors.ServiceUnavailableError(
+                detail="Prediction deadline exceeded",
+                headers=self._get_headers(),
+            ) from None
+
+    async def _run[T](self, func: Callable[[], Awaitable[T]], submitted: float) -> T:
+        self.stats.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats.waiting -= 1
+
+        started = time.monotonic()
+        self.stats.queue_wait.observe(started - submitted)
+        self.stats.in_flight += 1
+        try:
+            result = await func()
+        except Exception:
+            self.stats.failed += 1
+            raise
+        finally:
+            self.stats.in_flight -= 1
+            self._slots.release()
+
+        self.stats.completed += 1
+        self.stats.execution.observe(time.monotonic() - started)
+
+        return result
+
+    def _get_headers(self) -> dict[str, str]:
+        return {"type": "application/json", "Retry-After": str(self.retry_after())}
+
+
+@lru_cache(maxsize=1)
+def get_admission_queue() -> AdmissionQueue:
+    settings = get_config()
+    return AdmissionQueue(
+        max_concurrency=settings.ML_PREDICT_MAX_CONCURRENCY,
+        max_queue=settings.ML_PREDICT_MAX_QUEUE,
+        timeout_ms=settings.ML_PREDICT_TIMEOUT_MS,
+    )
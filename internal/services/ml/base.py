@@ -1,52 +1,154 @@
-import io
+import asyncio
 import math
 import uuid
+import zipfile
+from collections.abc import Awaitable, Callable
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
+from aiobotocore.client import AioBaseClient
 from botocore.config import Config
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import UploadFile, status
-from PIL import Image
 from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from internal.client.kafka.producer import KafkaProducer
 from internal.config import get_config
 from internal.config.models import get_async_session
-from internal.config.s3 import get_s3_session
+from internal.config.s3 import get_s3_session, use_s3_client
 from internal.entities import models, schemas
 from internal.repositories.ml import FilesRepository, ModelsRepository, PredictsRepository, TasksRepository
 from internal.services.crypto import CryptoService
-from internal.services.ml.model import PyTorchModel
+from internal.services.ml.abcd import get_abcd_service
+from internal.services.ml.admission import get_admission_queue
+from internal.services.ml.batching import get_inference_engine
+from internal.services.ml.embeddings import get_embedding_cache, set_content_hash
+from internal.services.ml.executor import get_inference_executor
+from internal.services.ml.model import BaseInferenceModel, Prediction, PyTorchModel
+from internal.services.ml.onnx_model import OnnxModel, export_onnx, quantize_onnx
+from internal.services.ml.preprocess import (
+    PreprocessedImage,
+    build_artifact,
+    decode_image,
+    get_artifact_key,
+    read_artifact,
+)
+from internal.services.ml.readiness import get_readiness_tracker
+from internal.services.ml.registry import get_model_registry
 from internal.utils import errors, log
+from internal.utils.crypto import hash_content, hash_file
 from internal.utils.helper import async_log_error
-from internal.utils.resnet_abcd_swin import ResNetCosineSwinModel
+from internal.utils.metrics import ProcessMemoryStats
+from internal.utils.resnet_abcd_swin import build_inference_model
 
 logger = log.get_logger()
 
+# Strong references to fire-and-forget tasks, the event loop keeps only weak ones
+_background_tasks: set[asyncio.Task] = set()
+
+
+class PredictJob(NamedTuple):
+    """Forward pass of a single-model task, detached from the session that read it."""
+
+    task_id: UUID4
+    file_id: UUID4
+    file_path: str
+    content_hash: str | None
+    model_id: UUID4
+    model_file: str
+    backend: str
+    precision: str
+    version: int
+    tta: bool
+
 
 class MLService:
+    # Model of the synchronous endpoint (POST /models/)
+    PREDICT_MODEL_FILE = "resnet18_melanoma_with_abcd_swin.pth"
+
     @classmethod
-    async def upload_img(
+    async def upload_img(  # noqa: PLR0913
         cls,
         user_id: UUID4,
         file: UploadFile,
         session: AsyncSession,
         model_pk: UUID4,
         producer: KafkaProducer,
+        *,
+        tta: bool = False,
     ) -> schemas.ml.TaskCreateResponseSchema:
         if not file.content_type.startswith("image/"):
             raise errors.BadRequestError(detail="INCORRECT_FILE_TYPE")
 
-        settings = get_config()
-
-        model_repo = ModelsRepository(session=session)
-
-        model = await model_repo.get(pk=model_pk)
+        model = await ModelsRepository(session=session).get(pk=model_pk)
         if not model:
             raise errors.NotFoundError(detail="Not found model")
 
+        task = await cls.create_upload_task(user_id=user_id, file=file, session=session)
+
+        await producer.send(
+            get_config().KAFKA_TOPIC_MELANOMA_ML,
+            schemas.ml.KafkaInputMessageSchema(task_id=task.id, model_id=model.id, tta=tta).model_dump_json(),
+        )
+
+        return schemas.ml.TaskCreateResponseSchema(
+            id=task.id,
+            status=task.status,
+            created_on=task.created_on,
+            updated_on=task.updated_on,
+        )
+
+    @classmethod
+    async def upload_img_models(  # noqa: PLR0913
+        cls,
+        user_id: UUID4,
+        file: UploadFile,
+        session: AsyncSession,
+        producer: KafkaProducer,
+        model_pks: list[UUID4] | None = None,
+        *,
+        tta: bool = False,
+    ) -> schemas.ml.TaskCreateResponseSchema:
+        """
+        One task scoring the file with several models, all available models when model_pks is empty.
+        """
+        if not file.content_type.startswith("image/"):
+            raise errors.BadRequestError(detail="INCORRECT_FILE_TYPE")
+
+        if model_pks:
+            model_repo = ModelsRepository(session=session)
+            model_ids = list(dict.fromkeys(model_pks))
+            for model_id in model_ids:
+                if not await model_repo.filter(id=model_id, is_exists=True):
+                    raise errors.NotFoundError(detail="Not found model")
+        else:
+            model_ids = [elem.id for elem in await cls.get_models(session=session)]
+            if not model_ids:
+                raise errors.NotFoundError(detail="Not found model")
+
+        task = await cls.create_upload_task(user_id=user_id, file=file, session=session)
+
+        await producer.send(
+            get_config().KAFKA_TOPIC_MELANOMA_ML,
+            schemas.ml.KafkaInputMessageSchema(task_id=task.id, model_ids=model_ids, tta=tta).model_dump_json(),
+        )
+
+        return schemas.ml.TaskCreateResponseSchema(
+            id=task.id,
+            status=task.status,
+            created_on=task.created_on,
+            updated_on=task.updated_on,
+        )
+
+    @classmethod
+    async def create_upload_task(cls, user_id: UUID4, file: UploadFile, session: AsyncSession) -> models.Tasks:
+        """
+        Puts the upload to S3 and creates its file and task, the task is committed before it is sent to Kafka.
+        """
+        settings = get_config()
+
         file_repo, task_repo = FilesRepository(session=session), TasksRepository(session=session)
 
         file_id = uuid.uuid4()
@@ -91,22 +193,18 @@ class MLService:
             user_id=user_id,
             s3_path=file_path,
             type_file=file.content_type,
+            content_hash=hash_content(content),
         )
         task = await task_repo.create(file_id=file.id, status=schemas.ml.StatusEnum.UPLOAD, user_id=user_id)
 
         await session.commit()
 
-        await producer.send(
-            settings.KAFKA_TOPIC_MELANOMA_ML,
-            schemas.ml.KafkaInputMessageSchema(task_id=task.id, model_id=model.id).model_dump_json(),
-        )
+        if settings.ML_PREPROCESS_ON_UPLOAD:
+            background = asyncio.create_task(cls.preprocess_file(file_id=file.id, content=content))
+            _background_tasks.add(background)
+            background.add_done_callback(_background_tasks.discard)
 
-        return schemas.ml.TaskCreateResponseSchema(
-            id=task.id,
-            status=task.status,
-            created_on=task.created_on,
-            updated_on=task.updated_on,
-        )
+        return task
 
     @classmethod
     async def get_list_tasks(
@@ -151,13 +249,12 @@ class MLService:
             raise errors.NotFoundError(detail=None)
 
         file = await file_repo.get(pk=task.file_id)
-        predict = await PredictsRepository(session=session).get(pk=task.predict_id)
-
-        map_result = {
-            schemas.ml.PredictEnum.MALIGNANT: "MALIGNANT",
-            schemas.ml.PredictEnum.BENIGN: "BENIGN",
-            schemas.ml.PredictEnum.ANOTHER: "ANOTHER",
-        }
+        predicts_repo = PredictsRepository(session=session)
+        predict = await predicts_repo.get(pk=task.predict_id)
+        # A reused prediction belongs to the file it was computed for
+        predicts = await predicts_repo.list(file_id=task.file_id)
+        if predict and predict not in predicts:
+            predicts = [predict, *predicts]
 
         return schemas.ml.TaskResponseSchema(
             id=task.id,
@@ -174,13 +271,23 @@ class MLService:
             )
             if file
             else None,
-            predict=schemas.ml.PredictSchema(
-                id=predict.id,
-                result=map_result.get(predict.result, "ANOTHER"),
-                probability=predict.probability,
-            )
-            if predict
-            else None,
+            predict=cls.get_predict_schema(predict) if predict else None,
+            predicts=[cls.get_predict_schema(elem) for elem in predicts],
+        )
+
+    @staticmethod
+    def get_predict_schema(predict: models.Predicts) -> schemas.ml.PredictSchema:
+        map_result = {
+            schemas.ml.PredictEnum.MALIGNANT: "MALIGNANT",
+            schemas.ml.PredictEnum.BENIGN: "BENIGN",
+            schemas.ml.PredictEnum.ANOTHER: "ANOTHER",
+        }
+
+        return schemas.ml.PredictSchema(
+            id=predict.id,
+            model_id=predict.model_id,
+            result=map_result.get(predict.result, "ANOTHER"),
+            probability=predict.probability,
         )
 
     @classmethod
@@ -227,7 +334,7 @@ class MLService:
                 default_name: dict[str, str] = default_name_list[0] if default_name_list else {}
 
                 target_file = f"{settings.S3_DIR_NAME_MODEL}/{file.name}"
-                s3_path = f"{settings.S3_CORE_BUCKET.rstrip('/')}/{target_file}"
+                s3_path = cls.get_model_s3_path(file.name)
 
                 params_to_create = {
                     "name": default_name.get("model_name", file.stem.replace("_", " ").title()),
@@ -318,6 +425,60 @@ class MLService:
         await cls.upload_model_default_to_bucket()
         await cls.check_model_file_exists()
 
+    @classmethod
+    async def warmup_models(cls) -> None:
+        """
+        Loads, compiles and warms up the available models (ML_PRELOAD_MODELS when set) and the model of
+        the synchronous endpoint. Progress is tracked for /ready, a model that fails does not stop the others.
+        """
+        settings = get_config()
+        tracker = get_readiness_tracker()
+        if not settings.ML_WARMUP_ON_STARTUP:
+            tracker.finish()
+            return
+
+        items, predict_model = [], None
+        try:
+            async_session_local = get_async_session()
+            async with async_session_local() as db_session:
+                model_repo = ModelsRepository(session=db_session)
+                items = [
+                    elem
+                    for index in range(0, await model_repo.count(), settings.DEFAULT_BATCH_SIZE)
+                    for elem in await model_repo.list(offset=index, limit=settings.DEFAULT_BATCH_SIZE, is_exists=True)
+                ]
+                predict_model = await cls.find_predict_model(session=db_session)
+        except Exception:
+            # Models are then loaded on first use, the consumer still starts
+            logger.exception("Error while listing models to warm up")
+
+        if settings.ML_PRELOAD_MODELS:
+            items = [elem for elem in items if {str(elem.id), elem.name} & set(settings.ML_PRELOAD_MODELS)]
+        # The synchronous endpoint serves its model under the key of its Models row, see predict_content
+        if settings.ML_PRELOAD_PREDICT_MODEL and predict_model is not None and predict_model not in items:
+            items.append(predict_model)
+
+        loaders: dict[str, tuple[str, Callable[[], Awaitable[BaseInferenceModel]]]] = {
+            str(model.id): (model.name, partial(cls.get_served_model, model)) for model in items
+        }
+        if settings.ML_PRELOAD_PREDICT_MODEL and predict_model is None:
+            loaders[cls.PREDICT_MODEL_FILE] = (cls.PREDICT_MODEL_FILE, partial(cls.get_model, cls.PREDICT_MODEL_FILE))
+
+        # Models beyond the registry capacity would only evict the ones warmed up before them
+        loaders = dict(list(loaders.items())[: settings.ML_REGISTRY_MAX_MODELS or None])
+
+        tracker.start({key: name for key, (name, _) in loaders.items()})
+        for key, (_, loader) in loaders.items():
+            tracker.loading(key)
+            try:
+                tracker.loaded(key, await loader())
+            except Exception as e:
+                logger.exception("Error while warming up model %s", key)
+                tracker.failed(key, e)
+        tracker.finish()
+
+        logger.info("Worker memory after warm-up: %s", ProcessMemoryStats.current().model_dump_json())
+
     @classmethod
     async def get_models(cls, session: AsyncSession) -> list[schemas.ml.ModelSchema]:
         model_repo = ModelsRepository(session=session)
@@ -327,43 +488,425 @@ class MLService:
             for elem in await model_repo.list(offset=index, limit=get_config().DEFAULT_BATCH_SIZE, is_exists=True)
         ]
 
+    @staticmethod
+    def get_tta_views(*, tta: bool) -> int:
+        return get_config().ML_TTA_VIEWS if tta else 1
+
+    @staticmethod
+    async def get_abcd_features(
+        model: BaseInferenceModel,
+        content: bytes,
+        s3: AioBaseClient | None = None,
+    ) -> list[float] | None:
+        if not model.accepts_abcd:
+            return None
+
+        return (await get_abcd_service().get_features([content], s3=s3))[0]
+
+    @staticmethod
+    def get_metrics() -> dict[str, Any]:
+        return {
+            "admission": get_admission_queue().stats.model_dump(mode="json"),
+            "registry": get_model_registry().stats.model_dump(mode="json"),
+            "batching": get_inference_engine().stats.model_dump(mode="json"),
+            "executor": get_inference_executor().stats.model_dump(mode="json"),
+            "abcd": get_abcd_service().stats.model_dump(mode="json"),
+            "abcd_executor": get_abcd_service().executor.stats.model_dump(mode="json"),
+            "embeddings": get_embedding_cache().stats.model_dump(mode="json"),
+            "memory": ProcessMemoryStats.current().model_dump(mode="json"),
+        }
+
+    @classmethod
+    async def get_model(
+        cls,
+        name_file: str,
+        model_id: UUID4 | None = None,
+        backend: schemas.ml.ModelBackendEnum = schemas.ml.ModelBackendEnum.PYTORCH,
+        precision: schemas.ml.ModelPrecisionEnum = schemas.ml.ModelPrecisionEnum.FP32,
+        version: int = 1,
+    ) -> BaseInferenceModel:
+        """
+        Served model from the registry. A version newer than the cached one is picked up by the model watcher,
+        until then the cached one keeps serving.
+        """
+        backend, precision = schemas.ml.ModelBackendEnum(backend), schemas.ml.ModelPrecisionEnum(precision)
+        file = await cls.download_model_file(name_file=name_file, version=version)
+
+        return await get_model_registry().get(
+            model_id=cls.get_registry_key(name_file, model_id, backend, precision),
+            path=file.absolute(),
+            loader=partial(cls.load_prepared_model, loader=cls.get_loader(backend=backend, precision=precision)),
+            version=version,
+        )
+
+    @classmethod
+    async def get_served_model(cls, model: models.Models) -> BaseInferenceModel:
+        """Served model of a Models row."""
+        return await cls.get_model(
+            name_file=Path(model.s3_path).name,
+            model_id=model.id,
+            backend=model.backend,
+            precision=model.precision,
+            version=model.version,
+        )
+
     @classmethod
-    async def get_model(cls, name_file: str) -> PyTorchModel:
+    async def find_predict_model(cls, session: AsyncSession) -> models.Models | None:
+        """Models row of the checkpoint of the synchronous endpoint, None until it is uploaded."""
+        return await ModelsRepository(session=session).filter(
+            s3_path=cls.get_model_s3_path(cls.PREDICT_MODEL_FILE),
+            is_exists=True,
+        )
+
+    @staticmethod
+    def get_model_s3_path(name_file: str) -> str:
         settings = get_config()
-        file = settings.ML_DIR_TO_UPLOAD / name_file
+        return f"{settings.S3_CORE_BUCKET.rstrip('/')}/{settings.S3_DIR_NAME_MODEL}/{name_file}"
+
+    @staticmethod
+    def get_registry_key(
+        name_file: str,
+        model_id: UUID4 | None,
+        backend: schemas.ml.ModelBackendEnum,
+        precision: schemas.ml.ModelPrecisionEnum,
+    ) -> str:
+        backend, precision = schemas.ml.ModelBackendEnum(backend), schemas.ml.ModelPrecisionEnum(precision)
+        return f"{model_id or name_file}:{backend.value}:{precision.value}"
+
+    @staticmethod
+    def get_model_path(name_file: str, version: int = 1) -> Path:
+        """Local weights of a model version, the first one keeps the name of the S3 object."""
+        file = get_config().ML_DIR_TO_UPLOAD / name_file
+        return file if version <= 1 else file.with_name(f"{file.stem}.v{version}{file.suffix}")
+
+    @classmethod
+    async def refresh_model_version(cls, s3: Any, model_repo: ModelsRepository, model: models.Models) -> bool:  # noqa: ANN401
+        """
+        Compares the S3 object of the model with its stored ETag. When the object changed it is downloaded,
+        and if the weights differ from the current version the version is bumped and they are kept
+        in the local file of the new one. True when this call bumped the version.
+        """
+        bucket, key = model.s3_path.split("/", 1)
+        etag = (await s3.head_object(Bucket=bucket, Key=key))["ETag"]
+        if etag == model.s3_etag:
+            return False
+
+        name_file = Path(model.s3_path).name
+        current = cls.get_model_path(name_file, model.version)
+        current.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = current.with_name(f"{name_file}.{uuid.uuid4().hex}.tmp")
+        try:
+            with tmp_file.open("wb") as f:
+                await s3.download_fileobj(Bucket=bucket, Key=key, Fileobj=f)
+            checksum = await asyncio.to_thread(hash_file, tmp_file)
+
+            known = model.checksum
+            if not known and current.exists():
+                known = await asyncio.to_thread(hash_file, current)
+
+            if not known or checksum == known:
+                # First check of the model or the same weights uploaded again
+                if not current.exists():
+                    tmp_file.replace(current)
+                await model_repo.update(model, {"checksum": checksum, "s3_etag": etag})
+                return False
+
+            if not await model_repo.bump_version(model, checksum=checksum, s3_etag=etag):
+                logger.info("Model %s version already bumped to %s", model.id, model.version)
+                return False
+
+            tmp_file.replace(cls.get_model_path(name_file, model.version))
+            logger.info("Model %s has new weights, version %s", model.id, model.version)
+            return True
+        finally:
+            tmp_file.unlink(missing_ok=True)
+
+    @classmethod
+    async def reload_model(cls, model: models.Models) -> BaseInferenceModel | None:
+        """Loads and warms up the current version of a served model next to the old one and swaps them."""
+        backend = schemas.ml.ModelBackendEnum(model.backend)
+        precision = schemas.ml.ModelPrecisionEnum(model.precision)
+        name_file = Path(model.s3_path).name
+        file = await cls.download_model_file(name_file=name_file, version=model.version)
+
+        return await get_model_registry().swap(
+            model_id=cls.get_registry_key(name_file, model.id, backend, precision),
+            path=file.absolute(),
+            loader=partial(cls.load_prepared_model, loader=cls.get_loader(backend=backend, precision=precision)),
+            version=model.version,
+        )
+
+    @classmethod
+    async def check_model_versions(cls) -> int:
+        """
+        One pass of the model watcher over the available models, returns the number of swapped models.
+        Models that are not loaded in this worker only get their version refreshed.
+        """
+        settings = get_config()
+        registry = get_model_registry()
+        swapped = 0
+
+        async_session_local = get_async_session()
+        async with (
+            get_s3_session().client("s3", endpoint_url=settings.S3_URL) as s3,
+            async_session_local() as db_session,
+        ):
+            model_repo = ModelsRepository(session=db_session)
+            items = [
+                elem
+                for index in range(0, await model_repo.count(), settings.DEFAULT_BATCH_SIZE)
+                for elem in await model_repo.list(offset=index, limit=settings.DEFAULT_BATCH_SIZE, is_exists=True)
+            ]
+
+            for model in items:
+                try:
+                    await cls.refresh_model_version(s3=s3, model_repo=model_repo, model=model)
+                    await db_session.commit()
+
+                    key = cls.get_registry_key(Path(model.s3_path).name, model.id, model.backend, model.precision)
+                    served = registry.get_version(key)
+                    if served is not None and served != model.version and await cls.reload_model(model):
+                        swapped += 1
+                except Exception:
+                    await db_session.rollback()
+                    logger.exception("Error while checking version of model %s", model.id)
+
+        return swapped
+
+    @classmethod
+    async def watch_models(cls) -> None:
+        """Background model watcher, every ML_MODEL_WATCH_INTERVAL_S seconds."""
+        interval = get_config().ML_MODEL_WATCH_INTERVAL_S
+        if interval <= 0:
+            return
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                swapped = await cls.check_model_versions()
+            except Exception:
+                logger.exception("Error while checking model versions")
+                continue
+
+            if swapped:
+                logger.info("Models swapped to new versions: %s", swapped)
+
+    @staticmethod
+    def load_prepared_model(path: Path, loader: Callable[[Path], BaseInferenceModel]) -> BaseInferenceModel:
+        """
+        Loads the model, compiles it (PyTorch backend, ML_COMPILE_MODE) and runs the warm-up passes.
+        """
+        settings = get_config()
+        model = loader(path)
+
+        if isinstance(model, PyTorchModel):
+            if settings.ML_EMBEDDING_CACHE:
+                model.embedding_cache = get_embedding_cache()
+            if settings.ML_CASCADE_THRESHOLD > 0 and model.load_cascade_head(
+                PyTorchModel.get_cascade_path(path),
+                settings.ML_CASCADE_THRESHOLD,
+            ):
+                logger.info("Cascade enabled for %s, threshold %s", path.name, settings.ML_CASCADE_THRESHOLD)
+            model.compile(settings.ML_COMPILE_MODE)
+
+        if settings.ML_WARMUP_BATCH_SIZES:
+            model.warmup(settings.ML_WARMUP_BATCH_SIZES)
+
+        logger.info("Model %s prepared: %s", path.name, model.warmup_report.model_dump_json())
+
+        return model
+
+    @classmethod
+    def get_loader(
+        cls,
+        backend: schemas.ml.ModelBackendEnum,
+        precision: schemas.ml.ModelPrecisionEnum = schemas.ml.ModelPrecisionEnum.FP32,
+    ) -> Callable[[Path], BaseInferenceModel]:
+        loaders = {
+            schemas.ml.ModelBackendEnum.PYTORCH: cls.load_model,
+            schemas.ml.ModelBackendEnum.ONNX: cls.load_onnx_model,
+        }
+        return partial(loaders[backend], precision=precision)
+
+    @staticmethod
+    def load_model(
+        path: Path,
+        precision: schemas.ml.ModelPrecisionEnum = schemas.ml.ModelPrecisionEnum.FP32,
+    ) -> PyTorchModel:
+        return PyTorchModel.from_checkpoint(build_inference_model, path, precision=precision)
+
+    @classmethod
+    def load_onnx_model(
+        cls,
+        path: Path,
+        precision: schemas.ml.ModelPrecisionEnum = schemas.ml.ModelPrecisionEnum.FP32,
+    ) -> OnnxModel:
+        if precision == schemas.ml.ModelPrecisionEnum.BF16:
+            logger.warning("BF16 is not supported by the ONNX backend, %s runs in FP32", path.name)
+
+        onnx_path = path.with_suffix(".onnx")
+        if not onnx_path.exists() or onnx_path.stat().st_mtime_ns < path.stat().st_mtime_ns:
+            export_onnx(cls.load_model(path), onnx_path)
+
+        if precision == schemas.ml.ModelPrecisionEnum.INT8:
+            int8_path = path.with_suffix(".int8.onnx")
+            if not int8_path.exists() or int8_path.stat().st_mtime_ns < onnx_path.stat().st_mtime_ns:
+                quantize_onnx(onnx_path, int8_path)
+            onnx_path = int8_path
+
+        return OnnxModel(path=onnx_path)
+
+    @classmethod
+    async def download_model_file(cls, name_file: str, version: int = 1) -> Path:
+        settings = get_config()
+        file = cls.get_model_path(name_file, version)
         if file.exists():
-            torch_model = PyTorchModel(model=ResNetCosineSwinModel())
-            torch_model.load_model(file.absolute())
-            return torch_model
+            return file
 
+        file.parent.mkdir(parents=True, exist_ok=True)
+        # Download to a temp file so that a concurrent request never reads partial weights
+        tmp_file = file.with_name(f"{file.name}.{uuid.uuid4().hex}.tmp")
         async with get_s3_session().client("s3", endpoint_url=get_config().S3_URL) as s3:
-            with file.open("wb") as f:
+            with tmp_file.open("wb") as f:
                 await s3.download_fileobj(
                     Bucket=settings.S3_CORE_BUCKET,
                     Key=f"{settings.S3_DIR_NAME_MODEL}/{name_file}",
                     Fileobj=f,
                 )
 
-        torch_model = PyTorchModel(model=ResNetCosineSwinModel())
-        torch_model.load_model(file.absolute())
+        tmp_file.replace(file)
 
-        return torch_model
+        return file
 
     @staticmethod
-    async def get_file(s3_path: str) -> bytes:
+    async def get_file(s3_path: str, s3: AioBaseClient | None = None) -> bytes:
         bucket, key = s3_path.split("/", 1)
-        async with get_s3_session().client("s3", endpoint_url=get_config().S3_URL) as s3:
-            resp = await s3.get_object(Bucket=bucket, Key=key)
+        async with use_s3_client(s3) as client:
+            resp = await client.get_object(Bucket=bucket, Key=key)
             body = resp["Body"]
             return await body.read()
 
+    @staticmethod
+    async def preprocess_file(file_id: UUID4, content: bytes) -> None:
+        """
+        Builds the preprocessed artifact of an upload in the preprocessing pool and puts it next to the original.
+        """
+        settings = get_config()
+        try:
+            data = await get_abcd_service().executor.run(
+                build_artifact,
+                content,
+                settings.ML_DECODE_IMAGE_SIZE or None,
+                settings.ML_ABCD_IMAGE_SIZE or None,
+            )
+            async with get_s3_session().client("s3", endpoint_url=settings.S3_URL) as s3:
+                await s3.put_object(Bucket=settings.S3_CORE_BUCKET, Key=get_artifact_key(file_id), Body=data)
+        except Exception:
+            logger.exception("Error while preprocessing file %s", file_id)
+
+    @staticmethod
+    async def get_preprocessed_file(file_id: UUID4, s3: AioBaseClient | None = None) -> PreprocessedImage | None:
+        """
+        Preprocessed artifact of an upload, None when artifacts are not written, it is missing, unreadable
+        or was built with other decode settings: the caller then decodes the original upload.
+        """
+        settings = get_config()
+        if not settings.ML_PREPROCESS_ON_UPLOAD:
+            return None
+
+        try:
+            async with use_s3_client(s3) as client:
+                resp = await client.get_object(Bucket=settings.S3_CORE_BUCKET, Key=get_artifact_key(file_id))
+                data = await resp["Body"].read()
+        except ClientError:
+            return None
+        except (BotoCoreError, OSError):
+            logger.warning("Error while reading preprocessed file %s", file_id, exc_info=True)
+            return None
+
+        try:
+            return read_artifact(data, settings.ML_DECODE_IMAGE_SIZE or None, settings.ML_ABCD_IMAGE_SIZE or None)
+        except (ValueError, OSError, EOFError, KeyError, zipfile.BadZipFile):
+            logger.warning("Corrupt preprocessed file %s", file_id, exc_info=True)
+            return None
+
     @classmethod
     async def predict_file(cls, session: AsyncSession, data: schemas.ml.KafkaInputMessageSchema) -> None:
+        logger.info("Input data to predict %s", data.model_dump_json())
+
+        if data.model_ids:
+            await cls.predict_file_models(session=session, data=data)
+            return
+
+        job = await cls.get_predict_job(session=session, data=data)
+        if job is None:
+            return
+
+        prediction, model_version = await cls.run_predict_job(job)
+        await cls.save_predict_job(session=session, job=job, prediction=prediction, model_version=model_version)
+
+    @classmethod
+    async def predict_files(
+        cls,
+        session: AsyncSession,
+        items: list[schemas.ml.KafkaInputMessageSchema],
+    ) -> list[Exception | None]:
+        """
+        Scores the tasks of a Kafka batch with one session and one S3 client: rows are read and written
+        task by task, downloads and forward passes of all tasks run concurrently.
+        Returns the error of every task (None - succeeded), a failed task does not affect the others.
+        """
+        result: list[Exception | None] = [None] * len(items)
+        jobs: dict[int, PredictJob] = {}
+        for index, data in enumerate(items):
+            logger.info("Input data to predict %s", data.model_dump_json())
+            try:
+                if data.model_ids:
+                    await cls.predict_file_models(session=session, data=data)
+                elif job := await cls.get_predict_job(session=session, data=data):
+                    jobs[index] = job
+            except Exception as e:  # noqa: BLE001
+                await session.rollback()
+                result[index] = e
+
+        async with use_s3_client() as s3:
+            predictions = await asyncio.gather(
+                *(cls.run_predict_job(job, s3=s3) for job in jobs.values()),
+                return_exceptions=True,
+            )
+
+        for (index, job), outcome in zip(jobs.items(), predictions, strict=True):
+            if isinstance(outcome, Exception):
+                result[index] = outcome
+                continue
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+            prediction, model_version = outcome
+            try:
+                await cls.save_predict_job(
+                    session=session,
+                    job=job,
+                    prediction=prediction,
+                    model_version=model_version,
+                )
+            except Exception as e:  # noqa: BLE001
+                await session.rollback()
+                result[index] = e
+
+        return result
+
+    @classmethod
+    async def get_predict_job(
+        cls,
+        session: AsyncSession,
+        data: schemas.ml.KafkaInputMessageSchema,
+    ) -> PredictJob | None:
+        """Forward pass of a single-model task, None when a prediction of the same content was reused."""
         models_repo = ModelsRepository(session=session)
         tasks_repo = TasksRepository(session=session)
         files_repo = FilesRepository(session=session)
         predicts_repo = PredictsRepository(session=session)
-        logger.info("Input data to predict %s", data.model_dump_json())
 
         task = await tasks_repo.get(pk=data.task_id)
         if not task:
@@ -377,21 +920,206 @@ class MLService:
         if not file:
             raise errors.NotFoundError(detail=None)
 
-        model_class = await cls.get_model(name_file=Path(model.s3_path).name)
+        if model.deduplicate and file.content_hash:
+            predict = await predicts_repo.filter_by_content(
+                file.content_hash,
+                model.id,
+                model.version,
+                tta=data.tta,
+            )
+            if predict:
+                logger.info("Reuse predict %s for task %s", predict.id, task.id)
+                await tasks_repo.update(task, {"status": schemas.ml.StatusEnum.SUCCESS, "predict_id": predict.id})
+                await session.commit()
+                return None
+
+        return PredictJob(
+            task_id=task.id,
+            file_id=file.id,
+            file_path=file.s3_path,
+            content_hash=file.content_hash,
+            model_id=model.id,
+            model_file=Path(model.s3_path).name,
+            backend=model.backend,
+            precision=model.precision,
+            version=model.version,
+            tta=data.tta,
+        )
 
-        img = Image.open(io.BytesIO(await cls.get_file(file.s3_path))).convert("RGB")
+    @classmethod
+    async def run_predict_job(cls, job: PredictJob, s3: AioBaseClient | None = None) -> tuple[Prediction, int]:
+        """
+        Prediction of the job and the version of the weights that made it. The registry keeps serving
+        the cached version until the model watcher swaps in the one of the task.
+        """
+        model_class = await cls.get_model(
+            name_file=job.model_file,
+            model_id=job.model_id,
+            backend=job.backend,
+            precision=job.precision,
+            version=job.version,
+        )
 
-        result, probability = model_class.predict(image_input=img)
+        artifact = await cls.get_preprocessed_file(file_id=job.file_id, s3=s3)
+        if artifact:
+            image = set_content_hash(artifact.image, job.content_hash)
+            abcd = artifact.abcd if model_class.accepts_abcd else None
+        else:
+            image = await cls.get_file(job.file_path, s3=s3)
+            abcd = await cls.get_abcd_features(model=model_class, content=image, s3=s3)
+
+        prediction = await get_inference_engine().predict(
+            model_id=str(job.model_id),
+            model=model_class,
+            image=image,
+            tta_views=cls.get_tta_views(tta=job.tta),
+            abcd=abcd,
+        )
+        return prediction, model_class.version
 
-        predict = await predicts_repo.create(file_id=file.id, model_id=model.id, result=result, probability=probability)
+    @staticmethod
+    async def save_predict_job(
+        session: AsyncSession,
+        job: PredictJob,
+        prediction: Prediction,
+        model_version: int,
+    ) -> None:
+        tasks_repo = TasksRepository(session=session)
+
+        predict = await PredictsRepository(session=session).create(
+            file_id=job.file_id,
+            model_id=job.model_id,
+            result=prediction.result,
+            probability=prediction.probability,
+            tta=job.tta,
+            inference_path=prediction.path,
+            model_version=model_version,
+        )
         await session.commit()
 
+        task = await tasks_repo.get(pk=job.task_id)
         await tasks_repo.update(task, {"status": schemas.ml.StatusEnum.SUCCESS, "predict_id": predict.id})
         await session.commit()
 
     @classmethod
-    async def predict_image(cls, file: UploadFile) -> dict[str, Any]:
-        model = await cls.get_model("resnet18_melanoma_with_abcd_swin.pth")
+    async def predict_file_models(cls, session: AsyncSession, data: schemas.ml.KafkaInputMessageSchema) -> None:
+        """
+        Scores the file of a multi-model task: decode, resize and ABCD extraction run once, then the forward
+        passes of the models run concurrently. Every model gets its own Predicts row for the file of the task.
+        """
+        models_repo = ModelsRepository(session=session)
+        tasks_repo = TasksRepository(session=session)
+        predicts_repo = PredictsRepository(session=session)
+
+        task = await tasks_repo.get(pk=data.task_id)
+        if not task:
+            raise errors.NotFoundError(detail=None)
 
-        result = model.predict(image_input=Image.open(io.BytesIO(await file.read())).convert("RGB"))
-        return {"result": result}
+        file = await FilesRepository(session=session).get(pk=task.file_id)
+        if not file:
+            raise errors.NotFoundError(detail=None)
+
+        items = [await models_repo.filter(id=model_id, is_exists=True) for model_id in dict.fromkeys(data.model_ids)]
+        if not all(items):
+            raise errors.NotFoundError(detail=None)
+
+        results: dict[UUID4, dict[str, Any]] = {}
+        for model in items:
+            if model.deduplicate and file.content_hash:
+                predict = await predicts_repo.filter_by_content(
+                    file.content_hash,
+                    model.id,
+                    model.version,
+                    tta=data.tta,
+                )
+                if predict:
+                    logger.info("Reuse predict %s of model %s for task %s", predict.id, model.id, task.id)
+                    results[model.id] = {
+                        "result": predict.result,
+                        "probability": predict.probability,
+                        "inference_path": predict.inference_path,
+                        "model_version": predict.model_version,
+                    }
+
+        pending = [elem for elem in items if elem.id not in results]
+        if pending:
+            preprocessed = await cls.get_preprocessed_file(file_id=file.id) or await cls.preprocess_content(
+                await cls.get_file(file.s3_path),
+            )
+            set_content_hash(preprocessed.image, file.content_hash)
+            # Loaded one by one, so that a cold start does not hold several checkpoints being loaded at once
+            model_classes = [await cls.get_served_model(model) for model in pending]
+            predictions = await asyncio.gather(
+                *(
+                    get_inference_engine().predict(
+                        model_id=str(model.id),
+                        model=model_class,
+                        image=preprocessed.image,
+                        tta_views=cls.get_tta_views(tta=data.tta),
+                        abcd=preprocessed.abcd if model_class.accepts_abcd else None,
+                    )
+                    for model, model_class in zip(pending, model_classes, strict=True)
+                ),
+            )
+            for model, model_class, prediction in zip(pending, model_classes, predictions, strict=True):
+                results[model.id] = {
+                    "result": prediction.result,
+                    "probability": prediction.probability,
+                    "inference_path": prediction.path,
+                    "model_version": model_class.version,
+                }
+
+        predicts = [
+            await predicts_repo.create(
+                file_id=file.id,
+                model_id=model.id,
+                tta=data.tta,
+                **results[model.id],
+            )
+            for model in items
+        ]
+        await session.commit()
+
+        await tasks_repo.update(task, {"status": schemas.ml.StatusEnum.SUCCESS, "predict_id": predicts[0].id})
+        await session.commit()
+
+    @staticmethod
+    async def preprocess_content(content: bytes, s3: AioBaseClient | None = None) -> PreprocessedImage:
+        """
+        Decoded model input and ABCD vector of an upload without a preprocessed file.
+        The vector comes from ABCDFeatureService, so it is shared with single-model tasks and retries.
+        """
+        abcd_service = get_abcd_service()
+        image = await abcd_service.executor.run(decode_image, content, get_config().ML_DECODE_IMAGE_SIZE or None)
+        return PreprocessedImage(image=image, abcd=(await abcd_service.get_features([content], s3=s3))[0])
+
+    @classmethod
+    async def predict_image(cls, file: UploadFile, *, tta: bool = False) -> dict[str, Any]:
+        """
+        Synchronous prediction, admitted through the bounded queue: 429 when it is full,
+        503 when the deadline passes while the request waits or runs.
+        """
+        content = await file.read()
+
+        return await get_admission_queue().run(partial(cls.predict_content, content, tta=tta))
+
+    @classmethod
+    async def predict_content(cls, content: bytes, *, tta: bool = False) -> dict[str, Any]:
+        # Served under its Models row, so it shares the registry entry and batches with Kafka tasks of the model
+        async_session_local = get_async_session()
+        async with async_session_local() as db_session:
+            predict_model = await cls.find_predict_model(session=db_session)
+
+        if predict_model is None:
+            model_id, model = cls.PREDICT_MODEL_FILE, await cls.get_model(cls.PREDICT_MODEL_FILE)
+        else:
+            model_id, model = str(predict_model.id), await cls.get_served_model(predict_model)
+
+        prediction = await get_inference_engine().predict(
+            model_id=model_id,
+            model=model,
+            image=content,
+            tta_views=cls.get_tta_views(tta=tta),
+            abcd=await cls.get_abcd_features(model=model, content=content),
+        )
+        return {"result": (prediction.result, prediction.probability)}
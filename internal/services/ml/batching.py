@@ -0,0 +1,133 @@
+import asyncio
+from functools import lru_cache
+from typing import NamedTuple
+
+from PIL import Image
+from pydantic import BaseModel
+
+from internal.config import get_config
+from internal.services.ml.executor import get_inference_executor
+from internal.services.ml.model import BaseInferenceModel, Prediction
+from internal.utils import log
+
+logger = log.get_logger()
+
+
+class BatchingStats(BaseModel):
+    requests: int = 0
+    batches: int = 0
+    max_batch_size: int = 0
+
+
+class _PendingPredict(NamedTuple):
+    model: BaseInferenceModel
+    image: bytes | Image.Image
+    tta_views: int
+    abcd: list[float] | None
+    future: asyncio.Future[Prediction]
+
+
+class BatchInferenceEngine:
+    """
+    Gathers concurrent predictions for the same model into one forward pass.
+    A batch is flushed when it reaches max_batch_size or max_wait_ms after its first request.
+    """
+
+    def __init__(self, max_batch_size: int = 8, max_wait_ms: float = 10.0) -> None:
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.stats = BatchingStats()
+        self._queues: dict[str, asyncio.Queue[_PendingPredict]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+
+    async def predict(
+        self,
+        model_id: str,
+        model: BaseInferenceModel,
+        image: bytes | Image.Image,
+        tta_views: int = 1,
+        abcd: list[float] | None = None,
+    ) -> Prediction:
+        future = asyncio.get_running_loop().create_future()
+        await self._get_queue(model_id).put(
+            _PendingPredict(model=model, image=image, tta_views=tta_views, abcd=abcd, future=future),
+        )
+        return await future
+
+    async def stop(self) -> None:
+        for task in self._workers.values():
+            task.cancel()
+
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+
+    def _get_queue(self, model_id: str) -> asyncio.Queue[_PendingPredict]:
+        worker = self._workers.get(model_id)
+        if worker is None or worker.done():
+            self._queues[model_id] = asyncio.Queue()
+            self._workers[model_id] = asyncio.create_task(self._worker(self._queues[model_id]))
+
+        return self._queues[model_id]
+
+    async def _collect(self, queue: asyncio.Queue[_PendingPredict]) -> list[_PendingPredict]:
+        batch = [await queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=timeout))
+            except TimeoutError:
+                break
+
+        return batch
+
+    async def _worker(self, queue: asyncio.Queue[_PendingPredict]) -> None:
+        while True:
+            batch = await self._collect(queue)
+
+            # The registry may swap the model object while requests are queued, keep batches per instance
+            groups: dict[tuple[int, int], list[_PendingPredict]] = {}
+            for elem in batch:
+                groups.setdefault((id(elem.model), elem.tta_views), []).append(elem)
+
+            for group in groups.values():
+                await self._run(group)
+
+    async def _run(self, batch: list[_PendingPredict]) -> None:
+        pending = [elem for elem in batch if not elem.future.done()]
+        if not pending:
+            return
+
+        self.stats.requests += len(pending)
+        self.stats.batches += 1
+        self.stats.max_batch_size = max(self.stats.max_batch_size, len(pending))
+
+        abcd = [elem.abcd for elem in pending]
+        try:
+            result = await get_inference_executor().run(
+                pending[0].model.predict_batch,
+                [elem.image for elem in pending],
+                None,
+                pending[0].tta_views,
+                None if any(elem is None for elem in abcd) else abcd,
+            )
+        except Exception as e:
+            logger.exception("Error in batch of %s predictions", len(pending))
+            for elem in pending:
+                if not elem.future.done():
+                    elem.future.set_exception(e)
+            return
+
+        for elem, value in zip(pending, result, strict=True):
+            if not elem.future.done():
+                elem.future.set_result(value)
+
+
+@lru_cache(maxsize=1)
+def get_inference_engine() -> BatchInferenceEngine:
+    settings = get_config()
+    return BatchInferenceEngine(max_batch_size=settings.ML_BATCH_MAX_SIZE, max_wait_ms=settings.ML_BATCH_MAX_WAIT_MS)
@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import torch
+from pydantic import BaseModel
+from torch import nn
+
+from internal.config import get_config
+from internal.services.ml.abcd import compute_abcd_vectors
+from internal.services.ml.model import PyTorchModel
+from internal.utils import log
+
+logger = log.get_logger()
+
+
+class CascadeFitReport(BaseModel):
+    samples: int
+    epochs: int
+    distillation_loss: float
+    temperature: float
+    # Share of the fitting images where the head predicts the same class as the full model
+    agreement: float
+
+
+def _extract_inputs(
+    model: PyTorchModel,
+    images: list[bytes],
+    batch_size: int,
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """ResNet features, ABCD vectors and full model logits of the images."""
+    device = next(model.model.parameters()).device
+    abcd = torch.tensor(compute_abcd_vectors(images, size=get_config().ML_ABCD_IMAGE_SIZE or None))
+    cnn_features, logits = [], []
+
+    model.model.eval()
+    with torch.no_grad():
+        for index in range(0, len(images), batch_size):
+            chunk = [model.open_image(elem, size=model.image_size) for elem in images[index : index + batch_size]]
+            data = torch.stack([model.transform(elem) for elem in chunk]).to(device)
+            chunk_abcd = abcd[index : index + batch_size].to(device)
+
+            cnn = model.model.forward_cnn_features(data)
+            features = torch.cat([cnn, model.model.forward_vit_features(data)], dim=1)
+            cnn_features.append(cnn.float().cpu())
+            logits.append(model.model.forward_head(features, chunk_abcd).float().cpu())
+
+    return torch.cat(cnn_features), abcd, torch.cat(logits)
+
+
+def _soft_cross_entropy(logits: torch.Tensor, targets: torch.Tensor) -> torch.Tensor:
+    return -(targets * nn.functional.log_softmax(logits, dim=1)).sum(dim=1).mean()
+
+
+def fit_cascade_head(
+    model: PyTorchModel,
+    images: list[bytes],
+    epochs: int = 300,
+    lr: float = 1e-3,
+    batch_size: int = 8,
+) -> tuple[nn.Module, CascadeFitReport]:
+    """
+    Distills the full model into the ResNet + ABCD head on unlabeled images, then fits its temperature
+    so that the confidence the cascade thresholds matches how often the full model agrees.
+    """
+    cnn_features, abcd, full_logits = _extract_inputs(model, images, batch_size)
+    targets = nn.functional.softmax(full_logits, dim=1)
+
+    head = model.model.build_cascade_head().cpu()
+    # Layers shared with the full head (same names) are a better start than a random init
+    shared = {name: value for name, value in model.model.state_dict().items() if name in head.state_dict()}
+    shared.pop("temperature", None)
+    head.load_state_dict(shared, strict=False)
+
+    optimizer = torch.optim.Adam(head.parameters(), lr=lr)
+    head.train()
+    for _ in range(epochs):
+        optimizer.zero_grad()
+        loss = _soft_cross_entropy(head.forward_uncalibrated(cnn_features, abcd), targets)
+        loss.backward()
+        optimizer.step()
+    head.eval()
+
+    with torch.no_grad():
+        raw = head.forward_uncalibrated(cnn_features, abcd)
+        temperatures = torch.logspace(-1, 1, 81)
+        losses = torch.stack([_soft_cross_entropy(raw / elem, targets) for elem in temperatures])
+        head.temperature.fill_(temperatures[losses.argmin()].item())
+
+        report = CascadeFitReport(
+            samples=len(images),
+            epochs=epochs,
+            distillation_loss=losses.min().item(),
+            temperature=head.temperature.item(),
+            agreement=(raw.argmax(dim=1) == full_logits.argmax(dim=1)).float().mean().item(),
+        )
+
+    return head, report
+
+
+def save_cascade_head(head: nn.Module, path: Path) -> Path:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    torch.save(head.state_dict(), tmp_path)
+    tmp_path.replace(path)
+
+    logger.info("Cascade head saved: %s", path)
+
+    return path
@@ -0,0 +1,127 @@
+import threading
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel
+
+from internal.config import get_config
+from internal.utils import log
+
+logger = log.get_logger()
+
+# Image.info key with the hash of the upload a decoded image comes from
+CONTENT_HASH_INFO_KEY = "content_hash"
+
+
+class EmbeddingCacheStats(BaseModel):
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stored: int = 0
+
+
+class EmbeddingCache:
+    """
+    Backbone features [views, dim] of an image, keyed by backbone fingerprint and image content hash.
+    Lookup order: in-process LRU, then <directory>/<fingerprint>/<content_hash>.npy (memory-mapped).
+    A stored entry serves any request with at most as many TTA views, views being a fixed prefix.
+    """
+
+    def __init__(self, max_items: int = 1024, directory: Path | None = None) -> None:
+        self.max_items = max_items
+        self.directory = Path(directory) if directory else None
+        self.stats = EmbeddingCacheStats()
+        self._cache: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        # Inference may run in several executor threads
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint: str, content_hash: str, views: int) -> np.ndarray | None:
+        key = (fingerprint, content_hash)
+        with self._lock:
+            features = self._cache.get(key)
+            if features is not None and len(features) >= views:
+                self._cache.move_to_end(key)
+                self.stats.memory_hits += 1
+                return features[:views]
+
+        features = self._load(fingerprint, content_hash)
+        if features is None or len(features) < views:
+            with self._lock:
+                self.stats.misses += 1
+            return None
+
+        with self._lock:
+            self.stats.disk_hits += 1
+            self._remember(key, features)
+
+        return features[:views]
+
+    def put(self, fingerprint: str, content_hash: str, features: np.ndarray) -> None:
+        with self._lock:
+            self._remember((fingerprint, content_hash), features)
+            self.stats.stored += 1
+
+        self._save(fingerprint, content_hash, features)
+
+    def _remember(self, key: tuple[str, str], features: np.ndarray) -> None:
+        if self.max_items <= 0:
+            return
+
+        self._cache[key] = features
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_items:
+            self._cache.popitem(last=False)
+
+    def _get_path(self, fingerprint: str, content_hash: str) -> Path:
+        return self.directory / fingerprint / f"{content_hash}.npy"
+
+    def _load(self, fingerprint: str, content_hash: str) -> np.ndarray | None:
+        if self.directory is None:
+            return None
+
+        path = self._get_path(fingerprint, content_hash)
+        if not path.exists():
+            return None
+
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            logger.exception("Error while reading embeddings %s", path)
+            return None
+
+    def _save(self, fingerprint: str, content_hash: str, features: np.ndarray) -> None:
+        if self.directory is None:
+            return
+
+        path = self._get_path(fingerprint, content_hash)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # np.save appends .npy to names without it
+            tmp_path = path.with_name(f"{path.stem}.{uuid.uuid4().hex}.tmp.npy")
+            np.save(tmp_path, features)
+            tmp_path.replace(path)
+        except OSError:
+            logger.exception("Error while saving embeddings %s", path)
+
+
+def set_content_hash(image: Image.Image, content_hash: str | None) -> Image.Image:
+    """
+    Keys the cached features of a decoded upload (artifact, preprocessed image) by the hash of the upload bytes,
+    so that it shares entries with the same upload predicted from its bytes.
+    """
+    if content_hash:
+        image.info[CONTENT_HASH_INFO_KEY] = content_hash
+    return image
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> EmbeddingCache:
+    settings = get_config()
+    return EmbeddingCache(
+        max_items=settings.ML_EMBEDDING_CACHE_SIZE,
+        directory=settings.ML_EMBEDDING_CACHE_DIR if settings.ML_EMBEDDING_CACHE_PERSIST else None,
+    )
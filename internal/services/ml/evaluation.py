@@ -0,0 +1,237 @@
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+from pydantic import BaseModel
+from torch.utils.flop_counter import FlopCounterMode
+
+from internal.config import get_config
+from internal.entities.schemas.ml import InferencePathEnum, PredictEnum
+from internal.services.ml.abcd import compute_abcd_vectors
+from internal.services.ml.model import BaseInferenceModel, PyTorchModel
+from internal.utils.crypto import hash_content
+from internal.utils.pruning import PruningConfig
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+class ModelComparisonReport(BaseModel):
+    samples: int
+    batch_size: int
+    agreement: float
+    mean_probability_drift: float
+    max_probability_drift: float
+    reference_seconds_per_image: float
+    candidate_seconds_per_image: float
+    speedup: float
+
+
+class CascadeThresholdReport(BaseModel):
+    threshold: float
+    # Share of images answered by the ResNet + ABCD head alone
+    fast_share: float
+    # Same class as the full model
+    agreement: float
+    # Only with labeled images
+    accuracy: float | None = None
+    seconds_per_image: float
+    speedup: float
+
+
+class CascadeReport(BaseModel):
+    samples: int
+    batch_size: int
+    full_accuracy: float | None = None
+    full_seconds_per_image: float
+    thresholds: list[CascadeThresholdReport]
+
+
+class PruningReport(BaseModel):
+    config: PruningConfig
+    dense_parameters: int
+    pruned_parameters: int
+    dense_flops: int
+    pruned_flops: int
+    comparison: ModelComparisonReport
+
+
+def load_sample_images(directory: Path | None = None, limit: int = 32, size: int = 512) -> list[bytes]:
+    """
+    Images from a local directory, or synthetic JPEGs when no directory is given.
+    Synthetic images are noise: good for tests and benchmarks, never for fitting or calibration.
+    """
+    if directory is not None:
+        files = sorted(elem for elem in Path(directory).iterdir() if elem.suffix.lower() in IMAGE_SUFFIXES)
+        return [elem.read_bytes() for elem in files[:limit]]
+
+    rng = np.random.default_rng(0)
+    result = []
+    for _ in range(limit):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, size=(size, size, 3), dtype=np.uint8)).save(buffer, format="JPEG")
+        result.append(buffer.getvalue())
+
+    return result
+
+
+def load_labeled_images(directory: Path, limit: int = 256) -> tuple[list[bytes], list[int] | None]:
+    """
+    Images of <directory>/<BENIGN|MALIGNANT|ANOTHER>/ labeled by their subdirectory,
+    or the images of a flat directory without labels.
+    """
+    directory = Path(directory)
+    classes = {elem.name: elem for elem in PredictEnum}
+    subdirs = [elem for elem in sorted(directory.iterdir()) if elem.is_dir() and elem.name.upper() in classes]
+    if not subdirs:
+        return load_sample_images(directory=directory, limit=limit), None
+
+    files = [
+        (file, classes[subdir.name.upper()].value)
+        for subdir in subdirs
+        for file in subdir.iterdir()
+        if file.suffix.lower() in IMAGE_SUFFIXES
+    ]
+    # A stable shuffle, so that every class is represented when the limit cuts the list
+    files = sorted(files, key=lambda elem: hash_content(str(elem[0]).encode()))[:limit]
+
+    return [file.read_bytes() for file, _ in files], [label for _, label in files]
+
+
+def _predict_proba(
+    model: BaseInferenceModel,
+    images: list[bytes],
+    abcd: list[list[float]],
+    batch_size: int,
+) -> tuple[torch.Tensor, list[InferencePathEnum], float]:
+    start = time.perf_counter()
+    result = [
+        model.predict_proba_paths(
+            images=images[index : index + batch_size],
+            abcd=abcd[index : index + batch_size] if model.accepts_abcd else None,
+        )
+        for index in range(0, len(images), batch_size)
+    ]
+    seconds = time.perf_counter() - start
+
+    return torch.cat([probs for probs, _ in result]), [path for _, paths in result for path in paths], seconds
+
+
+def compare_models(
+    reference: BaseInferenceModel,
+    candidate: BaseInferenceModel,
+    images: list[bytes],
+    batch_size: int = 8,
+    warmup: int = 1,
+) -> ModelComparisonReport:
+    """
+    Agreement of predicted classes, probability drift and latency of candidate against reference.
+    """
+    abcd = compute_abcd_vectors(images, size=get_config().ML_ABCD_IMAGE_SIZE or None)
+
+    for model in [reference, candidate]:
+        for _ in range(warmup):
+            _predict_proba(model, images[:batch_size], abcd[:batch_size], batch_size)
+
+    reference_probs, _, reference_seconds = _predict_proba(reference, images, abcd, batch_size)
+    candidate_probs, _, candidate_seconds = _predict_proba(candidate, images, abcd, batch_size)
+
+    drift = (reference_probs - candidate_probs).abs()
+
+    return ModelComparisonReport(
+        samples=len(images),
+        batch_size=batch_size,
+        agreement=(reference_probs.argmax(dim=1) == candidate_probs.argmax(dim=1)).float().mean().item(),
+        mean_probability_drift=drift.mean().item(),
+        max_probability_drift=drift.max().item(),
+        reference_seconds_per_image=reference_seconds / len(images),
+        candidate_seconds_per_image=candidate_seconds / len(images),
+        speedup=reference_seconds / candidate_seconds if candidate_seconds else 0.0,
+    )
+
+
+def _accuracy(probs: torch.Tensor, labels: list[int] | None) -> float | None:
+    if labels is None:
+        return None
+
+    return (probs.argmax(dim=1) == torch.tensor(labels)).float().mean().item()
+
+
+def evaluate_cascade(  # noqa: PLR0913
+    model: PyTorchModel,
+    images: list[bytes],
+    thresholds: list[float],
+    labels: list[int] | None = None,
+    batch_size: int = 8,
+    warmup: int = 1,
+) -> CascadeReport:
+    """
+    Accuracy (or agreement with the full model) and latency of the cascade at every threshold.
+    The model must have its cascade head loaded, its threshold is restored afterwards.
+    """
+    abcd = compute_abcd_vectors(images, size=get_config().ML_ABCD_IMAGE_SIZE or None)
+    cascade_threshold = model.cascade_threshold
+
+    try:
+        model.cascade_threshold = 0.0
+        for _ in range(warmup):
+            _predict_proba(model, images[:batch_size], abcd[:batch_size], batch_size)
+        full_probs, _, full_seconds = _predict_proba(model, images, abcd, batch_size)
+
+        reports = []
+        for threshold in thresholds:
+            model.cascade_threshold = threshold
+            probs, paths, seconds = _predict_proba(model, images, abcd, batch_size)
+            reports.append(
+                CascadeThresholdReport(
+                    threshold=threshold,
+                    fast_share=paths.count(InferencePathEnum.FAST) / len(paths),
+                    agreement=(probs.argmax(dim=1) == full_probs.argmax(dim=1)).float().mean().item(),
+                    accuracy=_accuracy(probs, labels),
+                    seconds_per_image=seconds / len(images),
+                    speedup=full_seconds / seconds if seconds else 0.0,
+                ),
+            )
+    finally:
+        model.cascade_threshold = cascade_threshold
+
+    return CascadeReport(
+        samples=len(images),
+        batch_size=batch_size,
+        full_accuracy=_accuracy(full_probs, labels),
+        full_seconds_per_image=full_seconds / len(images),
+        thresholds=reports,
+    )
+
+
+def count_flops(model: PyTorchModel) -> int:
+    """
+    FLOPs of a forward pass on a single image.
+    """
+    image = model.get_warmup_image()
+    data = model.transform(image).unsqueeze(0)
+    abcd = torch.tensor([model.get_abcd_vector(np.array(image))]) if model.accepts_abcd else None
+
+    with FlopCounterMode(display=False) as counter:
+        model.forward(data, abcd)
+
+    return counter.get_total_flops()
+
+
+def report_pruning(
+    dense: PyTorchModel,
+    pruned: PyTorchModel,
+    config: PruningConfig,
+    images: list[bytes],
+    batch_size: int = 8,
+) -> PruningReport:
+    return PruningReport(
+        config=config,
+        dense_parameters=sum(param.numel() for param in dense.model.parameters()),
+        pruned_parameters=sum(param.numel() for param in pruned.model.parameters()),
+        dense_flops=count_flops(dense),
+        pruned_flops=count_flops(pruned),
+        comparison=compare_models(reference=dense, candidate=pruned, images=images, batch_size=batch_size),
+    )
@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any
+
+from pydantic import BaseModel
+
+from internal.config import get_config
+from internal.config.base import ExecutorKindEnum
+from internal.config.cpu import get_cpu_layout, set_thread_limits
+from internal.utils import log
+from internal.utils.metrics import TimingStats
+
+logger = log.get_logger()
+
+
+class InferenceExecutorStats(BaseModel):
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    waiting: int = 0
+    in_flight: int = 0
+    queue_wait: TimingStats = TimingStats()
+    execution: TimingStats = TimingStats()
+
+
+def _timed_call(func: Callable[..., Any], *args: Any) -> tuple[Any, float, float]:  # noqa: ANN401
+    # time.monotonic is system-wide, so timestamps from a pool process are comparable with the caller's
+    started = time.monotonic()
+    result = func(*args)
+    return result, started, time.monotonic()
+
+
+class InferenceExecutor:
+    """
+    Runs blocking inference work (decode, ABCD extraction, forward pass) outside the event loop.
+    At most max_workers + max_queue calls are handed to the pool, the rest wait on the semaphore.
+    """
+
+    def __init__(
+        self,
+        kind: ExecutorKindEnum,
+        max_workers: int = 1,
+        max_queue: int = 32,
+        initializer: Callable[[], None] | None = None,
+    ) -> None:
+        self.kind = kind
+        self.max_workers = max(max_workers, 1)
+        self.max_queue = max(max_queue, 0)
+        # Runs once in every pool process, e.g. to set its thread limits
+        self.initializer = initializer
+        self.stats = InferenceExecutorStats()
+        self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        self._pool: Executor | None = None
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            self._pool = self._create_pool()
+            logger.info("Inference executor started: %s, workers %s", self.kind.value, self.max_workers)
+
+        return self._pool
+
+    @property
+    def queue_depth(self) -> int:
+        return self.stats.waiting + self.stats.in_flight
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:  # noqa: ANN401
+        submitted = time.monotonic()
+        self.stats.submitted += 1
+        self.stats.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats.waiting -= 1
+
+        self.stats.in_flight += 1
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self.pool,
+                _timed_call,
+                func,
+                *args,
+            )
+        except Exception:
+            self.stats.failed += 1
+            raise
+        finally:
+            self.stats.in_flight -= 1
+            self._slots.release()
+
+        self.stats.completed += 1
+        self.stats.queue_wait.observe(max(started - submitted, 0.0))
+        self.stats.execution.observe(finished - started)
+
+        return result
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _create_pool(self) -> Executor:
+        if self.kind == ExecutorKindEnum.PROCESS:
+            # fork after torch has started its thread pools may deadlock the child
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+            )
+
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+
+@lru_cache(maxsize=1)
+def get_inference_executor() -> InferenceExecutor:
+    settings = get_config()
+    initializer = None
+    if settings.ML_CPU_BUDGET:
+        layout = get_cpu_layout()
+        initializer = partial(
+            set_thread_limits,
+            layout.intra_op_threads,
+            layout.inter_op_threads,
+            layout.opencv_threads,
+        )
+
+    return InferenceExecutor(
+        kind=settings.ML_EXECUTOR_KIND,
+        max_workers=settings.ML_EXECUTOR_WORKERS,
+        max_queue=settings.ML_EXECUTOR_MAX_QUEUE,
+        initializer=initializer,
+    )
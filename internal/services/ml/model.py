@@ -1,84 +1,254 @@
+import contextlib
+import hashlib
 import inspect
+import io
 import math
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
 
 import cv2
 import numpy as np
 import torch
-from PIL import Image
+from PIL import Image, ImageOps
+from pydantic import BaseModel
 from torch import nn
 from torchvision import transforms
 
 from internal.config import get_config
+from internal.config.base import CompileModeEnum
+from internal.config.cpu import cpu_supports_bf16
+from internal.entities.schemas.ml import InferencePathEnum, ModelPrecisionEnum
+from internal.services.ml.embeddings import CONTENT_HASH_INFO_KEY, get_embedding_cache
 from internal.utils import log
+from internal.utils.crypto import hash_content
+from internal.utils.pruning import PRUNING_CONFIG_KEY, PruningConfig, resize_model
+
+if TYPE_CHECKING:
+    from internal.services.ml.embeddings import EmbeddingCache
 
 logger = log.get_logger()
 
+# Fixed test-time augmentations (dihedral group of the square) applied to a [batch, C, H, W] tensor
+TTA_VIEWS: tuple[Callable[[torch.Tensor], torch.Tensor], ...] = (
+    lambda x: x,
+    lambda x: torch.flip(x, dims=[3]),
+    lambda x: torch.flip(x, dims=[2]),
+    lambda x: torch.rot90(x, k=1, dims=[2, 3]),
+    lambda x: torch.rot90(x, k=2, dims=[2, 3]),
+    lambda x: torch.rot90(x, k=3, dims=[2, 3]),
+    lambda x: torch.rot90(torch.flip(x, dims=[3]), k=1, dims=[2, 3]),
+    lambda x: torch.rot90(torch.flip(x, dims=[3]), k=3, dims=[2, 3]),
+)
 
-class PyTorchModel:
-    def __init__(
-        self,
-        model: nn.Module,
-    ) -> None:
-        self.model = model
 
-        sig = inspect.signature(self.model.forward)
-        self._accepts_abcd = len(sig.parameters) >= 2  # noqa: PLR2004
+class Prediction(NamedTuple):
+    result: int
+    probability: float
+    path: InferencePathEnum = InferencePathEnum.FULL
+
+
+class ModelWarmupReport(BaseModel):
+    compile_mode: CompileModeEnum = CompileModeEnum.EAGER
+    compile_seconds: float = 0.0
+    compile_error: str | None = None
+    batch_sizes: list[int] = []
+    warmup_seconds: float = 0.0
+    # Reduced precision the forward passes actually run in, None - FP32 (or INT8 weights)
+    autocast_dtype: str | None = None
+
+
+class BaseInferenceModel(ABC):
+    """
+    Preprocessing and postprocessing shared by inference backends.
+    A backend only implements the forward pass on an already transformed batch.
+    """
+
+    INPUT_SIZE = 224
+
+    def __init__(self, *, accepts_abcd: bool) -> None:
+        settings = get_config()
+        self.transform = self.get_transformer()
+        self.image_size = settings.ML_DECODE_IMAGE_SIZE or None
+        self.abcd_image_size = settings.ML_ABCD_IMAGE_SIZE or None
+        self._accepts_abcd = accepts_abcd
+        self.warmup_report = ModelWarmupReport()
+        # Version of the loaded weights, set by the model registry
+        self.version = 1
+
+    @property
+    def accepts_abcd(self) -> bool:
+        return self._accepts_abcd
+
+    @abstractmethod
+    def forward(self, data: torch.Tensor, abcd: torch.Tensor | None) -> torch.Tensor:
+        """Returns logits [batch, num_classes] on CPU."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def memory_bytes(self) -> int:
+        raise NotImplementedError
 
     @staticmethod
     def get_transformer() -> transforms.Compose:
         return transforms.Compose(
             [
-                transforms.Resize((224, 224)),
-                transforms.RandomHorizontalFlip(),
-                transforms.RandomRotation(360),
+                transforms.Resize((BaseInferenceModel.INPUT_SIZE, BaseInferenceModel.INPUT_SIZE)),
                 transforms.ToTensor(),
                 transforms.Normalize(mean=[0.5], std=[0.5]),
             ],
         )
 
-    def load_model(self, path_to_weights: str) -> None:
-        state_dict = torch.load(path_to_weights, map_location=torch.device(get_config().ML_DEVICE))
-        self.model.load_state_dict(state_dict)
-        self.model.eval()
+    @staticmethod
+    def open_image(image_input: str | Path | bytes | Image.Image, size: int | None = None) -> Image.Image:
+        """
+        RGB image in its EXIF orientation. With size the image is decoded close to, but not below,
+        size x size: JPEG through DCT scaling (draft mode), other formats through an integer reduce.
+        """
+        if isinstance(image_input, Image.Image):
+            return image_input
+
+        if isinstance(image_input, bytes):
+            image_input = io.BytesIO(image_input)
+
+        image = Image.open(image_input)
+        if size and image.format == "JPEG":
+            image.draft("RGB", (size, size))
+
+        image = ImageOps.exif_transpose(image)
+        if size:
+            factor = min(image.size) // size
+            if factor > 1:
+                image = image.reduce(factor)
+
+        return image.convert("RGB")
 
     def predict(
         self,
-        image_input: str | Path | Image.Image,
+        image_input: str | Path | bytes | Image.Image,
+        transform: transforms.Compose | None = None,
+        tta_views: int = 1,
+        abcd: list[float] | None = None,
+    ) -> Prediction:
+        return self.predict_batch(
+            images=[image_input],
+            transform=transform,
+            tta_views=tta_views,
+            abcd=[abcd] if abcd is not None else None,
+        )[0]
+
+    def predict_batch(
+        self,
+        images: list[str | Path | bytes | Image.Image],
         transform: transforms.Compose | None = None,
-    ) -> tuple[int, float]:
-        img = Image.open(image_input).convert("RGB") if isinstance(image_input, (str, Path)) else image_input
+        tta_views: int = 1,
+        abcd: list[list[float]] | None = None,
+    ) -> list[Prediction]:
+        probs, paths = self.predict_proba_paths(images=images, transform=transform, tta_views=tta_views, abcd=abcd)
+        prob_value, pred_idx = probs.max(dim=1)
 
-        if transform is None:
-            transform = self.get_transformer()
+        return [
+            Prediction(result=result, probability=probability, path=path)
+            for result, probability, path in zip(pred_idx.tolist(), prob_value.tolist(), paths, strict=True)
+        ]
 
-        data = transform(img).unsqueeze(0)
-        device = next(self.model.parameters()).device
-        data = data.to(device)
-        self.model.eval()
+    def predict_proba_batch(
+        self,
+        images: list[str | Path | bytes | Image.Image],
+        transform: transforms.Compose | None = None,
+        tta_views: int = 1,
+        abcd: list[list[float]] | None = None,
+    ) -> torch.Tensor:
+        """
+        Returns class probabilities [batch, num_classes].
+        tta_views > 1 runs that many fixed augmentations of every image in the same forward pass
+        (batch grows tta_views times) and averages the softmax over views.
+        abcd - precomputed ABCD vectors, extracted from the images when omitted.
+        """
+        return self.predict_proba_paths(images=images, transform=transform, tta_views=tta_views, abcd=abcd)[0]
+
+    def predict_proba_paths(
+        self,
+        images: list[str | Path | bytes | Image.Image],
+        transform: transforms.Compose | None = None,
+        tta_views: int = 1,
+        abcd: list[list[float]] | None = None,
+    ) -> tuple[torch.Tensor, list[InferencePathEnum]]:
+        """
+        predict_proba_batch with the path every image took through the model.
+        """
+        imgs = [self.open_image(elem, size=self.image_size) for elem in images]
+        views = TTA_VIEWS[: min(max(tta_views, 1), len(TTA_VIEWS))]
         abcd_tensor = None
 
         if self._accepts_abcd:
-            # cv2 ожидает NumPy RGB
-            np_img = np.array(img)
-            feats = self.compute_abcd_features(np_img)
-            vec = [
-                feats["asymmetry"],
-                feats["border_irregularity"],
-                feats["color_variation"],
-                feats["diameter"],
-                feats["abcd_score"],
-            ]
-            abcd_tensor = torch.tensor(vec, dtype=torch.float32, device=device).unsqueeze(0)
-
-        args = (data, abcd_tensor) if self._accepts_abcd else (data,)
+            if abcd is None:
+                abcd_imgs = imgs
+                if self.abcd_image_size != self.image_size:
+                    abcd_imgs = [self.open_image(elem, size=self.abcd_image_size) for elem in images]
+                # cv2 ожидает NumPy RGB
+                abcd = [self.get_abcd_vector(np.array(img)) for img in abcd_imgs]
+            vectors = abcd
+            abcd_tensor = torch.tensor(vectors, dtype=torch.float32).repeat(len(views), 1)
 
-        with torch.no_grad():
-            logits = self.model(*args)
-            probs = nn.functional.softmax(logits, dim=1)
-            prob_value, pred_idx = probs.max(dim=1)
+        with torch.no_grad(), self.inference_context():
+            logits, paths = self.forward_views(images, imgs, views, transform, abcd_tensor)
+            probs = nn.functional.softmax(logits.float(), dim=1)
+            return probs.view(len(views), len(imgs), -1).mean(dim=0), paths
 
-        return pred_idx.item(), prob_value.item()
+    def forward_views(
+        self,
+        images: list[str | Path | bytes | Image.Image],  # noqa: ARG002
+        imgs: list[Image.Image],
+        views: tuple[Callable[[torch.Tensor], torch.Tensor], ...],
+        transform: transforms.Compose | None,
+        abcd: torch.Tensor | None,
+    ) -> tuple[torch.Tensor, list[InferencePathEnum]]:
+        """
+        Logits [views * batch, num_classes], view-major, and the path of every image.
+        images are the raw inputs, imgs the decoded ones.
+        """
+        data = torch.stack([(transform or self.transform)(img) for img in imgs])
+        data = torch.cat([view(data) for view in views])
+        return self.forward(data, abcd), [InferencePathEnum.FULL] * len(imgs)
+
+    def inference_context(self) -> contextlib.AbstractContextManager:
+        """Context of every forward pass, e.g. reduced precision autocast."""
+        return contextlib.nullcontext()
+
+    @staticmethod
+    def get_warmup_image() -> Image.Image:
+        return Image.fromarray(np.random.default_rng(0).integers(0, 255, size=(256, 256, 3), dtype=np.uint8))
+
+    def warmup(self, batch_sizes: list[int]) -> float:
+        """
+        Forward passes on synthetic images at every expected batch size, so that kernel selection,
+        allocator growth and graph specialization happen before the first real request.
+        """
+        image = self.get_warmup_image()
+
+        start = time.perf_counter()
+        for batch_size in batch_sizes:
+            self.predict_proba_batch([image] * batch_size)
+
+        self.warmup_report.batch_sizes = list(batch_sizes)
+        self.warmup_report.warmup_seconds = time.perf_counter() - start
+
+        return self.warmup_report.warmup_seconds
+
+    @classmethod
+    def get_abcd_vector(cls, image: np.ndarray) -> list[float]:
+        feats = cls.compute_abcd_features(image)
+        return [
+            feats["asymmetry"],
+            feats["border_irregularity"],
+            feats["color_variation"],
+            feats["diameter"],
+            feats["abcd_score"],
+        ]
 
     @staticmethod
     def compute_abcd_features(image: str | Path) -> dict[str, float]:
@@ -149,3 +319,446 @@ class PyTorchModel:
             "diameter": diameter,
             "abcd_score": abcd_score,
         }
+
+
+class PyTorchModel(BaseInferenceModel):
+    def __init__(
+        self,
+        model: nn.Module,
+        precision: ModelPrecisionEnum = ModelPrecisionEnum.FP32,
+    ) -> None:
+        self.model = model
+        self.precision = ModelPrecisionEnum(precision)
+        self.weights_path: Path | None = None
+        self.weights_mtime_ns: int | None = None
+        self.graph: Callable[..., torch.Tensor] | None = None
+        # Builds the architecture, set by from_checkpoint and used by pool workers to restore the model
+        self.model_factory: Callable[[], nn.Module] | None = None
+        self.pruning_config: PruningConfig | None = None
+        # Set for models split into forward_features/forward_head, see forward_views
+        self.embedding_cache: EmbeddingCache | None = None
+        self._backbone_fingerprint: str | None = None
+        # First stage of a cascade, see load_cascade_head
+        self.cascade_head: nn.Module | None = None
+        self.cascade_threshold = 0.0
+
+        sig = inspect.signature(self.model.forward)
+        super().__init__(accepts_abcd=len(sig.parameters) >= 2)  # noqa: PLR2004
+
+        self.autocast_dtype = self._get_autocast_dtype()
+        if self.autocast_dtype is not None:
+            self.warmup_report.autocast_dtype = str(self.autocast_dtype).removeprefix("torch.")
+
+    def _get_autocast_dtype(self) -> torch.dtype | None:
+        """
+        bfloat16 for BF16 models where the device runs it natively (or ML_BF16_REQUIRE_NATIVE is off), else FP32.
+        Weights stay in FP32, so they are still shared between workers through the memory-mapped checkpoint.
+        """
+        if self.precision != ModelPrecisionEnum.BF16:
+            return None
+
+        settings = get_config()
+        device = torch.device(settings.ML_DEVICE).type
+        native = torch.cuda.is_bf16_supported() if device == "cuda" else device == "cpu" and cpu_supports_bf16()
+        if not native and settings.ML_BF16_REQUIRE_NATIVE:
+            logger.warning("No native bfloat16 on %s, BF16 model runs in FP32", device)
+            return None
+
+        return torch.bfloat16
+
+    def inference_context(self) -> contextlib.AbstractContextManager:
+        if self.autocast_dtype is None:
+            return contextlib.nullcontext()
+
+        return torch.autocast(device_type=torch.device(get_config().ML_DEVICE).type, dtype=self.autocast_dtype)
+
+    def __reduce__(self) -> tuple:
+        # Process pool workers receive a reference to the weights and keep their own loaded copy.
+        # The embedding cache is re-attached as the worker's own instance, it shares entries only through the disk store
+        if self.weights_path is None:
+            return PyTorchModel, (self.model, self.precision)
+
+        return _restore_model, (
+            self.model_factory or type(self.model),
+            self.weights_path,
+            self.weights_mtime_ns,
+            self.precision,
+            self.warmup_report.compile_mode,
+            self.cascade_threshold if self.cascade_head is not None else 0.0,
+            self.embedding_cache is not None,
+        )
+
+    @classmethod
+    def from_checkpoint(
+        cls,
+        model_factory: Callable[[], nn.Module],
+        path_to_weights: str | Path,
+        precision: ModelPrecisionEnum = ModelPrecisionEnum.FP32,
+    ) -> "PyTorchModel":
+        """
+        Builds the architecture on the meta device (no allocation, no initialization)
+        and assigns the checkpoint tensors to it.
+        """
+        with torch.device("meta"):
+            model = model_factory()
+
+        torch_model = cls(model=model, precision=precision)
+        torch_model.model_factory = model_factory
+        torch_model.load_model(path_to_weights)
+        return torch_model
+
+    def load_model(self, path_to_weights: str | Path) -> None:
+        path = Path(path_to_weights)
+
+        if self.precision == ModelPrecisionEnum.INT8:
+            self._load_int8(path)
+        else:
+            self._load_state_dict(path, device=get_config().ML_DEVICE)
+
+        self.model.eval()
+        self._backbone_fingerprint = None
+        self.weights_path = path
+        self.weights_mtime_ns = path.stat().st_mtime_ns
+
+    def _load_state_dict(self, path: Path, device: str) -> None:
+        try:
+            # Tensors stay backed by the page cache instead of being read into a private copy,
+            # so every worker mapping the same file shares one copy of the weights
+            state_dict = torch.load(path, map_location=torch.device(device), mmap=True, weights_only=True)
+        except RuntimeError:
+            # Checkpoints in the legacy (non zip) format can not be memory-mapped
+            state_dict = torch.load(path, map_location=torch.device(device), weights_only=True)
+
+        self._apply_pruning_config(state_dict)
+        # assign=True keeps the loaded tensors instead of copying them into the module, meta modules included
+        self.model.load_state_dict(state_dict, assign=True)
+
+        not_loaded = [name for name, tensor in self._named_tensors() if tensor.is_meta]
+        if not_loaded:
+            msg = f"Tensors missing in checkpoint {path}: {not_loaded}"
+            raise RuntimeError(msg)
+
+    def _apply_pruning_config(self, state_dict: dict) -> None:
+        """
+        A pruned checkpoint carries its architecture, the dense model is reshaped to match it before loading.
+        """
+        config = state_dict.pop(PRUNING_CONFIG_KEY, None)
+        if config is not None:
+            self.pruning_config = PruningConfig.model_validate(config)
+            resize_model(self.model, self.pruning_config)
+
+    def _named_tensors(self) -> list[tuple[str, torch.Tensor]]:
+        return [*self.model.named_parameters(), *self.model.named_buffers()]
+
+    @staticmethod
+    def quantize_dynamic(model: nn.Module) -> nn.Module:
+        return torch.ao.quantization.quantize_dynamic(model.cpu().eval(), {nn.Linear}, dtype=torch.qint8)
+
+    def _load_int8(self, path: Path) -> None:
+        """
+        Dynamic INT8 quantization of every nn.Linear (CPU only).
+        The quantized state dict is cached next to the checkpoint as <name>.int8.pth.
+        """
+        cache_path = path.with_name(f"{path.stem}.int8{path.suffix}")
+
+        if cache_path.exists() and cache_path.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            # Layer shapes are all that matters here, the cached state dict replaces the weights
+            state_dict = torch.load(cache_path, map_location="cpu", weights_only=True)
+            self._apply_pruning_config(state_dict)
+            if any(tensor.is_meta for _, tensor in self._named_tensors()):
+                self.model = self.model.to_empty(device="cpu")
+            self.model = self.quantize_dynamic(self.model)
+            self.model.load_state_dict(state_dict)
+            return
+
+        logger.info("Quantize %s to INT8", path)
+        self._load_state_dict(path, device="cpu")
+        self.model = self.quantize_dynamic(self.model)
+
+        state_dict = self.model.state_dict()
+        if self.pruning_config is not None:
+            state_dict[PRUNING_CONFIG_KEY] = self.pruning_config.model_dump()
+
+        tmp_path = cache_path.with_name(f"{cache_path.name}.tmp")
+        torch.save(state_dict, tmp_path)
+        tmp_path.replace(cache_path)
+
+    def compile(self, mode: CompileModeEnum, batch_size: int = 1) -> float:
+        """
+        TRACE - frozen TorchScript graph traced on a batch of batch_size, COMPILE - torch.compile.
+        On any error the model keeps running eagerly. Returns the compilation time in seconds.
+        Skipped for a staged model: the graph would never run, and a traced one would not share its weights.
+        """
+        mode = CompileModeEnum(mode)
+        self.graph = None
+        self.warmup_report.compile_mode = CompileModeEnum.EAGER
+        self.warmup_report.compile_error = None
+        if mode == CompileModeEnum.EAGER:
+            return 0.0
+
+        if self.staged:
+            logger.warning("Compilation %s skipped, the embedding cache or cascade runs the model eagerly", mode.value)
+            return 0.0
+
+        start = time.perf_counter()
+        try:
+            self.model.eval()
+            if mode == CompileModeEnum.TRACE:
+                device = next(self.model.parameters()).device
+                image = self.get_warmup_image()
+                args = (self.transform(image).repeat(batch_size, 1, 1, 1).to(device),)
+                if self.accepts_abcd:
+                    abcd = torch.tensor([self.get_abcd_vector(np.array(image))] * batch_size, dtype=torch.float32)
+                    args = (*args, abcd.to(device))
+
+                # Freezing folds the weights into private constants, they are no longer shared with other workers
+                with torch.no_grad(), self.inference_context():
+                    graph = torch.jit.freeze(torch.jit.trace(self.model, args, check_trace=False))
+            else:
+                graph = torch.compile(self.model)
+        except Exception as e:
+            logger.exception("Compilation %s failed, falling back to eager mode", mode.value)
+            self.warmup_report.compile_error = repr(e)
+            return 0.0
+
+        self.graph = graph
+        self.warmup_report.compile_mode = mode
+        self.warmup_report.compile_seconds = time.perf_counter() - start
+
+        logger.info("Model compiled (%s) in %.2f s", mode.value, self.warmup_report.compile_seconds)
+
+        return self.warmup_report.compile_seconds
+
+    def memory_bytes(self) -> int:
+        # Quantized layers keep their weights in packed params, which are only visible through the state dict
+        tensors = []
+        for value in self.model.state_dict().values():
+            tensors.extend(value if isinstance(value, tuple) else [value])
+
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors if isinstance(tensor, torch.Tensor))
+
+    @property
+    def has_feature_stage(self) -> bool:
+        return all(hasattr(self.model, name) for name in ["feature_modules", "forward_features", "forward_head"])
+
+    @property
+    def backbone_fingerprint(self) -> str:
+        """
+        SHA-256 of the decode size and the feature stage weights: checkpoints sharing a backbone share cached features.
+        """
+        if self._backbone_fingerprint is None:
+            digest = hashlib.sha256(repr(self.image_size).encode())
+            if self.autocast_dtype is not None:
+                # Features computed in reduced precision are not shared with the FP32 model
+                digest.update(repr(self.autocast_dtype).encode())
+            for module in self.model.feature_modules():
+                for name, value in module.state_dict().items():
+                    digest.update(name.encode())
+                    _update_digest(digest, value)
+            self._backbone_fingerprint = digest.hexdigest()
+
+        return self._backbone_fingerprint
+
+    @property
+    def staged(self) -> bool:
+        """Predictions run stage by stage through the embedding cache or the cascade, see forward_views."""
+        cascade = self.cascade_head is not None and self.cascade_threshold > 0
+        return self.has_feature_stage and (self.embedding_cache is not None or cascade)
+
+    @property
+    def has_cascade_stage(self) -> bool:
+        return self.has_feature_stage and all(
+            hasattr(self.model, name) for name in ["build_cascade_head", "forward_cnn_features", "forward_vit_features"]
+        )
+
+    @staticmethod
+    def get_cascade_path(path_to_weights: str | Path) -> Path:
+        path = Path(path_to_weights)
+        return path.with_name(f"{path.stem}.cascade.pth")
+
+    def load_cascade_head(self, path: Path, threshold: float) -> bool:
+        """
+        Enables the cascade with a head fitted for these weights (cli.ml cascade-fit), False when there is none.
+        """
+        if not self.has_cascade_stage or not path.exists():
+            return False
+
+        head = self.model.build_cascade_head()
+        head.load_state_dict(torch.load(path, map_location=next(head.parameters()).device, weights_only=True))
+        self.cascade_head, self.cascade_threshold = head.eval(), threshold
+        return True
+
+    def forward_views(
+        self,
+        images: list[str | Path | bytes | Image.Image],
+        imgs: list[Image.Image],
+        views: tuple[Callable[[torch.Tensor], torch.Tensor], ...],
+        transform: transforms.Compose | None,
+        abcd: torch.Tensor | None,
+    ) -> tuple[torch.Tensor, list[InferencePathEnum]]:
+        """
+        Stage-wise forward pass. With an embedding cache the backbone only runs for images whose features
+        are not cached. With a cascade the ResNet + ABCD head classifies the rest first, and the ViT branch
+        only runs for images whose confidence (max probability averaged over views) is below cascade_threshold.
+        A custom transform bypasses both, features are cached per image content.
+        Both stages run eagerly here, a compiled graph only covers the full forward pass.
+        """
+        staged = transform is None and self.has_feature_stage
+        use_cache = (
+            staged
+            and self.embedding_cache is not None
+            and all(isinstance(elem, bytes | Image.Image) for elem in images)
+        )
+        use_cascade = staged and abcd is not None and self.cascade_head is not None and self.cascade_threshold > 0
+        if not use_cache and not use_cascade:
+            return super().forward_views(images, imgs, views, transform, abcd)
+
+        batch, num_views = len(imgs), len(views)
+        paths = [InferencePathEnum.FULL] * batch
+        # Image index -> logits of its views [views, num_classes]
+        logits: dict[int, torch.Tensor] = {}
+
+        features: list[np.ndarray | None] = [None] * batch
+        if use_cache:
+            fingerprint = self.backbone_fingerprint
+            hashes = [self._get_content_hash(elem) for elem in images]
+            features = [self.embedding_cache.get(fingerprint, content_hash, num_views) for content_hash in hashes]
+        missing = [index for index, elem in enumerate(features) if elem is None]
+
+        device = next(self.model.parameters()).device
+        self.model.eval()
+
+        if missing:
+            data = torch.stack([self.transform(imgs[index]) for index in missing])
+            data = torch.cat([view(data) for view in views]).to(device)
+
+            confident: dict[int, torch.Tensor] = {}
+            if use_cascade:
+                confident, computed = self._forward_cascade(
+                    data,
+                    _view_rows(abcd, missing, batch).to(device),
+                    len(missing),
+                )
+                for position, index in enumerate(missing):
+                    paths[index] = InferencePathEnum.FAST if position in confident else InferencePathEnum.ESCALATED
+                    if position in confident:
+                        logits[index] = confident[position]
+            else:
+                computed = self.model.forward_features(data)
+
+            computed_for = [index for position, index in enumerate(missing) if position not in confident]
+            if computed_for:
+                computed = computed.float().cpu().view(num_views, len(computed_for), -1)
+            for position, index in enumerate(computed_for):
+                features[index] = computed[:, position].contiguous().numpy()
+                if use_cache:
+                    self.embedding_cache.put(fingerprint, hashes[index], features[index])
+
+        logits.update(self._forward_head(features, abcd, device))
+
+        return torch.stack([logits[index] for index in range(batch)], dim=1).reshape(num_views * batch, -1), paths
+
+    def _forward_head(
+        self,
+        features: list[np.ndarray | None],
+        abcd: torch.Tensor | None,
+        device: torch.device,
+    ) -> dict[int, torch.Tensor]:
+        """Logits [views, num_classes] of the images with backbone features [views, dim], by index."""
+        full = [index for index, elem in enumerate(features) if elem is not None]
+        if not full:
+            return {}
+
+        # [views, images, dim] -> [views * images, dim], view-major like the full forward pass
+        stacked = torch.from_numpy(np.stack([np.asarray(features[index]) for index in full], axis=1))
+        num_views = stacked.shape[0]
+        args = (stacked.reshape(num_views * len(full), -1).to(device),)
+        if abcd is not None:
+            args = (*args, _view_rows(abcd, full, len(features)).to(device))
+
+        head = self.model.forward_head(*args).float().cpu().view(num_views, len(full), -1)
+        return {index: head[:, position] for position, index in enumerate(full)}
+
+    def _forward_cascade(
+        self,
+        data: torch.Tensor,
+        abcd: torch.Tensor,
+        count: int,
+    ) -> tuple[dict[int, torch.Tensor], torch.Tensor | None]:
+        """
+        Cascade over a view-major batch of count images: logits [views, num_classes] of the images
+        the head is confident about, by position, and the full features [views * escalated, dim] of the rest.
+        """
+        num_views = len(data) // count
+        cnn_features = self.model.forward_cnn_features(data)
+        fast = self.cascade_head(cnn_features, abcd).float().cpu().view(num_views, count, -1)
+        confidence = nn.functional.softmax(fast, dim=2).mean(dim=0).max(dim=1).values
+
+        confident = {pos: fast[:, pos] for pos in range(count) if confidence[pos] >= self.cascade_threshold}
+        escalated = [pos for pos in range(count) if pos not in confident]
+        if not escalated:
+            return confident, None
+
+        rows = _view_rows(torch.arange(len(data)), escalated, count)
+        return confident, torch.cat([cnn_features[rows], self.model.forward_vit_features(data[rows])], dim=1)
+
+    @staticmethod
+    def _get_content_hash(image_input: bytes | Image.Image) -> str:
+        if isinstance(image_input, bytes):
+            return hash_content(image_input)
+
+        # Decoded upload tagged with the hash of its bytes, see set_content_hash
+        if content_hash := image_input.info.get(CONTENT_HASH_INFO_KEY):
+            return content_hash
+
+        # Other decoded input, hashed by its pixels
+        header = f"{image_input.mode}:{image_input.width}x{image_input.height}:".encode()
+        return hash_content(header + image_input.tobytes())
+
+    def forward(self, data: torch.Tensor, abcd: torch.Tensor | None) -> torch.Tensor:
+        device = next(self.model.parameters()).device
+        args = (data.to(device), abcd.to(device)) if abcd is not None else (data.to(device),)
+
+        self.model.eval()
+        with torch.no_grad():
+            return (self.graph or self.model)(*args).cpu()
+
+
+def _view_rows(data: torch.Tensor, indices: list[int], batch: int) -> torch.Tensor:
+    """Rows of the given images from a view-major [views * batch, ...] tensor, view-major as well."""
+    num_views = len(data) // batch
+    return data[[view * batch + index for view in range(num_views) for index in indices]]
+
+
+def _update_digest(digest: "hashlib._Hash", value: object) -> None:
+    if isinstance(value, tuple | list):
+        for elem in value:
+            _update_digest(digest, elem)
+    elif isinstance(value, torch.Tensor):
+        # Quantized tensors are hashed by their integer values and quantization parameters
+        if value.is_quantized:
+            if value.qscheme() in (torch.per_tensor_affine, torch.per_tensor_symmetric):
+                digest.update(repr((value.q_scale(), value.q_zero_point())).encode())
+            value = value.int_repr()
+        digest.update(value.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy())
+    else:
+        digest.update(repr(value).encode())
+
+
+@lru_cache(maxsize=4)
+def _restore_model(  # noqa: PLR0913
+    model_factory: Callable[[], nn.Module],
+    weights_path: Path,
+    weights_mtime_ns: int | None,  # noqa: ARG001
+    precision: ModelPrecisionEnum,
+    compile_mode: CompileModeEnum = CompileModeEnum.EAGER,
+    cascade_threshold: float = 0.0,
+    embedding_cache: bool = False,  # noqa: FBT001, FBT002
+) -> PyTorchModel:
+    torch_model = PyTorchModel.from_checkpoint(model_factory, weights_path, precision=precision)
+    if embedding_cache:
+        torch_model.embedding_cache = get_embedding_cache()
+    if cascade_threshold > 0:
+        torch_model.load_cascade_head(PyTorchModel.get_cascade_path(weights_path), cascade_threshold)
+    torch_model.compile(compile_mode)
+    return torch_model
@@ -0,0 +1,105 @@
+from functools import lru_cache
+from pathlib import Path
+
+import onnxruntime as ort
+import torch
+from onnxruntime.quantization import QuantType
+from onnxruntime.quantization import quantize_dynamic as ort_quantize_dynamic
+
+from internal.config import get_config
+from internal.config.cpu import get_cpu_layout
+from internal.services.ml.model import BaseInferenceModel, PyTorchModel
+from internal.utils import log
+
+logger = log.get_logger()
+
+INPUT_IMAGE = "image"
+INPUT_ABCD = "abcd"
+OUTPUT_LOGITS = "logits"
+
+
+def export_onnx(torch_model: PyTorchModel, path: Path, num_abcd_features: int = 5) -> Path:
+    """
+    Exports the model to ONNX with a dynamic batch dimension on every input and output.
+    """
+    settings = get_config()
+    module = torch_model.model.eval()
+    device = next(module.parameters()).device
+
+    size = torch_model.INPUT_SIZE
+    args = [torch.randn(2, 3, size, size, device=device)]
+    input_names = [INPUT_IMAGE]
+    if torch_model.accepts_abcd:
+        args.append(torch.randn(2, num_abcd_features, device=device))
+        input_names.append(INPUT_ABCD)
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            tuple(args),
+            str(tmp_path),
+            input_names=input_names,
+            output_names=[OUTPUT_LOGITS],
+            dynamic_axes={name: {0: "batch"} for name in [*input_names, OUTPUT_LOGITS]},
+            opset_version=settings.ML_ONNX_OPSET,
+            do_constant_folding=True,
+            dynamo=False,
+        )
+    tmp_path.replace(path)
+
+    logger.info("Model exported to ONNX: %s", path)
+
+    return path
+
+
+def quantize_onnx(path: Path, output: Path) -> Path:
+    """
+    Dynamic INT8 quantization of the MatMul/Gemm weights of an exported graph.
+    """
+    tmp_path = output.with_name(f"{output.name}.tmp")
+    ort_quantize_dynamic(str(path), str(tmp_path), weight_type=QuantType.QInt8)
+    tmp_path.replace(output)
+
+    logger.info("ONNX model quantized to INT8: %s", output)
+
+    return output
+
+
+class OnnxModel(BaseInferenceModel):
+    def __init__(self, path: Path) -> None:
+        settings = get_config()
+        self.path = Path(path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.ML_ONNX_INTRA_OP_THREADS:
+            options.intra_op_num_threads = settings.ML_ONNX_INTRA_OP_THREADS
+        elif settings.ML_CPU_BUDGET:
+            options.intra_op_num_threads = get_cpu_layout().intra_op_threads
+            options.inter_op_num_threads = get_cpu_layout().inter_op_threads
+
+        self.session = ort.InferenceSession(str(self.path), sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = [elem.name for elem in self.session.get_inputs()]
+
+        super().__init__(accepts_abcd=INPUT_ABCD in self._input_names)
+
+    def __reduce__(self) -> tuple:
+        return _restore_onnx_model, (self.path, self.path.stat().st_mtime_ns)
+
+    def memory_bytes(self) -> int:
+        # Weights are held by the runtime, the graph size is the closest estimate available
+        return self.path.stat().st_size
+
+    def forward(self, data: torch.Tensor, abcd: torch.Tensor | None) -> torch.Tensor:
+        feeds = {INPUT_IMAGE: data.float().numpy()}
+        if abcd is not None and self.accepts_abcd:
+            feeds[INPUT_ABCD] = abcd.float().numpy()
+
+        (logits,) = self.session.run([OUTPUT_LOGITS], feeds)
+        return torch.from_numpy(logits)
+
+
+@lru_cache(maxsize=4)
+def _restore_onnx_model(path: Path, mtime_ns: int) -> OnnxModel:  # noqa: ARG001
+    return OnnxModel(path=path)
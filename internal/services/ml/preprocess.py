@@ -0,0 +1,76 @@
+import io
+from typing import NamedTuple
+
+import numpy as np
+from PIL import Image
+from pydantic import UUID4
+from torchvision.transforms import functional
+
+from internal.config import get_config
+from internal.services.ml.model import BaseInferenceModel
+
+
+class PreprocessedImage(NamedTuple):
+    image: Image.Image
+    abcd: list[float]
+
+
+def get_artifact_key(file_id: UUID4) -> str:
+    return f"{get_config().S3_DIR_NAME_FILE.strip('/')}/{file_id!s}.npz"
+
+
+def preprocess_image(
+    content: bytes,
+    image_size: int | None = None,
+    abcd_image_size: int | None = None,
+) -> PreprocessedImage:
+    """
+    Decodes an upload once: the model input resized to INPUT_SIZE x INPUT_SIZE and the ABCD vector.
+    The resize is the one of the model transform, so predictions do not change.
+    """
+    image = BaseInferenceModel.open_image(content, size=image_size)
+    abcd_image = image if abcd_image_size == image_size else BaseInferenceModel.open_image(content, abcd_image_size)
+
+    return PreprocessedImage(
+        image=_resize_input(image),
+        abcd=np.asarray(BaseInferenceModel.get_abcd_vector(np.array(abcd_image)), dtype=np.float32).tolist(),
+    )
+
+
+def decode_image(content: bytes, image_size: int | None = None) -> Image.Image:
+    """The model input of preprocess_image alone, for callers that take the ABCD vector from ABCDFeatureService."""
+    return _resize_input(BaseInferenceModel.open_image(content, size=image_size))
+
+
+def _resize_input(image: Image.Image) -> Image.Image:
+    size = BaseInferenceModel.INPUT_SIZE
+    return functional.resize(image, [size, size])
+
+
+def build_artifact(content: bytes, image_size: int | None = None, abcd_image_size: int | None = None) -> bytes:
+    """
+    Compressed .npz of preprocess_image (uint8 RGB, before normalization).
+    The decode sizes are stored too: an artifact built with other settings is not used.
+    """
+    preprocessed = preprocess_image(content, image_size, abcd_image_size)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        image=np.asarray(preprocessed.image, dtype=np.uint8),
+        abcd=np.asarray(preprocessed.abcd, dtype=np.float32),
+        decode_sizes=np.asarray([image_size or 0, abcd_image_size or 0]),
+    )
+    return buffer.getvalue()
+
+
+def read_artifact(
+    data: bytes,
+    image_size: int | None = None,
+    abcd_image_size: int | None = None,
+) -> PreprocessedImage | None:
+    with np.load(io.BytesIO(data)) as artifact:
+        if artifact["decode_sizes"].tolist() != [image_size or 0, abcd_image_size or 0]:
+            return None
+
+        return PreprocessedImage(image=Image.fromarray(artifact["image"]), abcd=artifact["abcd"].tolist())
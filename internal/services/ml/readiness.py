@@ -0,0 +1,90 @@
+import time
+from functools import lru_cache
+
+from pydantic import BaseModel
+
+from internal.entities.schemas.ml import ModelLoadStateEnum
+from internal.services.ml.model import BaseInferenceModel
+from internal.utils.metrics import ProcessMemoryStats
+
+
+class ModelReadiness(BaseModel):
+    key: str
+    name: str
+    state: ModelLoadStateEnum = ModelLoadStateEnum.PENDING
+    # Download, construction, compilation and warm-up
+    load_seconds: float | None = None
+    warmup_seconds: float | None = None
+    memory_bytes: int | None = None
+    error: str | None = None
+
+
+class ReadinessReport(BaseModel):
+    ready: bool
+    preloading: bool
+    models: list[ModelReadiness]
+    memory: ProcessMemoryStats
+
+
+class ReadinessTracker:
+    """
+    Load state of the models preloaded at worker start.
+    The worker is ready once the preload is over and at least one of its models can serve.
+    """
+
+    def __init__(self) -> None:
+        self.started = False
+        self.finished = False
+        self._models: dict[str, ModelReadiness] = {}
+        self._started_at: dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        if not self.finished:
+            return False
+
+        return not self._models or any(elem.state == ModelLoadStateEnum.READY for elem in self._models.values())
+
+    def start(self, models: dict[str, str]) -> None:
+        """Registers the models to preload, key -> name."""
+        self.started, self.finished = True, False
+        self._models = {key: ModelReadiness(key=key, name=name) for key, name in models.items()}
+
+    def loading(self, key: str) -> None:
+        self._models[key].state = ModelLoadStateEnum.LOADING
+        self._started_at[key] = time.perf_counter()
+
+    def loaded(self, key: str, model: BaseInferenceModel) -> None:
+        self._models[key] = self._models[key].model_copy(
+            update={
+                "state": ModelLoadStateEnum.READY,
+                "load_seconds": time.perf_counter() - self._started_at.pop(key),
+                "warmup_seconds": model.warmup_report.warmup_seconds,
+                "memory_bytes": model.memory_bytes(),
+            },
+        )
+
+    def failed(self, key: str, error: Exception) -> None:
+        self._models[key] = self._models[key].model_copy(
+            update={
+                "state": ModelLoadStateEnum.FAILED,
+                "load_seconds": time.perf_counter() - self._started_at.pop(key),
+                "error": str(error),
+            },
+        )
+
+    def finish(self) -> None:
+        self.started, self.finished = True, True
+
+    def report(self) -> ReadinessReport:
+        return ReadinessReport(
+            ready=self.ready,
+            preloading=self.started and not self.finished,
+            models=list(self._models.values()),
+            memory=ProcessMemoryStats.current(),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_readiness_tracker() -> ReadinessTracker:
+    return ReadinessTracker()
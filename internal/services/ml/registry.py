@@ -0,0 +1,208 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from pydantic import BaseModel
+
+from internal.config import get_config
+from internal.services.ml.model import BaseInferenceModel
+from internal.utils import log
+
+logger = log.get_logger()
+
+
+class WeightsFingerprint(NamedTuple):
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def from_path(cls, path: Path) -> "WeightsFingerprint":
+        stat = path.stat()
+        return cls(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+
+class ModelRegistryStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    # New versions loaded next to the served ones and swapped in
+    swaps: int = 0
+    evictions: int = 0
+    load_seconds_total: float = 0.0
+    load_seconds_last: float = 0.0
+    models: int = 0
+    memory_bytes: int = 0
+
+
+class _RegistryEntry(NamedTuple):
+    path: Path
+    fingerprint: WeightsFingerprint
+    model: BaseInferenceModel
+    memory_bytes: int
+    version: int
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models with LRU eviction.
+    Entries are keyed by model id and invalidated when the weight file they were loaded from changes.
+    A new version of a cached model is put in place by swap, callers keep getting the served one until then.
+    """
+
+    def __init__(self, max_models: int = 0, max_bytes: int = 0) -> None:
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.stats = ModelRegistryStats()
+        self._entries: OrderedDict[str, _RegistryEntry] = OrderedDict()
+        self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._swapping: set[str] = set()
+
+    async def get(
+        self,
+        model_id: str,
+        path: Path,
+        loader: Callable[[Path], BaseInferenceModel],
+        version: int = 1,
+    ) -> BaseInferenceModel:
+        # One lock per model: concurrent callers wait for the first load instead of loading twice
+        async with self._locks[model_id]:
+            entry = self._entries.get(model_id)
+            if entry and entry.fingerprint == WeightsFingerprint.from_path(entry.path):
+                self._entries.move_to_end(model_id)
+                self.stats.hits += 1
+                return entry.model
+
+            self.stats.misses += 1
+            fingerprint = WeightsFingerprint.from_path(path)
+
+            start = time.perf_counter()
+            model = await asyncio.to_thread(loader, path)
+            elapsed = time.perf_counter() - start
+
+            self.stats.loads += 1
+            self.stats.load_seconds_last = elapsed
+            self.stats.load_seconds_total += elapsed
+
+            self._put(model_id, path, fingerprint, model, version)
+
+            logger.info("Model %s loaded from %s in %.3fs", model_id, path, elapsed)
+
+            return model
+
+    async def swap(
+        self,
+        model_id: str,
+        path: Path,
+        loader: Callable[[Path], BaseInferenceModel],
+        version: int,
+    ) -> BaseInferenceModel | None:
+        """
+        Loads and warms up another version of a model while the served one keeps answering, then replaces it
+        in one step. Batches already holding the old model finish on it, it is freed with their last reference.
+        None when a swap of the model is already running.
+        """
+        if model_id in self._swapping:
+            return None
+
+        self._swapping.add(model_id)
+        try:
+            fingerprint = WeightsFingerprint.from_path(path)
+
+            start = time.perf_counter()
+            model = await asyncio.to_thread(loader, path)
+            elapsed = time.perf_counter() - start
+        finally:
+            self._swapping.discard(model_id)
+
+        async with self._locks[model_id]:
+            previous = self._entries.get(model_id)
+            self._put(model_id, path, fingerprint, model, version)
+
+        self.stats.swaps += 1
+        self.stats.load_seconds_last = elapsed
+        self.stats.load_seconds_total += elapsed
+
+        logger.info(
+            "Model %s swapped from version %s to %s (%s) in %.3fs",
+            model_id,
+            previous.version if previous else None,
+            version,
+            path,
+            elapsed,
+        )
+
+        return model
+
+    def get_version(self, model_id: str) -> int | None:
+        """Version of the served model, None when it is not cached."""
+        entry = self._entries.get(model_id)
+        return entry.version if entry else None
+
+    def pop(self, model_id: str) -> BaseInferenceModel | None:
+        entry = self._entries.pop(model_id, None)
+        self._refresh_size()
+        return entry.model if entry else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._refresh_size()
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _put(
+        self,
+        model_id: str,
+        path: Path,
+        fingerprint: WeightsFingerprint,
+        model: BaseInferenceModel,
+        version: int,
+    ) -> None:
+        model.version = version
+        self._entries[model_id] = _RegistryEntry(
+            path=path,
+            fingerprint=fingerprint,
+            model=model,
+            memory_bytes=model.memory_bytes(),
+            version=version,
+        )
+        self._entries.move_to_end(model_id)
+        self._evict(keep=model_id)
+        self._refresh_size()
+
+    def _memory_bytes(self) -> int:
+        return sum(entry.memory_bytes for entry in self._entries.values())
+
+    def _is_over_budget(self) -> bool:
+        if self.max_models and len(self._entries) > self.max_models:
+            return True
+
+        return bool(self.max_bytes and self._memory_bytes() > self.max_bytes)
+
+    def _evict(self, keep: str) -> None:
+        while self._is_over_budget():
+            model_id = next((key for key in self._entries if key != keep), None)
+            if model_id is None:
+                # A single model above the budget is kept, otherwise it would never be cached
+                break
+
+            self._entries.pop(model_id)
+            self.stats.evictions += 1
+            logger.info("Model %s evicted from registry", model_id)
+
+    def _refresh_size(self) -> None:
+        self.stats.models = len(self._entries)
+        self.stats.memory_bytes = self._memory_bytes()
+
+
+@lru_cache(maxsize=1)
+def get_model_registry() -> ModelRegistry:
+    settings = get_config()
+    return ModelRegistry(max_models=settings.ML_REGISTRY_MAX_MODELS, max_bytes=settings.ML_REGISTRY_MAX_BYTES)
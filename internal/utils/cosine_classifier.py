@@ -1,3 +1,5 @@
+import contextlib
+
 import torch
 from torch import nn
 
@@ -7,7 +9,7 @@ class CosineClassifier(nn.Module):
         super().__init__()
         self.scale = scale
         # Параметры - веса для каждого класса
-        self.weight = nn.Parameter(torch.Tensor(num_classes, in_features))
+        self.weight = nn.Parameter(torch.empty(num_classes, in_features))
         # Инициализация весов (например, Xavier)
         nn.init.xavier_uniform_(self.weight)
 
@@ -15,11 +17,18 @@ class CosineClassifier(nn.Module):
         """
         x: [batch, in_features]
         """
-        # Нормализуем входные признаки по L2 норме вдоль размерности признаков
-        x_norm = nn.functional.normalize(x, p=2, dim=1)  # [batch, in_features]
-        # Нормализуем веса
-        w_norm = nn.functional.normalize(self.weight, p=2, dim=1)
-        # Вычисляем косинусное сходство: матричное умножение x_norm и транспонированных w_norm
-        cosine_sim = torch.mm(x_norm, w_norm.t())  # [batch, num_classes]
+        # Normalization and cosine similarity stay in FP32 under bfloat16 autocast
+        fp32 = (
+            torch.autocast(device_type=x.device.type, enabled=False)
+            if torch.amp.is_autocast_available(x.device.type)
+            else contextlib.nullcontext()
+        )
+        with fp32:
+            # Нормализуем входные признаки по L2 норме вдоль размерности признаков
+            x_norm = nn.functional.normalize(x.float(), p=2, dim=1)  # [batch, in_features]
+            # Нормализуем веса
+            w_norm = nn.functional.normalize(self.weight.float(), p=2, dim=1)
+            # Вычисляем косинусное сходство: матричное умножение x_norm и транспонированных w_norm
+            cosine_sim = torch.mm(x_norm, w_norm.t())  # [batch, num_classes]
         # Масштабируем сходство для повышения экспрессивности логитов
         return self.scale * cosine_sim
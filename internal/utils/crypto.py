@@ -1,4 +1,5 @@
 import hashlib
+from pathlib import Path
 from typing import AnyStr
 
 from cryptography.fernet import Fernet
@@ -18,3 +19,16 @@ def hash_string(data: AnyStr) -> str:
     data_byte = data if isinstance(data, bytes) else data.encode()
 
     return hashlib.sha512(data_byte).hexdigest()
+
+
+def hash_content(data: bytes) -> str:
+    """Хеш содержимого файла (SHA-256)."""
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    """Хеш содержимого файла на диске (SHA-256), без чтения целиком в память."""
+
+    with path.open("rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
@@ -5,6 +5,8 @@ from .types import (
     ForbiddenError,
     InternalServerError,
     NotFoundError,
+    ServiceUnavailableError,
+    TooManyRequestsError,
     UnauthorizedError,
     UniqueError,
     ValidationError,
@@ -16,6 +18,8 @@ __all__ = [
     "ForbiddenError",
     "InternalServerError",
     "NotFoundError",
+    "ServiceUnavailableError",
+    "TooManyRequestsError",
     "UnauthorizedError",
     "UniqueError",
     "ValidationError",
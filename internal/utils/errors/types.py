@@ -53,3 +53,13 @@ class ValidationError(BaseError):
 class BadRequestError(BaseError):
     _default_detail = "Bad Request"
     _default_status_code = status.HTTP_400_BAD_REQUEST
+
+
+class TooManyRequestsError(BaseError):
+    _default_detail = "Too Many Requests"
+    _default_status_code = status.HTTP_429_TOO_MANY_REQUESTS
+
+
+class ServiceUnavailableError(BaseError):
+    _default_detail = "Service Unavailable"
+    _default_status_code = status.HTTP_503_SERVICE_UNAVAILABLE
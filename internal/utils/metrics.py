@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+
+from pydantic import BaseModel
+
+
+class TimingStats(BaseModel):
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seconds: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+
+
+def _read_proc_kb(path: Path) -> dict[str, int]:
+    """Lines like "VmRSS:   1436 kB" of a /proc file, in bytes."""
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+
+    result = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        parts = value.split()
+        if len(parts) == 2 and parts[1] == "kB":  # noqa: PLR2004
+            result[key] = int(parts[0]) * 1024
+
+    return result
+
+
+class ProcessMemoryStats(BaseModel):
+    """
+    Memory of the current worker process (Linux only, zeros elsewhere).
+    rss_file_bytes are pages of mapped files (mmap'd weights) shared with other workers,
+    pss_bytes splits every shared page between the processes that map it.
+    """
+
+    pid: int
+    rss_bytes: int = 0
+    rss_anon_bytes: int = 0
+    rss_file_bytes: int = 0
+    pss_bytes: int = 0
+
+    @classmethod
+    def current(cls) -> "ProcessMemoryStats":
+        status = _read_proc_kb(Path("/proc/self/status"))
+        rollup = _read_proc_kb(Path("/proc/self/smaps_rollup"))
+        return cls(
+            pid=os.getpid(),
+            rss_bytes=status.get("VmRSS", 0),
+            rss_anon_bytes=status.get("RssAnon", 0),
+            rss_file_bytes=status.get("RssFile", 0),
+            pss_bytes=rollup.get("Pss", 0),
+        )
@@ -0,0 +1,227 @@
+import math
+from pathlib import Path
+
+import torch
+from pydantic import BaseModel
+from timm.layers import Mlp
+from timm.models.vision_transformer import Attention
+from torch import nn
+from torchvision.models.resnet import BasicBlock
+
+# Key of the pruned architecture inside a saved state dict
+PRUNING_CONFIG_KEY = "__pruning__"
+
+
+class PruningConfig(BaseModel):
+    """
+    Shapes of the pruned units, keyed by module name.
+    attention_heads - heads kept in a ViT attention, mlp_hidden - hidden features of a ViT MLP,
+    conv_channels - output channels of the first conv of a ResNet BasicBlock.
+    """
+
+    attention_heads: dict[str, int] = {}
+    mlp_hidden: dict[str, int] = {}
+    conv_channels: dict[str, int] = {}
+
+
+class PrunedAttention(nn.Module):
+    """
+    Multi-head self-attention whose inner width (num_heads * head_dim) may be smaller than the embedding.
+    Parameter names match timm Attention, so the state dict layout is unchanged.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        num_heads: int,
+        head_dim: int,
+        *,
+        qkv_bias: bool = True,
+        device: torch.device | None = None,
+    ) -> None:
+        super().__init__()
+        self.num_heads = num_heads
+        self.head_dim = head_dim
+        self.qkv = nn.Linear(dim, num_heads * head_dim * 3, bias=qkv_bias, device=device)
+        self.proj = nn.Linear(num_heads * head_dim, dim, device=device)
+
+    def forward(
+        self,
+        x: torch.Tensor,
+        attn_mask: torch.Tensor | None = None,
+        is_causal: bool = False,  # noqa: FBT001, FBT002
+    ) -> torch.Tensor:
+        batch, tokens, _ = x.shape
+        qkv = self.qkv(x).reshape(batch, tokens, 3, self.num_heads, self.head_dim).permute(2, 0, 3, 1, 4)
+        q, k, v = qkv.unbind(0)
+
+        x = nn.functional.scaled_dot_product_attention(q, k, v, attn_mask=attn_mask, is_causal=is_causal)
+        return self.proj(x.transpose(1, 2).reshape(batch, tokens, self.num_heads * self.head_dim))
+
+
+def _is_prunable_attention(module: nn.Module) -> bool:
+    if isinstance(module, PrunedAttention):
+        return True
+
+    # q/k normalization and the pre-projection norm have the full width, such layers are left dense
+    return isinstance(module, Attention) and all(
+        isinstance(getattr(module, name, nn.Identity()), nn.Identity) for name in ["q_norm", "k_norm", "norm"]
+    )
+
+
+def _keep_count(total: int, ratio: float) -> int:
+    return min(max(total - math.floor(total * ratio), 1), total)
+
+
+def _top_indices(importance: torch.Tensor, keep: int) -> torch.Tensor:
+    return importance.topk(keep).indices.sort().values
+
+
+def _linear(weight: torch.Tensor, bias: torch.Tensor | None) -> nn.Linear:
+    layer = nn.Linear(weight.shape[1], weight.shape[0], bias=bias is not None, device=weight.device)
+    layer.weight = nn.Parameter(weight.clone())
+    if bias is not None:
+        layer.bias = nn.Parameter(bias.clone())
+    return layer
+
+
+def _conv(conv: nn.Conv2d, weight: torch.Tensor) -> nn.Conv2d:
+    layer = nn.Conv2d(
+        weight.shape[1],
+        weight.shape[0],
+        kernel_size=conv.kernel_size,
+        stride=conv.stride,
+        padding=conv.padding,
+        dilation=conv.dilation,
+        bias=False,
+        device=weight.device,
+    )
+    layer.weight = nn.Parameter(weight.clone())
+    return layer
+
+
+def _batch_norm(bn: nn.BatchNorm2d, index: torch.Tensor) -> nn.BatchNorm2d:
+    layer = nn.BatchNorm2d(len(index), eps=bn.eps, momentum=bn.momentum, device=bn.weight.device)
+    layer.weight = nn.Parameter(bn.weight[index].clone())
+    layer.bias = nn.Parameter(bn.bias[index].clone())
+    layer.running_mean = bn.running_mean[index].clone()
+    layer.running_var = bn.running_var[index].clone()
+    layer.num_batches_tracked = bn.num_batches_tracked.clone()
+    return layer
+
+
+def _prune_attention(attn: nn.Module, ratio: float) -> PrunedAttention:
+    dim, num_heads, head_dim = attn.qkv.in_features, attn.num_heads, attn.head_dim
+    keep = _keep_count(num_heads, ratio)
+
+    # A head matters as much as its values contribute to the output projection
+    v_weight = attn.qkv.weight[2 * num_heads * head_dim :].view(num_heads, head_dim, dim)
+    proj_weight = attn.proj.weight.view(dim, num_heads, head_dim)
+    importance = v_weight.abs().sum(dim=(1, 2)) * proj_weight.abs().sum(dim=(0, 2))
+    heads = _top_indices(importance, keep)
+
+    columns = (heads[:, None] * head_dim + torch.arange(head_dim, device=heads.device)).flatten()
+    # Rows of q, k and v of the kept heads, in the same q/k/v layout
+    rows = torch.cat([part * num_heads * head_dim + columns for part in range(3)])
+
+    pruned = PrunedAttention(dim, keep, head_dim, qkv_bias=attn.qkv.bias is not None, device=attn.qkv.weight.device)
+    pruned.qkv = _linear(attn.qkv.weight[rows], attn.qkv.bias[rows] if attn.qkv.bias is not None else None)
+    pruned.proj = _linear(attn.proj.weight[:, columns], attn.proj.bias)
+    return pruned
+
+
+def _prune_mlp(mlp: Mlp, ratio: float) -> int:
+    keep = _keep_count(mlp.fc1.out_features, ratio)
+    importance = mlp.fc1.weight.abs().sum(dim=1) * mlp.fc2.weight.abs().sum(dim=0)
+    index = _top_indices(importance, keep)
+
+    mlp.fc1 = _linear(mlp.fc1.weight[index], mlp.fc1.bias[index] if mlp.fc1.bias is not None else None)
+    mlp.fc2 = _linear(mlp.fc2.weight[:, index], mlp.fc2.bias)
+    return keep
+
+
+def _prune_basic_block(block: BasicBlock, ratio: float) -> int:
+    keep = _keep_count(block.conv1.out_channels, ratio)
+    importance = block.conv1.weight.abs().sum(dim=(1, 2, 3)) * block.bn1.weight.abs()
+    index = _top_indices(importance, keep)
+
+    # Only the channels inside the block are removed, the residual keeps its width
+    block.conv1 = _conv(block.conv1, block.conv1.weight[index])
+    block.bn1 = _batch_norm(block.bn1, index)
+    block.conv2 = _conv(block.conv2, block.conv2.weight[:, index])
+    return keep
+
+
+@torch.no_grad()
+def prune_model(
+    model: nn.Module,
+    head_ratio: float = 0.0,
+    mlp_ratio: float = 0.0,
+    filter_ratio: float = 0.0,
+) -> PruningConfig:
+    """
+    Removes the given share of the least important attention heads, MLP hidden channels and
+    BasicBlock conv filters (by weight magnitude). The tensors get smaller, so does the compute.
+    """
+    config = PruningConfig()
+
+    for name, module in list(model.named_modules()):
+        if head_ratio > 0 and _is_prunable_attention(module):
+            pruned = _prune_attention(module, head_ratio)
+            model.set_submodule(name, pruned)
+            config.attention_heads[name] = pruned.num_heads
+        elif mlp_ratio > 0 and isinstance(module, Mlp) and isinstance(module.norm, nn.Identity):
+            config.mlp_hidden[name] = _prune_mlp(module, mlp_ratio)
+        elif filter_ratio > 0 and isinstance(module, BasicBlock):
+            config.conv_channels[name] = _prune_basic_block(module, filter_ratio)
+
+    return config
+
+
+def resize_model(model: nn.Module, config: PruningConfig) -> None:
+    """
+    Reshapes a dense architecture into the pruned one without copying weights (meta device included),
+    so that the state dict of the pruned model can be loaded into it.
+    """
+    for name, num_heads in config.attention_heads.items():
+        attn = model.get_submodule(name)
+        model.set_submodule(
+            name,
+            PrunedAttention(
+                attn.qkv.in_features,
+                num_heads,
+                attn.head_dim,
+                qkv_bias=attn.qkv.bias is not None,
+                device=attn.qkv.weight.device,
+            ),
+        )
+
+    for name, hidden in config.mlp_hidden.items():
+        mlp = model.get_submodule(name)
+        device = mlp.fc1.weight.device
+        mlp.fc1 = nn.Linear(mlp.fc1.in_features, hidden, bias=mlp.fc1.bias is not None, device=device)
+        mlp.fc2 = nn.Linear(hidden, mlp.fc2.out_features, bias=mlp.fc2.bias is not None, device=device)
+
+    for name, channels in config.conv_channels.items():
+        block = model.get_submodule(name)
+        device = block.conv1.weight.device
+        block.conv1 = _conv(block.conv1, torch.empty(channels, *block.conv1.weight.shape[1:], device=device))
+        block.bn1 = nn.BatchNorm2d(channels, eps=block.bn1.eps, momentum=block.bn1.momentum, device=device)
+        block.conv2 = _conv(
+            block.conv2,
+            torch.empty(block.conv2.out_channels, channels, *block.conv2.weight.shape[2:], device=device),
+        )
+
+
+def save_pruned(model: nn.Module, config: PruningConfig, path: Path) -> Path:
+    """
+    The state dict of the pruned model with its config, a regular checkpoint for PyTorchModel.load_model.
+    """
+    state_dict = model.state_dict()
+    state_dict[PRUNING_CONFIG_KEY] = config.model_dump()
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    torch.save(state_dict, tmp_path)
+    tmp_path.replace(path)
+
+    return path
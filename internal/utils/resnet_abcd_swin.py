@@ -7,12 +7,16 @@ from .cosine_classifier import CosineClassifier
 
 
 class ResNetCosineSwinModel(nn.Module):
-    def __init__(self, num_abcd_features: int = 5, num_classes: int = 3) -> None:
+    def __init__(self, num_abcd_features: int = 5, num_classes: int = 3, *, pretrained: bool = True) -> None:
+        """
+        pretrained=False builds the architecture without downloading ImageNet weights,
+        for inference where the checkpoint overwrites them anyway.
+        """
         super().__init__()
 
         # Используем resnet18 без последнего fc-слоя
-        resnet = models.resnet18(pretrained=True)
-        self.vit = timm.create_model("vit_base_patch16_224", pretrained=True)  # Загрузим предобученную модель ViT
+        resnet = models.resnet18(pretrained=pretrained)
+        self.vit = timm.create_model("vit_base_patch16_224", pretrained=pretrained)  # Загрузим предобученную модель ViT
         self.vit.head = nn.Identity()  # Убираем последний слой (классификатор), чтобы получить признаки
         self.vit_fc = nn.Linear(768, 512)  # Слои для преобразования признаков ViT
 
@@ -32,12 +36,55 @@ class ResNetCosineSwinModel(nn.Module):
         self.beta = nn.Parameter(torch.tensor(0.3), requires_grad=True)
 
     def forward(self, x: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.forward_head(self.forward_features(x), abcd_features)
+
+    def feature_modules(self) -> list[nn.Module]:
+        """
+        Modules of the feature stage, their weights identify the backbone.
+        """
+        return [self.cnn, self.vit]
+
+    def forward_features(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Backbone stage: concatenated ResNet and ViT features [batch, 512 + 768].
+        """
+        return torch.cat([self.forward_cnn_features(x), self.forward_vit_features(x)], dim=1)
+
+    def forward_cnn_features(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        ResNet branch of the backbone [batch, 512], the cheap stage of the cascade.
+        """
         cnn_features = self.cnn(x)
-        cnn_features = self.flatten(cnn_features)
-        cnn_features = torch.relu(self.cnn_fc(cnn_features))
+        return self.flatten(cnn_features)
 
+    def forward_vit_features(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        ViT branch of the backbone [batch, 768], the cascade only runs it for uncertain images.
+        """
         vit_features = self.vit(x)  # Признаки из ViT
-        vit_features = vit_features.view(vit_features.size(0), -1)  # Приводим размерность
+        return vit_features.view(vit_features.size(0), -1)  # Приводим размерность
+
+    def build_cascade_head(self) -> "ResNetABCDHead":
+        """
+        Head of the cascade initialized from the layers of this model, fitted by cli.ml cascade-fit.
+        """
+        head = ResNetABCDHead(
+            num_abcd_features=self.abcd_fc.in_features,
+            num_classes=self.cosine_classifier.weight.shape[0],
+            in_features=self.cnn_fc.in_features,
+        ).to(self.cnn_fc.weight.device)
+        with torch.no_grad():
+            head.cnn_fc.load_state_dict(self.cnn_fc.state_dict())
+            head.abcd_fc.load_state_dict(self.abcd_fc.state_dict())
+            head.cosine_classifier.load_state_dict(self.cosine_classifier.state_dict())
+        return head
+
+    def forward_head(self, features: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        """
+        Head stage: fc layers, ABCD branch and CosineClassifier on top of forward_features.
+        """
+        cnn_features, vit_features = features.split([self.cnn_fc.in_features, self.vit_fc.in_features], dim=1)
+        cnn_features = torch.relu(self.cnn_fc(cnn_features))
         vit_features = torch.relu(self.vit_fc(vit_features))
 
         if abcd_features.dim() == 1:
@@ -65,3 +112,35 @@ class ResNetCosineSwinModel(nn.Module):
                     threshold = torch.quantile(abs_weight, sparsity_rate)
                     # Обнуляем веса ниже порога
                     param.data[abs_weight < threshold] = 0
+
+
+class ResNetABCDHead(nn.Module):
+    """
+    Classifier on ResNet and ABCD features only, the first stage of the cascade.
+    temperature calibrates its confidence, it is fitted after the weights and never trained with them.
+    """
+
+    def __init__(self, num_abcd_features: int = 5, num_classes: int = 3, in_features: int = 512) -> None:
+        super().__init__()
+        self.cnn_fc = nn.Linear(in_features, 512)
+        self.abcd_fc = nn.Linear(num_abcd_features, 512)
+        self.cosine_classifier = CosineClassifier(512, num_classes, scale=10.0)
+        self.register_buffer("temperature", torch.ones(()))
+
+    def forward_uncalibrated(self, cnn_features: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        if abcd_features.dim() == 1:
+            abcd_features = abcd_features.unsqueeze(0)
+
+        combined = torch.relu(torch.relu(self.cnn_fc(cnn_features)) + torch.relu(self.abcd_fc(abcd_features)))
+        return self.cosine_classifier(combined)
+
+    def forward(self, cnn_features: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.forward_uncalibrated(cnn_features, abcd_features) / self.temperature
+
+
+def build_inference_model() -> ResNetCosineSwinModel:
+    """
+    Architecture only, the weights come from a checkpoint.
+    A module-level function (not a partial) so that it is pickled by reference and hashes the same in pool workers.
+    """
+    return ResNetCosineSwinModel(pretrained=False)
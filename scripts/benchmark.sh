@@ -1,2 +1,4 @@
 #!/bin/bash
-pytest --benchmark-enable --benchmark-only
+# Compares the run with the latest baseline of this machine in benchmarks/baselines.
+# Pass --benchmark-save=<name> to store the run as a new baseline.
+pytest --benchmark-enable --benchmark-only --benchmark-storage=file://./benchmarks/baselines --benchmark-compare "$@"
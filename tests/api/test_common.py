@@ -1,7 +1,11 @@
 import httpx
+import pytest
 from fastapi import status
 from pytest_benchmark.fixture import BenchmarkFixture
 
+from internal.api import common
+from internal.services.ml.readiness import ReadinessTracker
+
 
 class TestCommon:
     async def test_health_check(self, async_client: httpx.AsyncClient) -> None:
@@ -9,6 +13,28 @@ class TestCommon:
         assert response.status_code == status.HTTP_200_OK
         assert response.json() == {"message": "OK"}
 
+    async def test_metrics(self, async_client: httpx.AsyncClient) -> None:
+        response = await async_client.get("/api/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        for field in ["registry", "batching", "executor", "memory"]:
+            assert field in response.json()
+
+    async def test_ready_after_preload(self, async_client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+        tracker = ReadinessTracker()
+        monkeypatch.setattr(common, "get_readiness_tracker", lambda: tracker)
+        tracker.start({"model": "Model"})
+
+        response = await async_client.get("/api/ready")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["models"][0]["state"] == "PENDING"
+
+        tracker.start({})
+        tracker.finish()
+
+        response = await async_client.get("/api/ready")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["ready"] is True
+
     async def test_benchmark_health_check(self, benchmark: BenchmarkFixture, async_client: httpx.AsyncClient) -> None:
         async def health() -> httpx.Response:
             return await async_client.get("/api/health")
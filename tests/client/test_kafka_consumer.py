@@ -0,0 +1,248 @@
+import asyncio
+
+import pytest
+from aiokafka import ConsumerRecord, TopicPartition
+
+from internal.client.kafka.consumer import KafkaActions, KafkaConsumer, PartitionOffsets, _DrainOnRevoke
+
+TOPIC = "melanoma-detection"
+
+
+def make_record(partition: int, offset: int, key: bytes | None = None) -> ConsumerRecord:
+    return ConsumerRecord(
+        topic=TOPIC,
+        partition=partition,
+        offset=offset,
+        timestamp=0,
+        timestamp_type=0,
+        key=key,
+        value=b"{}",
+        checksum=None,
+        serialized_key_size=0,
+        serialized_value_size=2,
+        headers=(),
+    )
+
+
+class FakeConsumer:
+    def __init__(self, records: list[ConsumerRecord]) -> None:
+        self.records = records
+        self.partitions = {TopicPartition(TOPIC, elem.partition) for elem in records}
+        self.paused_partitions: set[TopicPartition] = set()
+        self.commits: list[dict[TopicPartition, int]] = []
+        self.pauses = 0
+
+    def assignment(self) -> set[TopicPartition]:
+        return self.partitions
+
+    def paused(self) -> set[TopicPartition]:
+        return set(self.paused_partitions)
+
+    def pause(self, *partitions: TopicPartition) -> None:
+        self.pauses += 1
+        self.paused_partitions.update(partitions)
+
+    def resume(self, *partitions: TopicPartition) -> None:
+        self.paused_partitions.difference_update(partitions)
+
+    async def getmany(self, timeout_ms: int = 0, max_records: int | None = None) -> dict:
+        await asyncio.sleep(0)
+        taken = [elem for elem in self.records if TopicPartition(TOPIC, elem.partition) not in self.paused_partitions][
+            :max_records
+        ]
+        result: dict[TopicPartition, list[ConsumerRecord]] = {}
+        for elem in taken:
+            self.records.remove(elem)
+            result.setdefault(TopicPartition(TOPIC, elem.partition), []).append(elem)
+        return result
+
+    async def commit(self, offsets: dict[TopicPartition, int]) -> None:
+        self.commits.append(dict(offsets))
+
+    async def stop(self) -> None:
+        pass
+
+
+def make_consumer(records: list[ConsumerRecord], max_in_flight: int, *, order_by_key: bool = False) -> KafkaConsumer:
+    consumer = KafkaConsumer(max_in_flight=max_in_flight, order_by_key=order_by_key, poll_timeout_ms=10)
+    consumer.consumer = FakeConsumer(records)
+    return consumer
+
+
+async def run_until_empty(consumer: KafkaConsumer) -> None:
+    task = asyncio.create_task(consumer.run_concurrent())
+    while consumer.consumer.records or consumer.stats.in_flight:  # noqa: ASYNC110
+        await asyncio.sleep(0.01)
+    await consumer.stop()
+    await task
+
+
+class TestKafkaConsumerConcurrent:
+    async def test_partition_order_and_limit(self) -> None:
+        records = [make_record(partition, offset) for offset in range(4) for partition in range(3)]
+        consumer = make_consumer(records, max_in_flight=2)
+        handled: list[tuple[int, int]] = []
+        running, max_running = 0, 0
+
+        @consumer.read(TOPIC)
+        async def handler(msg: ConsumerRecord) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.005 * (3 - msg.partition))
+            handled.append((msg.partition, msg.offset))
+            running -= 1
+
+        await run_until_empty(consumer)
+
+        assert max_running == 2  # noqa: PLR2004
+        for partition in range(3):
+            assert [offset for elem, offset in handled if elem == partition] == list(range(4))
+        assert consumer.consumer.pauses > 0
+        assert consumer.stats.processed == len(handled) == 12  # noqa: PLR2004
+        last = {}
+        for elem in consumer.consumer.commits:
+            last.update(elem)
+        assert last == {TopicPartition(TOPIC, partition): 4 for partition in range(3)}
+
+    async def test_failed_message_is_committed(self) -> None:
+        consumer = make_consumer([make_record(0, 0), make_record(0, 1)], max_in_flight=2)
+
+        @consumer.read(TOPIC)
+        async def handler(msg: ConsumerRecord) -> None:
+            if msg.offset == 0:
+                raise ValueError
+
+        await run_until_empty(consumer)
+
+        assert consumer.stats.failed == 1
+        assert consumer.stats.processed == 1
+        assert consumer.consumer.commits[-1] == {TopicPartition(TOPIC, 0): 2}
+
+    async def test_commit_waits_for_running_handler(self) -> None:
+        consumer = make_consumer([], max_in_flight=4, order_by_key=True)
+        release = asyncio.Event()
+
+        @consumer.read(TOPIC)
+        async def handler(msg: ConsumerRecord) -> None:
+            if msg.key == b"slow":
+                await release.wait()
+
+        consumer.dispatch([make_record(0, 0, key=b"slow")])
+        consumer.dispatch([make_record(0, 1, key=b"fast")])
+        await asyncio.sleep(0.01)
+        await consumer.commit()
+
+        # Offset 1 is done, but 0 is still running: nothing past it is committed
+        assert consumer.consumer.commits == [{TopicPartition(TOPIC, 0): 0}]
+
+        release.set()
+        await consumer.drain({TopicPartition(TOPIC, 0)})
+
+        assert consumer.consumer.commits[-1] == {TopicPartition(TOPIC, 0): 2}
+        assert consumer.stats.in_flight == 0
+
+    async def test_assigned_while_paused(self) -> None:
+        consumer = make_consumer([make_record(0, 0), make_record(1, 0)], max_in_flight=2)
+        release = asyncio.Event()
+        handled: list[int] = []
+
+        @consumer.read(TOPIC)
+        async def handler(msg: ConsumerRecord) -> None:
+            await release.wait()
+            handled.append(msg.partition)
+
+        task = asyncio.create_task(consumer.run_concurrent())
+        while not consumer.stats.paused:  # noqa: ASYNC110
+            await asyncio.sleep(0.01)
+
+        # A rebalance hands over a partition with fresh, unpaused state
+        assigned = TopicPartition(TOPIC, 2)
+        consumer.consumer.partitions.add(assigned)
+        consumer.consumer.records.append(make_record(2, 0))
+        await _DrainOnRevoke(consumer).on_partitions_assigned({assigned})
+        await asyncio.sleep(0.05)
+
+        assert consumer.consumer.records == [make_record(2, 0)]
+
+        release.set()
+        while consumer.consumer.records or consumer.stats.in_flight:  # noqa: ASYNC110
+            await asyncio.sleep(0.01)
+        await consumer.stop()
+        await task
+
+        assert sorted(handled) == [0, 1, 2]
+
+
+class TestKafkaConsumerBatch:
+    @pytest.mark.parametrize("max_in_flight", [1, 8])
+    async def test_batches_per_partition(self, max_in_flight: int) -> None:
+        records = [make_record(partition, offset) for offset in range(5) for partition in range(2)]
+        consumer = make_consumer(records, max_in_flight=max_in_flight)
+        batches: list[list[tuple[int, int]]] = []
+
+        @consumer.read_batch(TOPIC, max_records=3, max_wait_ms=5)
+        async def handler(records: list[ConsumerRecord]) -> list[bool]:
+            batches.append([(elem.partition, elem.offset) for elem in records])
+            return [elem.offset != 1 for elem in records]
+
+        if max_in_flight == 1:
+            task = asyncio.create_task(consumer.run_batches())
+            while consumer.consumer.records:  # noqa: ASYNC110
+                await asyncio.sleep(0.01)
+            await consumer.stop()
+            await task
+        else:
+            await run_until_empty(consumer)
+
+        assert consumer.get_poll_timeout_ms() == 5  # noqa: PLR2004
+        assert all(0 < len(elem) <= 3 and len({partition for partition, _ in elem}) == 1 for elem in batches)  # noqa: PLR2004
+        for partition in range(2):
+            offsets = [offset for elem in batches for current, offset in elem if current == partition]
+            assert offsets == list(range(5))
+        assert consumer.stats.failed == 2  # noqa: PLR2004
+        assert consumer.stats.processed == 8  # noqa: PLR2004
+
+    async def test_exception_fails_batch(self) -> None:
+        consumer = make_consumer([], max_in_flight=1)
+
+        @consumer.read_batch(TOPIC)
+        async def handler(records: list[ConsumerRecord]) -> None:  # noqa: ARG001
+            raise ValueError
+
+        results = await consumer.handle_batch([make_record(0, 0), make_record(0, 1)])
+
+        assert results == [False, False]
+        assert consumer.stats.failed == 2  # noqa: PLR2004
+
+    def test_split_by_key(self) -> None:
+        consumer = make_consumer([], max_in_flight=4, order_by_key=True)
+        consumer.read_batch(TOPIC, max_records=2)(None)
+        records = [make_record(0, offset, key=b"a" if offset % 2 else b"b") for offset in range(5)]
+
+        chunks = consumer.split_records(records)
+
+        assert [[elem.offset for elem in chunk] for chunk in chunks] == [[0, 2], [4], [1, 3]]
+
+    def test_include_action(self) -> None:
+        actions, consumer = KafkaActions(), KafkaConsumer(prefix="dev-")
+        actions.read_batch(TOPIC, max_records=4)(None)
+        consumer.include_action(actions)
+
+        assert consumer.get_topics() == [f"dev-{TOPIC}"]
+        assert consumer.get_batch_handlers()[f"dev-{TOPIC}"][1].max_records == 4  # noqa: PLR2004
+
+
+def test_partition_offsets() -> None:
+    offsets = PartitionOffsets()
+    offsets.start(5)
+    offsets.start(6)
+    offsets.finish(6)
+
+    assert offsets.get_commit_offset() == 5  # noqa: PLR2004
+
+    offsets.finish(5)
+    offsets.committed = offsets.get_commit_offset()
+
+    assert offsets.committed == 7  # noqa: PLR2004
+    assert offsets.get_commit_offset() is None
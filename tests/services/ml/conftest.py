@@ -0,0 +1,33 @@
+import io
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+from torch import nn
+
+
+class TinyModel(nn.Module):
+    """Same inputs and outputs as ResNetCosineSwinModel, small enough for unit tests."""
+
+    def __init__(self, num_abcd_features: int = 5, num_classes: int = 3) -> None:
+        super().__init__()
+        self.conv = nn.Conv2d(3, 4, kernel_size=8, stride=8)
+        self.fc = nn.Linear(4 * 28 * 28 + num_abcd_features, num_classes)
+
+    def forward(self, x: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.fc(torch.cat([self.conv(x).flatten(1), abcd_features], dim=1))
+
+
+@pytest.fixture
+def tiny_model() -> nn.Module:
+    torch.manual_seed(0)
+    return TinyModel().eval()
+
+
+@pytest.fixture
+def image_bytes() -> bytes:
+    rng = np.random.default_rng(0)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, size=(320, 280, 3), dtype=np.uint8)).save(buffer, format="JPEG")
+    return buffer.getvalue()
@@ -0,0 +1,57 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+from pytest_mock import MockerFixture
+
+from internal.config.base import ExecutorKindEnum
+from internal.services.ml import abcd
+from internal.services.ml.abcd import ABCDFeatureService
+from internal.services.ml.executor import InferenceExecutor
+
+
+@pytest.fixture
+def image_bytes() -> bytes:
+    image = np.zeros((128, 128, 3), dtype=np.uint8)
+    image[32:96, 40:88] = 200
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestABCDFeatureService:
+    async def test_cached_by_content(self, mocker: MockerFixture) -> None:
+        compute = mocker.patch.object(
+            abcd, "compute_abcd_vectors", side_effect=lambda images, *_: [[1.0] * 5] * len(images)
+        )
+        service = ABCDFeatureService(executor=InferenceExecutor(kind=ExecutorKindEnum.THREAD), persist=False)
+
+        first = await service.get_features([b"first", b"second", b"first"])
+        second = await service.get_features([b"second", b"first"])
+        service.executor.shutdown()
+
+        assert compute.call_count == 1
+        assert compute.call_args.args[0] == [b"first", b"second"]
+        assert len(first) == 3  # noqa: PLR2004
+        assert len(second) == 2  # noqa: PLR2004
+        assert service.stats.computed == 2  # noqa: PLR2004
+        assert service.stats.memory_hits == 2  # noqa: PLR2004
+
+    async def test_store_hit_skips_compute(self, mocker: MockerFixture) -> None:
+        compute = mocker.patch.object(abcd, "compute_abcd_vectors")
+        service = ABCDFeatureService(executor=InferenceExecutor(kind=ExecutorKindEnum.THREAD))
+        mocker.patch.object(service, "_load", side_effect=lambda hashes, **_: dict.fromkeys(hashes, [2.0] * 5))
+
+        result = await service.get_features([b"image"])
+        service.executor.shutdown()
+
+        assert result == [[2.0] * 5]
+        compute.assert_not_called()
+        assert service.stats.store_hits == 1
+
+    def test_compute_vectors(self, image_bytes: bytes) -> None:
+        (vector,) = abcd.compute_abcd_vectors([image_bytes])
+
+        assert len(vector) == 5  # noqa: PLR2004
+        assert vector[3] > 0
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from internal.services.ml.admission import AdmissionQueue
+from internal.utils import errors
+
+
+class TestAdmissionQueue:
+    async def test_rejects_when_full(self) -> None:
+        queue, release = AdmissionQueue(max_concurrency=1, max_queue=1), asyncio.Event()
+
+        async def predict() -> int:
+            await release.wait()
+            return 1
+
+        running = [asyncio.create_task(queue.run(predict)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(errors.TooManyRequestsError) as exc_info:
+            await queue.run(predict)
+
+        release.set()
+
+        assert await asyncio.gather(*running) == [1, 1]
+        assert exc_info.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(exc_info.value.headers["Retry-After"]) >= 1
+        assert queue.stats.rejected == 1
+        assert queue.stats.max_depth == 2  # noqa: PLR2004
+        assert queue.depth == 0
+
+    async def test_deadline_includes_wait(self) -> None:
+        queue = AdmissionQueue(max_concurrency=1, max_queue=1, timeout_ms=50)
+        slow = asyncio.create_task(queue.run(lambda: asyncio.sleep(0.2)))
+        await asyncio.sleep(0)
+
+        with pytest.raises(errors.ServiceUnavailableError) as exc_info:
+            await queue.run(lambda: asyncio.sleep(0))
+
+        with pytest.raises(errors.ServiceUnavailableError):
+            await slow
+
+        assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert "Retry-After" in exc_info.value.headers
+        assert queue.stats.timed_out == 2  # noqa: PLR2004
+        assert queue.depth == 0
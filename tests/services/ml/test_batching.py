@@ -0,0 +1,46 @@
+import asyncio
+from unittest.mock import Mock
+
+from internal.services.ml.batching import BatchInferenceEngine
+
+
+def _model() -> Mock:
+    model = Mock()
+    model.predict_batch.side_effect = lambda images, *_: [(index, 1.0) for index, _ in enumerate(images)]
+    return model
+
+
+class TestBatchInferenceEngine:
+    async def test_concurrent_requests_share_batch(self) -> None:
+        engine, model = BatchInferenceEngine(max_batch_size=4, max_wait_ms=50), _model()
+        image = b"image"
+
+        result = await asyncio.gather(*[engine.predict(model_id="model", model=model, image=image) for _ in range(4)])
+        await engine.stop()
+
+        assert model.predict_batch.call_count == 1
+        assert result == [(0, 1.0), (1, 1.0), (2, 1.0), (3, 1.0)]
+        assert engine.stats.max_batch_size == 4  # noqa: PLR2004
+
+    async def test_batch_size_limit(self) -> None:
+        engine, model = BatchInferenceEngine(max_batch_size=2, max_wait_ms=50), _model()
+        image = b"image"
+
+        await asyncio.gather(*[engine.predict(model_id="model", model=model, image=image) for _ in range(5)])
+        await engine.stop()
+
+        assert model.predict_batch.call_count == 3  # noqa: PLR2004
+        assert engine.stats.requests == 5  # noqa: PLR2004
+
+    async def test_error_propagates_to_each_caller(self) -> None:
+        engine, model = BatchInferenceEngine(max_batch_size=2, max_wait_ms=50), _model()
+        model.predict_batch.side_effect = RuntimeError("broken")
+        image = b"image"
+
+        result = await asyncio.gather(
+            *[engine.predict(model_id="model", model=model, image=image) for _ in range(2)],
+            return_exceptions=True,
+        )
+        await engine.stop()
+
+        assert all(isinstance(elem, RuntimeError) for elem in result)
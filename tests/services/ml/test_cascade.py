@@ -0,0 +1,125 @@
+from pathlib import Path
+
+import pytest
+import torch
+from torch import nn
+
+from internal.entities.schemas.ml import InferencePathEnum
+from internal.services.ml.cascade import fit_cascade_head, save_cascade_head
+from internal.services.ml.evaluation import evaluate_cascade
+from internal.services.ml.model import PyTorchModel
+from internal.utils.resnet_abcd_swin import ResNetCosineSwinModel
+
+CNN_FEATURES = 4 * 28 * 28
+VIT_FEATURES = 2 * 14 * 14
+
+
+class TinyCascadeHead(nn.Module):
+    def __init__(self, num_abcd_features: int = 5, num_classes: int = 3) -> None:
+        super().__init__()
+        self.head_fc = nn.Linear(CNN_FEATURES + num_abcd_features, num_classes)
+        self.register_buffer("temperature", torch.ones(()))
+
+    def forward_uncalibrated(self, cnn_features: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.head_fc(torch.cat([cnn_features, abcd_features], dim=1))
+
+    def forward(self, cnn_features: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.forward_uncalibrated(cnn_features, abcd_features) / self.temperature
+
+
+class TinyCascadeModel(nn.Module):
+    """Two backbone branches and a cascade head like ResNetCosineSwinModel."""
+
+    def __init__(self, num_abcd_features: int = 5, num_classes: int = 3) -> None:
+        super().__init__()
+        self.cnn = nn.Conv2d(3, 4, kernel_size=8, stride=8)
+        self.vit = nn.Conv2d(3, 2, kernel_size=16, stride=16)
+        self.fc = nn.Linear(CNN_FEATURES + VIT_FEATURES + num_abcd_features, num_classes)
+        self.vit_calls = 0
+
+    def feature_modules(self) -> list[nn.Module]:
+        return [self.cnn, self.vit]
+
+    def forward_cnn_features(self, x: torch.Tensor) -> torch.Tensor:
+        return self.cnn(x).flatten(1)
+
+    def forward_vit_features(self, x: torch.Tensor) -> torch.Tensor:
+        self.vit_calls += x.shape[0]
+        return self.vit(x).flatten(1)
+
+    def forward_features(self, x: torch.Tensor) -> torch.Tensor:
+        return torch.cat([self.forward_cnn_features(x), self.forward_vit_features(x)], dim=1)
+
+    def forward_head(self, features: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.fc(torch.cat([features, abcd_features], dim=1))
+
+    def forward(self, x: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.forward_head(self.forward_features(x), abcd_features)
+
+    def build_cascade_head(self) -> TinyCascadeHead:
+        return TinyCascadeHead()
+
+
+@pytest.fixture
+def cascade_model() -> PyTorchModel:
+    torch.manual_seed(0)
+    model = PyTorchModel(model=TinyCascadeModel().eval())
+    model.cascade_head = model.model.build_cascade_head().eval()
+    return model
+
+
+class TestCascade:
+    def test_confident_images_skip_vit(self, cascade_model: PyTorchModel, image_bytes: bytes) -> None:
+        cascade_model.cascade_threshold = 1e-6
+
+        result = cascade_model.predict_batch([image_bytes, image_bytes])
+
+        assert [elem.path for elem in result] == [InferencePathEnum.FAST] * 2
+        assert cascade_model.model.vit_calls == 0
+
+    @pytest.mark.parametrize("tta_views", [1, 4])
+    def test_escalated_images_match_full_model(
+        self,
+        cascade_model: PyTorchModel,
+        image_bytes: bytes,
+        tta_views: int,
+    ) -> None:
+        full = cascade_model.predict_proba_batch([image_bytes], tta_views=tta_views)
+        cascade_model.cascade_threshold = 1.01
+
+        probs, paths = cascade_model.predict_proba_paths([image_bytes], tta_views=tta_views)
+
+        assert paths == [InferencePathEnum.ESCALATED]
+        assert torch.allclose(probs, full, atol=1e-6)
+
+    def test_disabled_without_threshold(self, cascade_model: PyTorchModel, image_bytes: bytes) -> None:
+        assert cascade_model.predict(image_bytes).path == InferencePathEnum.FULL
+
+    def test_fit_save_and_load(self, cascade_model: PyTorchModel, image_bytes: bytes, tmp_path: Path) -> None:
+        head, report = fit_cascade_head(cascade_model, [image_bytes] * 4, epochs=5)
+        path = save_cascade_head(head, PyTorchModel.get_cascade_path(tmp_path / "model.pth"))
+
+        assert path.name == "model.cascade.pth"
+        assert report.temperature > 0
+        assert 0 <= report.agreement <= 1
+
+        model = PyTorchModel(model=TinyCascadeModel().eval())
+        assert model.load_cascade_head(path, threshold=0.5)
+        assert model.cascade_head.temperature.item() == pytest.approx(report.temperature)
+
+    def test_evaluate_thresholds(self, cascade_model: PyTorchModel, image_bytes: bytes) -> None:
+        report = evaluate_cascade(cascade_model, [image_bytes] * 3, thresholds=[1e-6, 1.01], labels=[0, 1, 2])
+
+        assert [elem.fast_share for elem in report.thresholds] == [1.0, 0.0]
+        assert report.thresholds[1].agreement == 1.0
+        assert report.full_accuracy is not None
+        assert cascade_model.cascade_threshold == 0.0
+
+
+def test_resnet_swin_cascade_head() -> None:
+    with torch.device("meta"):
+        model = ResNetCosineSwinModel(pretrained=False)
+        head = model.build_cascade_head()
+        logits = head(torch.empty(2, 512), torch.empty(2, 5))
+
+    assert logits.shape == (2, 3)
@@ -0,0 +1,73 @@
+from functools import partial
+from pathlib import Path
+
+import pytest
+import torch
+
+from internal.config import cpu
+from internal.config.base import ExecutorKindEnum
+from internal.config.cpu import plan_cpu_layout, set_thread_limits
+from internal.services.ml.executor import InferenceExecutor
+
+
+class TestPlanCpuLayout:
+    def test_one_thread_per_worker_when_workers_match_cores(self) -> None:
+        layout = plan_cpu_layout(cpus=list(range(32)), cores=32, workers=32, executor_workers=1, abcd_workers=2)
+
+        assert layout.intra_op_threads == 1
+        assert layout.opencv_threads == 1
+        assert layout.abcd_workers == 1
+        assert layout.cpus == []
+
+    def test_share_split_between_executor_workers(self) -> None:
+        layout = plan_cpu_layout(cpus=list(range(32)), cores=32, workers=4, executor_workers=2, abcd_workers=2)
+
+        # 8 cores per worker, two concurrent inference calls
+        assert layout.intra_op_threads == 4  # noqa: PLR2004
+        assert layout.abcd_workers == 2  # noqa: PLR2004
+
+    def test_slots_pinned_to_disjoint_cpus(self) -> None:
+        cpus = list(range(8))
+        layouts = [
+            plan_cpu_layout(cpus=cpus, cores=8, workers=4, executor_workers=1, abcd_workers=1, slot=slot)
+            for slot in range(4)
+        ]
+
+        assert [elem.cpus for elem in layouts] == [[0, 1], [2, 3], [4, 5], [6, 7]]
+
+    def test_slots_wrap_when_workers_exceed_cores(self) -> None:
+        layout = plan_cpu_layout(cpus=[0, 1], cores=2, workers=3, executor_workers=1, abcd_workers=1, slot=2)
+
+        assert layout.cpus == [0]
+        assert layout.intra_op_threads == 1
+
+
+@pytest.mark.parametrize(("content", "expected"), [("max 100000\n", None), ("250000 100000\n", 3)])
+def test_cgroup_quota(monkeypatch: pytest.MonkeyPatch, tmp_path: Path, content: str, expected: int | None) -> None:
+    path = tmp_path / "cpu.max"
+    path.write_text(content)
+    monkeypatch.setattr(cpu, "CGROUP_CPU_MAX", path)
+
+    assert cpu._read_cgroup_quota() == expected  # noqa: SLF001
+
+
+def test_set_thread_limits() -> None:
+    threads = torch.get_num_threads()
+    try:
+        set_thread_limits(1, torch.get_num_interop_threads(), 1)
+
+        assert torch.get_num_threads() == 1
+    finally:
+        torch.set_num_threads(threads)
+
+
+async def test_process_pool_initializer() -> None:
+    executor = InferenceExecutor(
+        kind=ExecutorKindEnum.PROCESS,
+        initializer=partial(set_thread_limits, 1, 1, 1),
+    )
+
+    threads = await executor.run(torch.get_num_threads)
+    executor.shutdown()
+
+    assert threads == 1
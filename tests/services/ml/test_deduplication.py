@@ -0,0 +1,106 @@
+import datetime
+import uuid
+from typing import Any
+
+import pytest
+from faker import Faker
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from internal.entities import models
+from internal.entities.schemas.ml import KafkaInputMessageSchema, StatusEnum
+from internal.services.crypto import CryptoService
+from internal.services.ml.base import MLService
+
+
+async def _create_file(db_session: AsyncSession, fake: Faker, user_id: str, content_hash: str) -> models.Files:
+    file_id = uuid.uuid4()
+    file = models.Files(
+        id=file_id,
+        original_name=CryptoService.encrypt(fake.file_name(category="image")).decode(),
+        s3_path=f"data/{file_id!s}.jpg",
+        type_file="image/jpeg",
+        user_id=user_id,
+        content_hash=content_hash,
+    )
+    db_session.add(file)
+    await db_session.flush()
+    return file
+
+
+class TestDeduplication:
+    @pytest.mark.parametrize("deduplicate", [True, False])
+    async def test_predict_reused_for_same_content(
+        self,
+        fake: Faker,
+        mocker: MockerFixture,
+        db_session: AsyncSession,
+        mock_user: dict[str, Any],
+        deduplicate: bool,  # noqa: FBT001
+    ) -> None:
+        model = models.Models(name="model", s3_path="bucket/model.pth", is_exists=True, deduplicate=deduplicate)
+        db_session.add(model)
+        await db_session.flush()
+
+        content_hash = fake.sha256()
+        first = await _create_file(db_session, fake, mock_user["id"], content_hash)
+        second = await _create_file(db_session, fake, mock_user["id"], content_hash)
+
+        predict = models.Predicts(file_id=first.id, model_id=model.id, result=0, probability=0.9)
+        db_session.add(predict)
+        task = models.Tasks(file_id=second.id, user_id=mock_user["id"], status=StatusEnum.UPLOAD)
+        db_session.add(task)
+        await db_session.commit()
+
+        get_model = mocker.patch.object(MLService, "get_model", side_effect=RuntimeError("inference"))
+        data = KafkaInputMessageSchema(task_id=task.id, model_id=model.id)
+
+        if not deduplicate:
+            with pytest.raises(RuntimeError, match="inference"):
+                await MLService.predict_file(session=db_session, data=data)
+            return
+
+        await MLService.predict_file(session=db_session, data=data)
+        await db_session.refresh(task)
+
+        get_model.assert_not_called()
+        assert task.predict_id == predict.id
+        assert task.status == StatusEnum.SUCCESS
+
+    @pytest.mark.parametrize(("model_version", "deleted"), [(2, False), (1, True)])
+    async def test_predict_not_reused_for_new_version_or_deleted_file(  # noqa: PLR0913
+        self,
+        fake: Faker,
+        mocker: MockerFixture,
+        db_session: AsyncSession,
+        mock_user: dict[str, Any],
+        model_version: int,
+        deleted: bool,  # noqa: FBT001
+    ) -> None:
+        model = models.Models(
+            name="model",
+            s3_path="bucket/model.pth",
+            is_exists=True,
+            deduplicate=True,
+            version=model_version,
+        )
+        db_session.add(model)
+        await db_session.flush()
+
+        content_hash = fake.sha256()
+        first = await _create_file(db_session, fake, mock_user["id"], content_hash)
+        second = await _create_file(db_session, fake, mock_user["id"], content_hash)
+        if deleted:
+            first.deleted_on = datetime.datetime.now()  # noqa: DTZ005
+
+        db_session.add(models.Predicts(file_id=first.id, model_id=model.id, result=0, probability=0.9))
+        task = models.Tasks(file_id=second.id, user_id=mock_user["id"], status=StatusEnum.UPLOAD)
+        db_session.add(task)
+        await db_session.commit()
+
+        mocker.patch.object(MLService, "get_model", side_effect=RuntimeError("inference"))
+
+        with pytest.raises(RuntimeError, match="inference"):
+            await MLService.predict_file(
+                session=db_session, data=KafkaInputMessageSchema(task_id=task.id, model_id=model.id)
+            )
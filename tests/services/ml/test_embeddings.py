@@ -0,0 +1,104 @@
+import pickle
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn
+
+from internal.config.base import CompileModeEnum
+from internal.services.ml.embeddings import EmbeddingCache, get_embedding_cache, set_content_hash
+from internal.services.ml.model import PyTorchModel
+from internal.services.ml.preprocess import preprocess_image
+from internal.utils.crypto import hash_content
+
+
+class TinySplitModel(nn.Module):
+    """Feature and head stages like ResNetCosineSwinModel."""
+
+    def __init__(self, num_abcd_features: int = 5, num_classes: int = 3) -> None:
+        super().__init__()
+        self.conv = nn.Conv2d(3, 4, kernel_size=8, stride=8)
+        self.fc = nn.Linear(4 * 28 * 28 + num_abcd_features, num_classes)
+        self.feature_calls = 0
+
+    def feature_modules(self) -> list[nn.Module]:
+        return [self.conv]
+
+    def forward_features(self, x: torch.Tensor) -> torch.Tensor:
+        self.feature_calls += x.shape[0]
+        return self.conv(x).flatten(1)
+
+    def forward_head(self, features: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.fc(torch.cat([features, abcd_features], dim=1))
+
+    def forward(self, x: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        return self.forward_head(self.forward_features(x), abcd_features)
+
+
+def _build_model(cache: EmbeddingCache | None) -> PyTorchModel:
+    torch.manual_seed(0)
+    model = PyTorchModel(model=TinySplitModel().eval())
+    model.embedding_cache = cache
+    return model
+
+
+class TestEmbeddingCache:
+    def test_hit_runs_head_only(self, tmp_path: Path, image_bytes: bytes) -> None:
+        expected = _build_model(cache=None).predict_proba_batch([image_bytes], tta_views=2)
+        model = _build_model(cache=EmbeddingCache(max_items=8, directory=tmp_path))
+
+        first = model.predict_proba_batch([image_bytes], tta_views=2)
+        second = model.predict_proba_batch([image_bytes], tta_views=2)
+
+        assert model.model.feature_calls == 2  # noqa: PLR2004
+        assert model.embedding_cache.stats.memory_hits == 1
+        torch.testing.assert_close(first, expected)
+        torch.testing.assert_close(second, expected)
+
+    def test_disk_store_shared_by_models_with_same_backbone(self, tmp_path: Path, image_bytes: bytes) -> None:
+        _build_model(cache=EmbeddingCache(max_items=8, directory=tmp_path)).predict_proba_batch([image_bytes])
+
+        model = _build_model(cache=EmbeddingCache(max_items=8, directory=tmp_path))
+        with torch.no_grad():
+            model.model.fc.weight.mul_(2)
+        model.predict_proba_batch([image_bytes])
+
+        assert model.model.feature_calls == 0
+        assert model.embedding_cache.stats.disk_hits == 1
+
+    def test_views_prefix(self) -> None:
+        cache = EmbeddingCache(max_items=8)
+        cache.put("backbone", "image", np.arange(8, dtype=np.float32).reshape(4, 2))
+
+        np.testing.assert_array_equal(cache.get("backbone", "image", views=1), [[0, 1]])
+        assert cache.get("backbone", "image", views=8) is None
+        assert cache.get("other", "image", views=1) is None
+
+    def test_decoded_upload_shares_entry_with_bytes(self, image_bytes: bytes) -> None:
+        model = _build_model(cache=EmbeddingCache(max_items=8))
+        model.predict_proba_batch([image_bytes])
+
+        image = set_content_hash(
+            preprocess_image(image_bytes, image_size=model.image_size).image, hash_content(image_bytes)
+        )
+        model.predict_proba_batch([pickle.loads(pickle.dumps(image))])  # noqa: S301
+
+        assert model.model.feature_calls == 1
+        assert model.embedding_cache.stats.memory_hits == 1
+
+    def test_restored_in_pool_worker(self, tmp_path: Path) -> None:
+        weights = tmp_path / "weights.pth"
+        torch.save(TinySplitModel().state_dict(), weights)
+        model = PyTorchModel.from_checkpoint(TinySplitModel, weights)
+        model.embedding_cache = EmbeddingCache(max_items=8)
+
+        restored = pickle.loads(pickle.dumps(model))  # noqa: S301
+
+        assert restored.embedding_cache is get_embedding_cache()
+
+    def test_compilation_skipped(self) -> None:
+        model = _build_model(cache=EmbeddingCache(max_items=8))
+
+        assert model.compile(CompileModeEnum.TRACE) == 0.0
+        assert model.graph is None
+        assert model.warmup_report.compile_mode == CompileModeEnum.EAGER
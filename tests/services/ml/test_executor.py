@@ -0,0 +1,58 @@
+import asyncio
+import math
+import threading
+import time
+
+import pytest
+
+from internal.config.base import ExecutorKindEnum
+from internal.services.ml.executor import InferenceExecutor
+
+
+class TestInferenceExecutor:
+    async def test_thread_run_off_event_loop(self) -> None:
+        executor = InferenceExecutor(kind=ExecutorKindEnum.THREAD)
+
+        thread_name = await executor.run(lambda: threading.current_thread().name)
+        executor.shutdown()
+
+        assert thread_name.startswith("inference")
+        assert executor.stats.completed == 1
+        assert executor.stats.execution.count == 1
+
+    async def test_process_run(self) -> None:
+        executor = InferenceExecutor(kind=ExecutorKindEnum.PROCESS)
+
+        result = await executor.run(math.factorial, 5)
+        executor.shutdown()
+
+        assert result == 120  # noqa: PLR2004
+
+    async def test_bounded_queue(self) -> None:
+        executor = InferenceExecutor(kind=ExecutorKindEnum.THREAD, max_workers=1, max_queue=1)
+        max_depth = 0
+
+        async def observe() -> None:
+            nonlocal max_depth
+            while True:
+                max_depth = max(max_depth, executor.stats.in_flight)
+                await asyncio.sleep(0.001)
+
+        observer = asyncio.create_task(observe())
+        await asyncio.gather(*[executor.run(time.sleep, 0.02) for _ in range(4)])
+        observer.cancel()
+        executor.shutdown()
+
+        assert max_depth <= 2  # noqa: PLR2004
+        assert executor.stats.completed == 4  # noqa: PLR2004
+        assert executor.stats.queue_wait.max_seconds > 0
+
+    async def test_failed_call(self) -> None:
+        executor = InferenceExecutor(kind=ExecutorKindEnum.THREAD)
+
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(lambda: 1 / 0)
+        executor.shutdown()
+
+        assert executor.stats.failed == 1
+        assert executor.stats.in_flight == 0
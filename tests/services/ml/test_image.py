@@ -0,0 +1,63 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from internal.services.ml.model import BaseInferenceModel
+
+
+def _encode(width: int, height: int, image_format: str, **params: object) -> bytes:
+    rng = np.random.default_rng(0)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)).save(
+        buffer,
+        format=image_format,
+        **params,
+    )
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def photo_bytes() -> bytes:
+    """12 MP JPEG, the size of a phone photo, smooth like one."""
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 255, size=(30, 40, 3), dtype=np.uint8)).resize((4000, 3000))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class TestOpenImage:
+    def test_jpeg_decoded_close_to_target(self, photo_bytes: bytes) -> None:
+        image = BaseInferenceModel.open_image(photo_bytes, size=224)
+
+        assert image.mode == "RGB"
+        assert 224 <= min(image.size) < 448  # noqa: PLR2004
+        assert image.size[0] > image.size[1]
+
+    @pytest.mark.parametrize("image_format", ["PNG", "WEBP"])
+    def test_other_formats_reduced(self, image_format: str) -> None:
+        image = BaseInferenceModel.open_image(_encode(1200, 900, image_format), size=224)
+
+        assert image.mode == "RGB"
+        assert 224 <= min(image.size) < 448  # noqa: PLR2004
+
+    @pytest.mark.parametrize("size", [None, 224])
+    def test_exif_orientation(self, size: int | None) -> None:
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 CW
+        content = _encode(1000, 500, "JPEG", exif=exif.tobytes())
+
+        image = BaseInferenceModel.open_image(content, size=size)
+
+        assert image.size[0] < image.size[1]
+
+    @pytest.mark.parametrize("size", [None, 224])
+    def test_benchmark_decode(self, benchmark: BenchmarkFixture, photo_bytes: bytes, size: int | None) -> None:
+        benchmark.group = "decode_12mp_jpeg"
+        image = benchmark(BaseInferenceModel.open_image, photo_bytes, size)
+
+        benchmark.extra_info["decoded_bytes"] = image.width * image.height * len(image.getbands())
+        assert image.mode == "RGB"
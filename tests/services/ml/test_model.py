@@ -0,0 +1,145 @@
+from pathlib import Path
+
+import pytest
+import timm
+import torch
+from pytest_mock import MockerFixture
+from torch import nn
+
+from internal.config import get_config
+from internal.config.base import CompileModeEnum
+from internal.entities.schemas.ml import ModelPrecisionEnum
+from internal.services.ml import model as model_module
+from internal.services.ml.model import TTA_VIEWS, PyTorchModel
+from internal.utils.cosine_classifier import CosineClassifier
+from internal.utils.resnet_abcd_swin import build_inference_model
+
+
+class TestPyTorchModel:
+    def test_predict_deterministic(self, tiny_model: nn.Module, image_bytes: bytes) -> None:
+        model = PyTorchModel(model=tiny_model)
+
+        assert model.predict(image_bytes) == model.predict(image_bytes)
+
+    def test_predict_batch_matches_single(self, tiny_model: nn.Module, image_bytes: bytes) -> None:
+        model = PyTorchModel(model=tiny_model)
+
+        result, probability, _ = model.predict(image_bytes)
+        batch = model.predict_batch([image_bytes, image_bytes])
+
+        assert [elem[0] for elem in batch] == [result, result]
+        assert batch[0][1] == pytest.approx(probability, abs=1e-5)
+
+    def test_tta_single_forward_pass(self, tiny_model: nn.Module, image_bytes: bytes) -> None:
+        model = PyTorchModel(model=tiny_model)
+        batch_sizes = []
+        model.model.register_forward_pre_hook(lambda _, args: batch_sizes.append(args[0].shape[0]))
+
+        model.predict_batch([image_bytes, image_bytes], tta_views=len(TTA_VIEWS))
+
+        assert batch_sizes == [2 * len(TTA_VIEWS)]
+
+    def test_int8_cached_on_disk(self, tmp_path: Path, tiny_model: nn.Module, image_bytes: bytes) -> None:
+        weights = tmp_path / "model.pth"
+        torch.save(tiny_model.state_dict(), weights)
+
+        first = PyTorchModel(model=type(tiny_model)(), precision=ModelPrecisionEnum.INT8)
+        first.load_model(weights)
+        second = PyTorchModel(model=type(tiny_model)(), precision=ModelPrecisionEnum.INT8)
+        second.load_model(weights)
+
+        assert (tmp_path / "model.int8.pth").exists()
+        assert first.memory_bytes() < PyTorchModel(model=tiny_model).memory_bytes()
+        torch.testing.assert_close(first.predict_proba_batch([image_bytes]), second.predict_proba_batch([image_bytes]))
+
+    def test_bf16_close_to_fp32(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        tiny_model: nn.Module,
+        image_bytes: bytes,
+    ) -> None:
+        monkeypatch.setattr(get_config(), "ML_BF16_REQUIRE_NATIVE", False)
+        expected = PyTorchModel(model=tiny_model).predict_proba_batch([image_bytes, image_bytes])
+
+        model = PyTorchModel(model=tiny_model, precision=ModelPrecisionEnum.BF16)
+
+        assert model.warmup_report.autocast_dtype == "bfloat16"
+        torch.testing.assert_close(model.predict_proba_batch([image_bytes, image_bytes]), expected, atol=2e-2, rtol=0)
+
+    def test_bf16_falls_back_without_native_support(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        tiny_model: nn.Module,
+        image_bytes: bytes,
+    ) -> None:
+        monkeypatch.setattr(get_config(), "ML_BF16_REQUIRE_NATIVE", True)
+        monkeypatch.setattr(model_module, "cpu_supports_bf16", lambda: False)
+
+        model = PyTorchModel(model=tiny_model, precision=ModelPrecisionEnum.BF16)
+
+        assert model.autocast_dtype is None
+        assert model.predict(image_bytes) == PyTorchModel(model=tiny_model).predict(image_bytes)
+
+    def test_trace_matches_eager(self, tiny_model: nn.Module, image_bytes: bytes) -> None:
+        model = PyTorchModel(model=tiny_model)
+        expected = model.predict_proba_batch([image_bytes, image_bytes, image_bytes])
+
+        model.compile(CompileModeEnum.TRACE)
+
+        assert model.graph is not None
+        assert model.warmup_report.compile_mode == CompileModeEnum.TRACE
+        torch.testing.assert_close(model.predict_proba_batch([image_bytes, image_bytes, image_bytes]), expected)
+
+    def test_compile_failure_falls_back_to_eager(
+        self,
+        mocker: MockerFixture,
+        tiny_model: nn.Module,
+        image_bytes: bytes,
+    ) -> None:
+        mocker.patch("torch.compile", side_effect=RuntimeError("no compiler"))
+        model = PyTorchModel(model=tiny_model)
+
+        assert model.compile(CompileModeEnum.COMPILE) == 0.0
+        assert model.graph is None
+        assert model.warmup_report.compile_mode == CompileModeEnum.EAGER
+        assert "no compiler" in model.warmup_report.compile_error
+        assert model.predict(image_bytes)
+
+    def test_warmup_batch_sizes(self, tiny_model: nn.Module) -> None:
+        model = PyTorchModel(model=tiny_model)
+        batch_sizes = []
+        model.model.register_forward_pre_hook(lambda _, args: batch_sizes.append(args[0].shape[0]))
+
+        model.warmup([1, 8])
+
+        assert batch_sizes == [1, 8]
+        assert model.warmup_report.batch_sizes == [1, 8]
+
+    def test_from_checkpoint_on_meta_device(self, tmp_path: Path, tiny_model: nn.Module, image_bytes: bytes) -> None:
+        weights = tmp_path / "model.pth"
+        torch.save(tiny_model.state_dict(), weights)
+
+        model = PyTorchModel.from_checkpoint(type(tiny_model), weights)
+
+        assert not any(param.is_meta for param in model.model.parameters())
+        assert model.predict(image_bytes) == PyTorchModel(model=tiny_model).predict(image_bytes)
+
+    def test_inference_model_built_without_pretrained_weights(self, mocker: MockerFixture) -> None:
+        create_model = mocker.patch("timm.create_model", wraps=timm.create_model)
+
+        with torch.device("meta"):
+            model = build_inference_model()
+
+        assert create_model.call_args.kwargs["pretrained"] is False
+        assert all(param.is_meta for param in model.parameters())
+
+
+def test_cosine_classifier_fp32_under_autocast() -> None:
+    torch.manual_seed(0)
+    classifier, features = CosineClassifier(512, 3), torch.randn(4, 512)
+
+    with torch.autocast(device_type="cpu", dtype=torch.bfloat16):
+        logits = classifier(features.bfloat16())
+
+    assert logits.dtype == torch.float32
+    torch.testing.assert_close(logits, classifier(features.bfloat16().float()))
@@ -0,0 +1,83 @@
+from pathlib import Path
+from types import SimpleNamespace
+from typing import IO, Any
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from internal.config import get_config
+from internal.services.ml.base import MLService
+from internal.utils.crypto import hash_content
+
+
+class _S3:
+    def __init__(self, content: bytes, etag: str) -> None:
+        self.content, self.etag = content, etag
+        self.downloads = 0
+
+    async def head_object(self, **_: str) -> dict[str, str]:
+        return {"ETag": self.etag}
+
+    async def download_fileobj(self, Fileobj: IO[bytes], **_: str) -> None:  # noqa: N803
+        self.downloads += 1
+        Fileobj.write(self.content)
+
+
+def _repo() -> Mock:
+    async def bump_version(obj: SimpleNamespace, checksum: str, s3_etag: str | None) -> bool:
+        obj.version, obj.checksum, obj.s3_etag = obj.version + 1, checksum, s3_etag
+        return True
+
+    async def update(obj: SimpleNamespace, obj_in: dict[str, Any]) -> SimpleNamespace:
+        for field, value in obj_in.items():
+            setattr(obj, field, value)
+        return obj
+
+    return Mock(update=AsyncMock(side_effect=update), bump_version=AsyncMock(side_effect=bump_version))
+
+
+@pytest.fixture
+def model_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    monkeypatch.setattr(get_config(), "ML_DIR_TO_UPLOAD", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def model() -> SimpleNamespace:
+    return SimpleNamespace(id="model", s3_path="bucket/models/model.pth", checksum=None, version=1, s3_etag=None)
+
+
+class TestRefreshModelVersion:
+    async def test_first_check_records_checksum(self, model_dir: Path, model: SimpleNamespace) -> None:
+        s3, repo = _S3(b"weights", etag="1"), _repo()
+
+        assert not await MLService.refresh_model_version(s3=s3, model_repo=repo, model=model)
+        assert not await MLService.refresh_model_version(s3=s3, model_repo=repo, model=model)
+
+        assert (model_dir / "model.pth").read_bytes() == b"weights"
+        assert model.checksum == hash_content(b"weights")
+        assert model.version == 1
+        assert s3.downloads == 1
+        assert list(model_dir.iterdir()) == [model_dir / "model.pth"]
+
+    async def test_new_weights_bump_version(self, model_dir: Path, model: SimpleNamespace) -> None:
+        (model_dir / "model.pth").write_bytes(b"weights")
+        model.checksum, model.s3_etag = hash_content(b"weights"), "1"
+
+        assert await MLService.refresh_model_version(s3=_S3(b"new weights", etag="2"), model_repo=_repo(), model=model)
+
+        assert model.version == 2  # noqa: PLR2004
+        assert MLService.get_model_path("model.pth", model.version) == model_dir / "model.v2.pth"
+        assert (model_dir / "model.v2.pth").read_bytes() == b"new weights"
+        assert (model_dir / "model.pth").read_bytes() == b"weights"
+
+    async def test_same_weights_uploaded_again(self, model_dir: Path, model: SimpleNamespace) -> None:
+        (model_dir / "model.pth").write_bytes(b"weights")
+        model.checksum, model.s3_etag = hash_content(b"weights"), "1"
+        repo = _repo()
+
+        assert not await MLService.refresh_model_version(s3=_S3(b"weights", etag="2"), model_repo=repo, model=model)
+
+        repo.bump_version.assert_not_called()
+        assert model.version == 1
+        assert model.s3_etag == "2"
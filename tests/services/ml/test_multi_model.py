@@ -0,0 +1,61 @@
+import uuid
+from typing import Any
+
+from faker import Faker
+from PIL import Image
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from internal.entities import models
+from internal.entities.schemas.ml import InferencePathEnum, KafkaInputMessageSchema, StatusEnum
+from internal.repositories.ml import PredictsRepository
+from internal.services.crypto import CryptoService
+from internal.services.ml import base
+from internal.services.ml.base import MLService
+from internal.services.ml.model import Prediction
+from internal.services.ml.preprocess import PreprocessedImage
+
+
+class TestMultiModelTask:
+    async def test_one_predict_per_model(
+        self,
+        fake: Faker,
+        mocker: MockerFixture,
+        db_session: AsyncSession,
+        mock_user: dict[str, Any],
+    ) -> None:
+        items = [
+            models.Models(name=f"model {index}", s3_path=f"bucket/{index}.pth", is_exists=True) for index in range(3)
+        ]
+        db_session.add_all(items)
+        file_id = uuid.uuid4()
+        file = models.Files(
+            id=file_id,
+            original_name=CryptoService.encrypt(fake.file_name(category="image")).decode(),
+            s3_path=f"data/{file_id!s}.jpg",
+            type_file="image/jpeg",
+            user_id=mock_user["id"],
+        )
+        db_session.add(file)
+        await db_session.flush()
+        task = models.Tasks(file_id=file.id, user_id=mock_user["id"], status=StatusEnum.UPLOAD)
+        db_session.add(task)
+        await db_session.commit()
+
+        preprocessed = PreprocessedImage(image=Image.new("RGB", (224, 224)), abcd=[0.0] * 5)
+        get_preprocessed_file = mocker.patch.object(MLService, "get_preprocessed_file", return_value=preprocessed)
+        mocker.patch.object(MLService, "get_model", return_value=mocker.Mock(accepts_abcd=True, version=1))
+        engine = mocker.patch.object(base, "get_inference_engine").return_value
+        engine.predict = mocker.AsyncMock(return_value=Prediction(1, 0.75, InferencePathEnum.FULL))
+
+        data = KafkaInputMessageSchema(task_id=task.id, model_ids=[elem.id for elem in items])
+        await MLService.predict_file(session=db_session, data=data)
+        await db_session.refresh(task)
+
+        predicts = await PredictsRepository(session=db_session).list(file_id=file.id)
+        get_preprocessed_file.assert_called_once()
+        assert engine.predict.call_count == len(items)
+        assert all(call.kwargs["image"] is preprocessed.image for call in engine.predict.call_args_list)
+        assert {elem.model_id for elem in predicts} == {elem.id for elem in items}
+        assert task.predict_id == next(elem.id for elem in predicts if elem.model_id == items[0].id)
+        assert task.status == StatusEnum.SUCCESS
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+import torch
+from pytest_benchmark.fixture import BenchmarkFixture
+from torch import nn
+
+from internal.services.ml.model import PyTorchModel
+from internal.services.ml.onnx_model import OnnxModel, export_onnx, quantize_onnx
+
+
+@pytest.fixture
+def models(tmp_path: Path, tiny_model: nn.Module) -> tuple[PyTorchModel, OnnxModel]:
+    torch_model = PyTorchModel(model=tiny_model)
+    return torch_model, OnnxModel(path=export_onnx(torch_model, tmp_path / "model.onnx"))
+
+
+class TestOnnxModel:
+    @pytest.mark.parametrize("batch_size", [1, 3])
+    def test_parity_with_pytorch(
+        self,
+        models: tuple[PyTorchModel, OnnxModel],
+        image_bytes: bytes,
+        batch_size: int,
+    ) -> None:
+        torch_model, onnx_model = models
+        images = [image_bytes] * batch_size
+
+        torch_probs = torch_model.predict_proba_batch(images)
+        onnx_probs = onnx_model.predict_proba_batch(images)
+
+        assert onnx_model.accepts_abcd
+        assert onnx_probs.shape == (batch_size, 3)
+        torch.testing.assert_close(onnx_probs, torch_probs, atol=1e-4, rtol=1e-4)
+
+    def test_int8_agrees_with_float(
+        self,
+        tmp_path: Path,
+        models: tuple[PyTorchModel, OnnxModel],
+        image_bytes: bytes,
+    ) -> None:
+        _, onnx_model = models
+        int8_model = OnnxModel(path=quantize_onnx(onnx_model.path, tmp_path / "model.int8.onnx"))
+
+        float_probs = onnx_model.predict_proba_batch([image_bytes])
+        int8_probs = int8_model.predict_proba_batch([image_bytes])
+
+        assert int8_model.memory_bytes() < onnx_model.memory_bytes()
+        torch.testing.assert_close(int8_probs, float_probs, atol=0.05, rtol=0)
+
+    def test_benchmark_pytorch_forward(
+        self, benchmark: BenchmarkFixture, models: tuple[PyTorchModel, OnnxModel]
+    ) -> None:
+        torch_model, _ = models
+        data, abcd = torch.randn(8, 3, 224, 224), torch.randn(8, 5)
+
+        benchmark.group = "onnx_vs_pytorch"
+        logits = benchmark(torch_model.forward, data, abcd)
+        assert logits.shape == (8, 3)
+
+    def test_benchmark_onnx_forward(self, benchmark: BenchmarkFixture, models: tuple[PyTorchModel, OnnxModel]) -> None:
+        _, onnx_model = models
+        data, abcd = torch.randn(8, 3, 224, 224), torch.randn(8, 5)
+
+        benchmark.group = "onnx_vs_pytorch"
+        logits = benchmark(onnx_model.forward, data, abcd)
+        assert logits.shape == (8, 3)
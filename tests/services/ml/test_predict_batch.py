@@ -0,0 +1,76 @@
+import contextlib
+import uuid
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from faker import Faker
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from internal.entities import models
+from internal.entities.schemas.ml import InferencePathEnum, KafkaInputMessageSchema, StatusEnum
+from internal.services.crypto import CryptoService
+from internal.services.ml import base
+from internal.services.ml.base import MLService
+from internal.services.ml.model import Prediction
+from internal.utils import errors
+
+
+class TestPredictBatch:
+    async def test_failed_task_does_not_affect_others(
+        self,
+        fake: Faker,
+        mocker: MockerFixture,
+        db_session: AsyncSession,
+        mock_user: dict[str, Any],
+    ) -> None:
+        model = models.Models(name="model", s3_path="bucket/model.pth", is_exists=True)
+        db_session.add(model)
+        await db_session.flush()
+
+        tasks = []
+        for _ in range(2):
+            file_id = uuid.uuid4()
+            db_session.add(
+                models.Files(
+                    id=file_id,
+                    original_name=CryptoService.encrypt(fake.file_name(category="image")).decode(),
+                    s3_path=f"data/{file_id!s}.jpg",
+                    type_file="image/jpeg",
+                    user_id=mock_user["id"],
+                ),
+            )
+            await db_session.flush()
+            tasks.append(models.Tasks(file_id=file_id, user_id=mock_user["id"], status=StatusEnum.UPLOAD))
+        db_session.add_all(tasks)
+        await db_session.commit()
+
+        clients = []
+
+        @contextlib.asynccontextmanager
+        async def use_s3_client(client: Any = None) -> AsyncGenerator[Any]:  # noqa: ANN401
+            clients.append(client)
+            yield mocker.Mock()
+
+        mocker.patch.object(base, "use_s3_client", use_s3_client)
+        mocker.patch.object(MLService, "get_model", return_value=mocker.Mock(accepts_abcd=False, version=1))
+        mocker.patch.object(MLService, "get_file", return_value=b"image")
+        engine = mocker.patch.object(base, "get_inference_engine").return_value
+        engine.predict = mocker.AsyncMock(
+            side_effect=[Prediction(1, 0.75, InferencePathEnum.FULL), RuntimeError("inference")],
+        )
+
+        items = [
+            KafkaInputMessageSchema(task_id=tasks[0].id, model_id=model.id),
+            KafkaInputMessageSchema(task_id=uuid.uuid4(), model_id=model.id),
+            KafkaInputMessageSchema(task_id=tasks[1].id, model_id=model.id),
+        ]
+        result = await MLService.predict_files(session=db_session, items=items)
+        await db_session.refresh(tasks[0])
+
+        assert result[0] is None
+        assert isinstance(result[1], errors.NotFoundError)
+        assert isinstance(result[2], RuntimeError)
+        assert len(clients) == 1
+        assert tasks[0].status == StatusEnum.SUCCESS
+        assert tasks[0].predict_id is not None
@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+import torch
+from pytest_mock import MockerFixture
+from torch import nn
+
+from internal.config import get_config
+from internal.config import s3 as s3_config
+from internal.config.base import ExecutorKindEnum
+from internal.services.ml import base
+from internal.services.ml.abcd import ABCDFeatureService, compute_abcd_vectors
+from internal.services.ml.base import MLService
+from internal.services.ml.executor import InferenceExecutor
+from internal.services.ml.model import PyTorchModel
+from internal.services.ml.preprocess import build_artifact, preprocess_image, read_artifact
+
+
+class TestPreprocessedArtifact:
+    def test_artifact_predicts_as_original(self, tiny_model: nn.Module, image_bytes: bytes) -> None:
+        model = PyTorchModel(model=tiny_model)
+
+        artifact = read_artifact(build_artifact(image_bytes, image_size=model.image_size), image_size=model.image_size)
+
+        assert artifact.image.size == (model.INPUT_SIZE, model.INPUT_SIZE)
+        torch.testing.assert_close(torch.tensor(artifact.abcd), torch.tensor(compute_abcd_vectors([image_bytes])[0]))
+        torch.testing.assert_close(
+            model.predict_proba_batch([artifact.image], abcd=[artifact.abcd]),
+            model.predict_proba_batch([image_bytes]),
+        )
+
+    def test_other_decode_settings_ignored(self, image_bytes: bytes) -> None:
+        data = build_artifact(image_bytes, image_size=224)
+
+        assert read_artifact(data, image_size=None) is None
+        assert read_artifact(data, image_size=224, abcd_image_size=512) is None
+
+    def test_preprocess_matches_artifact(self, image_bytes: bytes) -> None:
+        preprocessed = preprocess_image(image_bytes, image_size=224)
+        artifact = read_artifact(build_artifact(image_bytes, image_size=224), image_size=224)
+
+        assert preprocessed.image.tobytes() == artifact.image.tobytes()
+        assert preprocessed.abcd == artifact.abcd
+
+
+class TestGetPreprocessedFile:
+    async def test_skipped_when_disabled(self, mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(get_config(), "ML_PREPROCESS_ON_UPLOAD", False)
+        get_s3_session = mocker.patch.object(s3_config, "get_s3_session")
+
+        assert await MLService.get_preprocessed_file(uuid.uuid4()) is None
+        get_s3_session.assert_not_called()
+
+    @pytest.mark.parametrize("data", [b"", b"PK\x03\x04truncated", b"not an artifact"])
+    async def test_corrupt_artifact_ignored(
+        self,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        data: bytes,
+    ) -> None:
+        monkeypatch.setattr(get_config(), "ML_PREPROCESS_ON_UPLOAD", True)
+        s3 = mocker.AsyncMock()
+        s3.get_object.return_value = {"Body": mocker.Mock(read=mocker.AsyncMock(return_value=data))}
+        mocker.patch.object(s3_config, "get_s3_session").return_value.client.return_value.__aenter__.return_value = s3
+
+        assert await MLService.get_preprocessed_file(uuid.uuid4()) is None
+        s3.get_object.assert_awaited_once()
+
+
+class TestPreprocessContent:
+    async def test_abcd_from_feature_service(self, mocker: MockerFixture, image_bytes: bytes) -> None:
+        service = ABCDFeatureService(executor=InferenceExecutor(kind=ExecutorKindEnum.THREAD), persist=False)
+        mocker.patch.object(base, "get_abcd_service", return_value=service)
+
+        first = await MLService.preprocess_content(image_bytes)
+        second = await MLService.preprocess_content(image_bytes)
+
+        assert service.stats.computed == 1
+        assert service.stats.memory_hits == 1
+        assert first.abcd == second.abcd
+        assert first.image.tobytes() == preprocess_image(image_bytes).image.tobytes()
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import torch
+from timm.models.vision_transformer import VisionTransformer
+from torch import nn
+from torchvision.models.resnet import BasicBlock
+
+from internal.services.ml.model import PyTorchModel
+from internal.utils.pruning import PrunedAttention, prune_model, save_pruned
+
+
+class TinyHybridModel(nn.Module):
+    """ViT and ResNet branches like ResNetCosineSwinModel, small enough for unit tests."""
+
+    def __init__(self, num_abcd_features: int = 5, num_classes: int = 3) -> None:
+        super().__init__()
+        self.vit = VisionTransformer(img_size=224, patch_size=32, embed_dim=64, depth=2, num_heads=4, num_classes=0)
+        self.stem = nn.Conv2d(3, 16, kernel_size=8, stride=8)
+        self.block = BasicBlock(16, 16)
+        self.fc = nn.Linear(64 + 16 + num_abcd_features, num_classes)
+
+    def forward(self, x: torch.Tensor, abcd_features: torch.Tensor) -> torch.Tensor:
+        cnn_features = self.block(self.stem(x)).mean(dim=(2, 3))
+        return self.fc(torch.cat([self.vit(x), cnn_features, abcd_features], dim=1))
+
+
+def _build_model() -> nn.Module:
+    torch.manual_seed(0)
+    return TinyHybridModel().eval()
+
+
+class TestPruning:
+    def test_prune_removes_units(self) -> None:
+        model = _build_model()
+        dense_parameters = sum(param.numel() for param in model.parameters())
+
+        config = prune_model(model, head_ratio=0.5, mlp_ratio=0.5, filter_ratio=0.5)
+
+        assert config.attention_heads == {"vit.blocks.0.attn": 2, "vit.blocks.1.attn": 2}
+        assert config.mlp_hidden == {"vit.blocks.0.mlp": 128, "vit.blocks.1.mlp": 128}
+        assert config.conv_channels == {"block": 8}
+        assert isinstance(model.vit.blocks[0].attn, PrunedAttention)
+        assert sum(param.numel() for param in model.parameters()) < dense_parameters
+        assert model(torch.randn(2, 3, 224, 224), torch.randn(2, 5)).shape == (2, 3)
+
+    def test_pruned_checkpoint_loads_into_dense_architecture(self, tmp_path: Path, image_bytes: bytes) -> None:
+        model = _build_model()
+        config = prune_model(model, head_ratio=0.25, mlp_ratio=0.25, filter_ratio=0.25)
+        weights = save_pruned(model, config, tmp_path / "model_pruned.pth")
+
+        loaded = PyTorchModel.from_checkpoint(TinyHybridModel, weights)
+
+        assert loaded.pruning_config == config
+        torch.testing.assert_close(
+            loaded.predict_proba_batch([image_bytes]),
+            PyTorchModel(model=model).predict_proba_batch([image_bytes]),
+        )
@@ -0,0 +1,74 @@
+from unittest.mock import Mock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from internal.config import get_config
+from internal.entities.schemas.ml import ModelLoadStateEnum
+from internal.services.ml import base
+from internal.services.ml.base import MLService
+from internal.services.ml.model import ModelWarmupReport
+from internal.services.ml.readiness import ReadinessTracker
+
+
+def _model() -> Mock:
+    model = Mock(warmup_report=ModelWarmupReport(warmup_seconds=0.5))
+    model.memory_bytes.return_value = 1024
+    return model
+
+
+class TestReadinessTracker:
+    def test_ready_when_one_model_serves(self) -> None:
+        tracker = ReadinessTracker()
+        tracker.start({"first": "First", "second": "Second"})
+        tracker.loading("first")
+        tracker.loaded("first", _model())
+        assert not tracker.ready
+
+        tracker.loading("second")
+        tracker.failed("second", RuntimeError("broken"))
+        tracker.finish()
+
+        report = tracker.report()
+        assert report.ready
+        assert not report.preloading
+        assert [elem.state for elem in report.models] == [ModelLoadStateEnum.READY, ModelLoadStateEnum.FAILED]
+        assert report.models[0].warmup_seconds == 0.5  # noqa: PLR2004
+        assert report.models[0].memory_bytes == 1024  # noqa: PLR2004
+        assert report.models[1].error == "broken"
+
+    def test_not_ready_when_every_model_failed(self) -> None:
+        tracker = ReadinessTracker()
+        tracker.start({"first": "First"})
+        tracker.loading("first")
+        tracker.failed("first", RuntimeError("broken"))
+        tracker.finish()
+
+        assert not tracker.ready
+
+    def test_ready_without_models(self) -> None:
+        tracker = ReadinessTracker()
+        assert not tracker.ready
+
+        tracker.finish()
+        assert tracker.ready
+
+
+class TestWarmupModels:
+    async def test_listing_error_does_not_stop_warmup(
+        self,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(get_config(), "ML_WARMUP_ON_STARTUP", True)
+        monkeypatch.setattr(get_config(), "ML_PRELOAD_PREDICT_MODEL", True)
+        tracker = ReadinessTracker()
+        mocker.patch.object(base, "get_readiness_tracker", return_value=tracker)
+        mocker.patch.object(base, "get_async_session", side_effect=ConnectionError("database"))
+        get_model = mocker.patch.object(MLService, "get_model", return_value=_model())
+
+        await MLService.warmup_models()
+
+        get_model.assert_awaited_once_with(MLService.PREDICT_MODEL_FILE)
+        assert tracker.ready
+        assert [elem.key for elem in tracker.report().models] == [MLService.PREDICT_MODEL_FILE]
@@ -0,0 +1,108 @@
+import asyncio
+from pathlib import Path
+from unittest.mock import Mock
+
+from internal.services.ml.registry import ModelRegistry
+
+
+def _loader(memory_bytes: int = 1) -> Mock:
+    def load(_: Path) -> Mock:
+        model = Mock()
+        model.memory_bytes.return_value = memory_bytes
+        return model
+
+    return Mock(side_effect=load)
+
+
+class TestModelRegistry:
+    async def test_hit_after_first_load(self, tmp_path: Path) -> None:
+        weights = tmp_path / "model.pth"
+        weights.write_bytes(b"weights")
+        registry, loader = ModelRegistry(), _loader()
+
+        first = await registry.get(model_id="model", path=weights, loader=loader)
+        second = await registry.get(model_id="model", path=weights, loader=loader)
+
+        assert first is second
+        assert loader.call_count == 1
+        assert registry.stats.hits == 1
+        assert registry.stats.misses == 1
+
+    async def test_concurrent_load_once(self, tmp_path: Path) -> None:
+        weights = tmp_path / "model.pth"
+        weights.write_bytes(b"weights")
+        registry, loader = ModelRegistry(), _loader()
+
+        result = await asyncio.gather(
+            *[registry.get(model_id="model", path=weights, loader=loader) for _ in range(5)],
+        )
+
+        assert loader.call_count == 1
+        assert len({id(elem) for elem in result}) == 1
+
+    async def test_reload_on_changed_weights(self, tmp_path: Path) -> None:
+        weights = tmp_path / "model.pth"
+        weights.write_bytes(b"weights")
+        registry, loader = ModelRegistry(), _loader()
+
+        await registry.get(model_id="model", path=weights, loader=loader)
+        weights.write_bytes(b"new weights")
+        await registry.get(model_id="model", path=weights, loader=loader)
+
+        assert loader.call_count == 2  # noqa: PLR2004
+
+    async def test_lru_eviction(self, tmp_path: Path) -> None:
+        registry, loader = ModelRegistry(max_models=2), _loader()
+        for name in ["first", "second", "third"]:
+            weights = tmp_path / f"{name}.pth"
+            weights.write_bytes(name.encode())
+            if name == "third":
+                # "first" becomes the most recently used one
+                await registry.get(model_id="first", path=tmp_path / "first.pth", loader=loader)
+            await registry.get(model_id=name, path=weights, loader=loader)
+
+        assert "first" in registry
+        assert "second" not in registry
+        assert "third" in registry
+        assert registry.stats.evictions == 1
+
+    async def test_memory_budget(self, tmp_path: Path) -> None:
+        registry, loader = ModelRegistry(max_bytes=15), _loader(memory_bytes=10)
+        for name in ["first", "second"]:
+            weights = tmp_path / f"{name}.pth"
+            weights.write_bytes(name.encode())
+            await registry.get(model_id=name, path=weights, loader=loader)
+
+        assert len(registry) == 1
+        assert registry.stats.memory_bytes == 10  # noqa: PLR2004
+
+    async def test_swap_keeps_serving_until_loaded(self, tmp_path: Path) -> None:
+        first, second = tmp_path / "model.pth", tmp_path / "model.v2.pth"
+        first.write_bytes(b"weights")
+        second.write_bytes(b"new weights")
+        registry, loader = ModelRegistry(), _loader()
+        served = await registry.get(model_id="model", path=first, loader=loader)
+
+        started, release = asyncio.Event(), asyncio.Event()
+
+        def slow_load(path: Path) -> Mock:
+            started.set()
+            asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+            return loader(path)
+
+        loop = asyncio.get_running_loop()
+        swap = asyncio.create_task(registry.swap(model_id="model", path=second, loader=slow_load, version=2))
+        await started.wait()
+
+        assert await registry.get(model_id="model", path=second, loader=loader, version=2) is served
+        assert served.version == 1
+        assert await registry.swap(model_id="model", path=second, loader=loader, version=2) is None
+
+        release.set()
+        swapped = await swap
+
+        assert await registry.get(model_id="model", path=first, loader=loader) is swapped
+        assert swapped.version == 2  # noqa: PLR2004
+        assert registry.get_version("model") == 2  # noqa: PLR2004
+        assert registry.stats.swaps == 1
+        assert loader.call_count == 2  # noqa: PLR2004